@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Agent Backend
+Execution backends that send built agent prompts to a model endpoint
+
+HTTPBackend posts each prompt to an OpenAI-compatible chat completions
+endpoint. Connections are kept alive in a pool shared by all threads, so a
+run of executions pays for one TCP (and TLS) handshake per pooled connection
+instead of one per prompt. Requests time out, and connection failures, 429
+and 5xx responses are retried with exponential backoff, honouring
+Retry-After.
+
+MockLLMServer is a local stand-in for a model endpoint that answers with a
+canned completion, optionally after a delay or a number of injected
+failures, so executions can be tested and timed without any real service.
+
+Usage:
+    python augment_agent_integration.py --use-agent research-ideator --query "..." --backend http://host/v1/chat/completions
+    python augment_agent_integration.py --use-agent research-ideator --query "..." --backend mock
+    python agent_backend.py --port 8999 --latency 0.05    # standalone mock server
+"""
+
+import http.client
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+# Environment variable holding the bearer token sent to HTTP backends
+API_KEY_ENV = 'AGENT_BACKEND_API_KEY'
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 8
+
+# Retry-After values are capped so a misbehaving server cannot stall a run
+MAX_RETRY_DELAY = 30.0
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class BackendError(RuntimeError):
+    """Raised when a backend cannot complete a prompt"""
+
+class LLMBackend:
+    """Interface of execution backends
+
+    complete() turns a built agent prompt into a dict with the model's 'text'
+    and, where known, the 'model' that answered and its token 'usage'. A
+    deadline is a time.monotonic() value after which it should give up with
+    BackendError. Implementations must be safe to call from several threads.
+    """
+
+    name = 'backend'
+
+    def complete(self, prompt: str, agent: Optional[Mapping[str, Any]] = None,
+                 deadline: Optional[float] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release connections and other resources"""
+
+    def __enter__(self) -> 'LLMBackend':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+class HTTPConnectionPool:
+    """Keep-alive connections to one HTTP(S) host, reused across requests and threads
+
+    At most size connections are kept idle; more are opened while demand
+    exceeds that and closed when returned to a full pool.
+    """
+
+    def __init__(self, url: str, size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError(f"Unsupported backend URL: {url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.timeout = timeout
+        self._idle: 'queue.LifoQueue[Any]' = queue.LifoQueue(maxsize=max(size, 1))
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def acquire(self) -> Any:
+        """An idle connection, or a new one when none is idle"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            self.opened += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def release(self, connection: Any, reusable: bool = True) -> None:
+        """Return a connection to the pool, closing it when broken or the pool is full"""
+        if reusable:
+            try:
+                self._idle.put_nowait(connection)
+                return
+            except queue.Full:
+                pass
+        connection.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class HTTPBackend(LLMBackend):
+    """Sends prompts to an OpenAI-compatible chat completions endpoint over pooled connections"""
+
+    name = 'http'
+
+    def __init__(self, url: str, model: str = 'default', api_key: Optional[str] = None,
+                 timeout: float = DEFAULT_TIMEOUT, max_retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_tokens: Optional[int] = None):
+        if max_retries < 0:
+            raise ValueError(f"max_retries must not be negative: {max_retries}")
+        self.url = url
+        parts = urlsplit(url)
+        self.path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        self.model = model
+        self.api_key = api_key if api_key is not None else os.environ.get(API_KEY_ENV)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_tokens = max_tokens
+        self.pool_size = pool_size
+        self.pool = HTTPConnectionPool(url, pool_size, timeout)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0}
+
+    def __reduce__(self) -> Any:
+        # Pickled copies, such as those sent to worker processes, open their own connections
+        return HTTPBackend, (self.url, self.model, self.api_key, self.pool.timeout, self.max_retries,
+                             self.backoff, self.pool_size, self.max_tokens)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json', 'Connection': 'keep-alive'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
+
+    def _post(self, body: bytes, timeout: float) -> Any:
+        """One POST over a pooled connection, returning (status, headers, payload bytes)"""
+        connection = self.pool.acquire()
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        try:
+            connection.request('POST', self.path, body=body, headers=self._headers())
+            response = connection.getresponse()
+            payload = response.read()
+        except BaseException:
+            self.pool.release(connection, reusable=False)
+            raise
+        self.pool.release(connection, reusable=not response.will_close)
+        return response.status, response.headers, payload
+
+    def _retry_delay(self, attempt: int, headers: Any = None) -> float:
+        retry_after = headers.get('Retry-After') if headers is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), MAX_RETRY_DELAY)
+            except ValueError:
+                pass
+        return min(self.backoff * 2 ** attempt, MAX_RETRY_DELAY)
+
+    def complete(self, prompt: str, agent: Optional[Mapping[str, Any]] = None,
+                 deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Send prompt as one user message and return the first choice's text
+
+        With a deadline, each attempt times out when it passes and no retry
+        starts after it.
+        """
+        request: Dict[str, Any] = {'model': self.model, 'messages': [{'role': 'user', 'content': prompt}]}
+        if self.max_tokens is not None:
+            request['max_tokens'] = self.max_tokens
+        body = json.dumps(request, ensure_ascii=False).encode('utf-8')
+
+        attempts = 0
+        for attempt in range(self.max_retries + 1):
+            timeout = self.pool.timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    error = 'deadline exceeded'
+                    break
+            self._count('requests')
+            attempts += 1
+            last_attempt = attempt == self.max_retries
+            try:
+                status, headers, payload = self._post(body, timeout)
+            except (OSError, http.client.HTTPException) as e:
+                # Refused and reset connections, timeouts, and stale keep-alive
+                # connections the server closed in the meantime
+                error, headers = f"{type(e).__name__}: {e}", None
+            else:
+                if status == 200:
+                    return self._parse(payload, attempts)
+                error = f"HTTP {status}: {payload[:200].decode('utf-8', 'replace')}"
+                if status not in RETRY_STATUSES:
+                    self._count('failures')
+                    raise BackendError(f"Backend {self.url} rejected the request: {error}")
+            delay = self._retry_delay(attempt, headers)
+            if last_attempt or (deadline is not None and time.monotonic() + delay >= deadline):
+                break
+            logging.warning(f"Backend request failed ({error}); retrying in {delay:.2f}s")
+            self._count('retries')
+            time.sleep(delay)
+
+        self._count('failures')
+        raise BackendError(f"Backend {self.url} failed after {attempts} attempts: {error}")
+
+    def _parse(self, payload: bytes, attempts: int) -> Dict[str, Any]:
+        try:
+            response = json.loads(payload)
+            text = response['choices'][0]['message']['content']
+        except (ValueError, LookupError, TypeError) as e:
+            self._count('failures')
+            raise BackendError(f"Unexpected response from backend {self.url}: {e}") from e
+        return {
+            'text': text,
+            'model': response.get('model', self.model),
+            'usage': response.get('usage', {}),
+            'attempts': attempts
+        }
+
+    def close(self) -> None:
+        self.pool.close()
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """Answers chat completion requests with a canned reply"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; with Nagle on, the body would
+    # wait for the client's delayed ACK of the headers
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count('connections')
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.debug(f"Mock backend: {format % args}")
+
+    def _reply(self, status: int, response: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        server = self.server
+        request_number = server.count('requests')
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            prompt = request['messages'][-1]['content']
+        except (ValueError, LookupError, TypeError) as e:
+            self._reply(400, {'error': {'message': f"Bad request: {e}"}})
+            return
+
+        if request_number <= server.fail_first:
+            self._reply(503, {'error': {'message': 'Injected failure'}}, {'Retry-After': '0'})
+            return
+        if server.latency:
+            time.sleep(server.latency)
+
+        first_line = next((line.strip() for line in prompt.splitlines() if line.strip()), '')
+        words = len(prompt.split())
+        self._reply(200, {
+            'id': f'mock-{request_number}',
+            'object': 'chat.completion',
+            'model': request.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': f"Mock response to: {first_line[:200]}"},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': words, 'completion_tokens': 4, 'total_tokens': words + 4}
+        })
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Local chat completions endpoint for tests and benchmarks
+
+    latency delays every successful reply by that many seconds, and the first
+    fail_first requests are answered with 503 and Retry-After: 0. The
+    'requests' and 'connections' counters show how many requests arrived and
+    over how many TCP connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, fail_first: int = 0):
+        super().__init__((host, port), _MockHandler)
+        self.latency = latency
+        self.fail_first = fail_first
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'connections': 0}
+        self._thread: Optional[threading.Thread] = None
+
+    def count(self, name: str) -> int:
+        with self._lock:
+            self.counters[name] += 1
+            return self.counters[name]
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def start(self) -> 'MockLLMServer':
+        """Serve from a daemon thread and return self"""
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-llm-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'MockLLMServer':
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+class _MockServerBackend(HTTPBackend):
+    """HTTPBackend talking to a MockLLMServer it owns"""
+
+    name = 'mock'
+
+    def __init__(self, **options: Any):
+        self.server = MockLLMServer().start()
+        super().__init__(self.server.url, model='mock', **options)
+
+    def close(self) -> None:
+        super().close()
+        self.server.stop()
+
+def create_backend(spec: str, **options: Any) -> LLMBackend:
+    """Backend for a CLI spec: an http(s) endpoint URL, or 'mock' for an in-process MockLLMServer"""
+    if spec == 'mock':
+        options.pop('model', None)
+        return _MockServerBackend(**options)
+    return HTTPBackend(spec, **options)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Local mock chat completions server')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8999, help='Port to listen on (0 picks a free one)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to delay each reply')
+    parser.add_argument('--fail-first', type=int, default=0, help='Answer this many first requests with 503')
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, args.latency, args.fail_first)
+    print(f"🤖 Mock backend listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Agent Batch Router
+Routes a JSONL stream of requests to agents in bulk
+
+Each input line is a JSON object. The query is its "query" field, or its
+"title" and "body" joined, and its id is "request_id" or "id" (the line number
+otherwise). Each output line holds the request id and its top-k agents.
+
+Usage:
+    python augment_agent_integration.py --batch-route requests.jsonl
+    python augment_agent_integration.py --batch-route - --batch-output routes.jsonl --top-k 5
+"""
+
+import json
+import time
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from agent_index import AgentRouter, SCORE_DECIMALS, tokenize
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batches fall back to per-query routing
+    np = None
+
+def read_requests(lines: Iterable[str]) -> Iterator[Tuple[Any, str]]:
+    """Yield (request_id, query) pairs from JSONL lines, skipping blank lines
+
+    Raises ValueError naming the source and line number of the first line
+    that is not a JSON object.
+    """
+    source = getattr(lines, 'name', '<requests>')
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"{source}:{line_number}: invalid JSON: {e}") from None
+        if not isinstance(request, dict):
+            raise ValueError(f"{source}:{line_number}: expected a JSON object, got {type(request).__name__}")
+        request_id = request.get('request_id', request.get('id', line_number))
+        if 'query' in request:
+            query = str(request['query'])
+        else:
+            query = '\n'.join(str(request[field]) for field in ('title', 'body') if request.get(field))
+        yield request_id, query
+
+class BatchRouter:
+    """Scores batches of queries against a sparse agent-term matrix with NumPy
+
+    Rows of the agent-term matrix hold the AgentRouter impacts of one term, so
+    batch scores equal AgentRouter.search scores. Rows are built the first time
+    a term appears and reused for the rest of the stream. Queries are scored in
+    chunks sized so the dense chunk-by-agents score block stays within
+    max_block_bytes.
+    """
+
+    def __init__(self, router: AgentRouter, top_k: int = 3, chunk_size: int = 1024,
+                 max_block_bytes: int = 64 * 1024 * 1024, use_numpy: Optional[bool] = None):
+        self.router = router
+        self.top_k = top_k
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        if self.use_numpy and np is None:
+            raise ImportError("NumPy is required for vectorized batch routing")
+
+        self.agent_names = router.agent_names()
+        self.chunk_size = max(1, min(chunk_size, max_block_bytes // (8 * max(1, len(self.agent_names)))))
+        self._agent_index = {name: index for index, name in enumerate(self.agent_names)}
+        self._rows: Dict[str, Any] = {}
+
+    def _term_row(self, term: str) -> Any:
+        """Agent indexes and impacts of one term, built on first use"""
+        row = self._rows.get(term)
+        if row is None:
+            impacts = self.router.term_impacts(term)
+            indexes = np.fromiter((self._agent_index[name] for name in impacts), dtype=np.int64,
+                                  count=len(impacts))
+            values = np.fromiter(impacts.values(), dtype=np.float64, count=len(impacts))
+            row = (indexes, values)
+            self._rows[term] = row
+        return row
+
+    def _score_chunk(self, queries: List[str]) -> List[List[Tuple[float, str]]]:
+        """Top-k (score, agent name) pairs for each query in a chunk"""
+        if not self.use_numpy:
+            return [self.router.search(query, self.top_k) for query in queries]
+
+        # Sparse query-term matrix as term -> query rows containing it
+        term_queries: Dict[str, List[int]] = {}
+        for query_index, query in enumerate(queries):
+            for term in dict.fromkeys(tokenize(query)):
+                term_queries.setdefault(term, []).append(query_index)
+
+        scores = np.zeros((len(queries), len(self.agent_names)), dtype=np.float64)
+        for term, query_indexes in term_queries.items():
+            agent_indexes, values = self._term_row(term)
+            if len(agent_indexes):
+                rows = np.asarray(query_indexes, dtype=np.int64)
+                scores[rows[:, None], agent_indexes[None, :]] += values
+
+        k = min(self.top_k, len(self.agent_names))
+        if k <= 0:
+            return [[] for _ in queries]
+        scores = np.round(scores, SCORE_DECIMALS)
+        kth_scores = np.partition(scores, -k, axis=1)[:, -k]
+
+        results = []
+        for query_index, kth_score in enumerate(kth_scores):
+            row_scores = scores[query_index]
+            # Keep every agent tied with the k-th score so ties resolve in registry order
+            candidates = np.flatnonzero(row_scores >= max(kth_score, np.nextafter(0, 1)))
+            ranked = candidates[np.lexsort((candidates, -row_scores[candidates]))][:k]
+            results.append([(float(row_scores[i]), self.agent_names[i]) for i in ranked])
+        return results
+
+    def route_stream(self, lines: Iterable[str], output: IO[str]) -> Dict[str, Any]:
+        """Route every request in lines, writing one JSON result per line to output"""
+        start = time.perf_counter()
+        routed = 0
+        chunk: List[Tuple[Any, str]] = []
+
+        def flush() -> None:
+            nonlocal routed
+            for (request_id, _), matches in zip(chunk, self._score_chunk([query for _, query in chunk])):
+                output.write(json.dumps({
+                    'request_id': request_id,
+                    'agents': [{'name': name, 'score': round(score, 6)} for score, name in matches]
+                }, ensure_ascii=False) + '\n')
+            routed += len(chunk)
+            chunk.clear()
+
+        for request in read_requests(lines):
+            chunk.append(request)
+            if len(chunk) >= self.chunk_size:
+                flush()
+        if chunk:
+            flush()
+
+        elapsed = time.perf_counter() - start
+        return {
+            'requests': routed,
+            'seconds': elapsed,
+            'queries_per_second': routed / elapsed if elapsed > 0 else 0.0,
+            'engine': 'numpy' if self.use_numpy else 'python',
+            'chunk_size': self.chunk_size
+        }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Agent Checkpoint
+Persistent results of workflow steps, keyed by their inputs
+
+Each successful step is saved as one JSON file per workflow and step, with
+the inputs it ran on: agent, query, the context built from its dependencies'
+responses, the sha256 of the agent's file and the backend and model. A
+re-run reuses a saved result only while all of these are unchanged. A step
+whose inputs changed runs again, and because its new response becomes part
+of its dependents' context, everything downstream of it is invalidated in
+turn, so a run resumes from the first step that actually changed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+CHECKPOINT_VERSION = 1
+
+# Default checkpoint directory under an agent system's output_dir
+CHECKPOINT_DIR = 'workflow_checkpoints'
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^\w\-.]', '_', name).strip('.') or 'step'
+
+class WorkflowCheckpoint:
+    """Directory of saved step results, one file per workflow and step"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        # sha256 of agent files by (path, mtime_ns, size), so each file is read once per change
+        self._file_hashes: Dict[Tuple[str, int, int], str] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'saved': 0}
+
+    def agent_hash(self, agent: Optional[Dict[str, Any]]) -> Optional[str]:
+        """sha256 of the file an agent was loaded from, None when it has none"""
+        if not agent or not agent.get('file_path'):
+            return None
+        path = str(agent['file_path'])
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key not in self._file_hashes:
+            with open(path, 'rb') as f:
+                self._file_hashes[key] = hashlib.sha256(f.read()).hexdigest()
+        return self._file_hashes[key]
+
+    def step_inputs(self, system: Any, agent_name: str, query: str, context: str) -> Dict[str, Any]:
+        """Everything a step's result depends on
+
+        The backend is identified by its class and model rather than its URL,
+        so restarting a local server on another port keeps the checkpoints.
+        """
+        backend = getattr(system, 'backend', None)
+        return {
+            'agent': agent_name,
+            'agent_sha256': self.agent_hash(system.get_agent(agent_name)),
+            'query': query,
+            'context': context,
+            'backend': None if backend is None else type(backend).__name__,
+            'model': getattr(backend, 'model', None)
+        }
+
+    @staticmethod
+    def input_key(inputs: Dict[str, Any]) -> str:
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def step_file(self, workflow_name: str, step_id: str) -> Path:
+        return self.directory / _safe_name(workflow_name) / f"{_safe_name(step_id)}.json"
+
+    def read(self, workflow_name: str, step_id: str) -> Optional[Dict[str, Any]]:
+        """The saved entry of a step whatever its inputs, or None"""
+        step_file = self.step_file(workflow_name, step_id)
+        try:
+            with open(step_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable workflow checkpoint {step_file}: {e}")
+            return None
+        if not isinstance(entry, dict) or entry.get('version') != CHECKPOINT_VERSION:
+            return None
+        return entry
+
+    def load(self, workflow_name: str, step_id: str, inputs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Saved result of a step if it ran on the same inputs, otherwise None"""
+        entry = self.read(workflow_name, step_id)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        if entry.get('key') != self.input_key(inputs):
+            self.stats['stale'] += 1
+            changed = sorted(name for name in inputs if entry.get('inputs', {}).get(name) != inputs[name])
+            logging.info(f"Checkpoint of {workflow_name}/{step_id} is stale ({', '.join(changed) or 'format'} changed)")
+            return None
+        self.stats['hits'] += 1
+        return entry
+
+    def save(self, workflow_name: str, step_id: str, inputs: Dict[str, Any], result: Dict[str, Any],
+             seconds: float) -> None:
+        """Atomically write a step's result; a failed write is logged, not raised"""
+        import tempfile
+
+        step_file = self.step_file(workflow_name, step_id)
+        entry = {'version': CHECKPOINT_VERSION, 'workflow': workflow_name, 'step': step_id,
+                 'key': self.input_key(inputs), 'inputs': inputs, 'seconds': seconds, 'result': result}
+        try:
+            step_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=step_file.parent, prefix=f'.{step_file.stem}.')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False, default=str)
+                os.replace(tmp_path, step_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self.stats['saved'] += 1
+        except Exception as e:
+            logging.error(f"Failed to save workflow checkpoint {step_file}: {e}")
+
+    def clear(self, workflow_name: str) -> int:
+        """Delete a workflow's saved steps, returning how many there were"""
+        removed = 0
+        for step_file in (self.directory / _safe_name(workflow_name)).glob('*.json'):
+            step_file.unlink()
+            removed += 1
+        return removed
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Agent Chunks
+Content-addressed storage of agent prompt sections
+
+Prompts and descriptions are split before each Markdown heading, so the
+sections join back to the original text exactly. In memory, a ChunkStore
+keeps one string object per distinct section and agents hold tuples of the
+shared strings. In deduplicated exports, each distinct section is written
+once under its sha256 digest and agents list the digests of their sections.
+"""
+
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+# Zero-width split points at the start of each Markdown heading line
+_SECTION_START = re.compile(r'(?m)^(?=#{1,6}[ \t])')
+
+# Agent fields stored as chunk references in deduplicated exports
+CHUNKED_FIELDS = ('description', 'system_prompt')
+
+def split_sections(text: str) -> List[str]:
+    """Split text before each heading line; ''.join(sections) == text"""
+    return [section for section in _SECTION_START.split(text) if section]
+
+def chunk_digest(chunk: str) -> str:
+    """Content address of a chunk"""
+    return hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+
+class ChunkStore:
+    """Keeps one copy of each distinct prompt section for the agents that share it"""
+
+    def __init__(self):
+        self._chunks: Dict[str, str] = {}
+
+    def share(self, text: str) -> str:
+        """Return the stored string equal to text, storing text if it is new"""
+        return self._chunks.setdefault(text, text)
+
+    def sections(self, text: str) -> Tuple[str, ...]:
+        """Split text into shared sections"""
+        return tuple(self.share(section) for section in split_sections(text))
+
+    def retain(self, chunks: Iterable[str]) -> None:
+        """Drop every stored section not in chunks, after agents were replaced or removed"""
+        live = {id(chunk) for chunk in chunks}
+        self._chunks = {text: chunk for text, chunk in self._chunks.items() if id(chunk) in live}
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def stored_characters(self) -> int:
+        """Total length of the distinct sections"""
+        return sum(len(chunk) for chunk in self._chunks)
+
+def deduplicate_agents(agents: Mapping[str, Mapping[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """Replace each agent's description and prompt by chunk digests, returning the agents and the chunks"""
+    chunks: Dict[str, str] = {}
+    digests: Dict[str, str] = {}
+    records = {}
+    for name, agent in agents.items():
+        record = {}
+        for key, value in agent.items():
+            if key not in CHUNKED_FIELDS or not isinstance(value, str):
+                record[key] = value
+                continue
+            references = []
+            for section in split_sections(value):
+                digest = digests.get(section)
+                if digest is None:
+                    digest = digests[section] = chunk_digest(section)
+                    chunks[digest] = section
+                references.append(digest)
+            record[f'{key}_chunks'] = references
+        records[name] = record
+    return records, chunks
+
+def expand_agents(export_data: Mapping[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Rebuild the agents of an export, deduplicated or not, with their full text"""
+    chunks = export_data.get('chunks')
+    if chunks is None:
+        return dict(export_data['agents'])
+    agents = {}
+    for name, record in export_data['agents'].items():
+        agent = {}
+        for key, value in record.items():
+            if key.endswith('_chunks') and key[:-len('_chunks')] in CHUNKED_FIELDS:
+                agent[key[:-len('_chunks')]] = ''.join(chunks[digest] for digest in value)
+            else:
+                agent[key] = value
+        agents[name] = agent
+    return agents
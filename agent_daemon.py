@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Agent Registry Daemon
+Keeps an AugmentAgentSystem warm and answers CLI requests over a local socket
+
+The protocol is one JSON object per line in each direction. A request names an
+operation ("op") and its arguments; a response carries "ok" and either
+"result" or "error". A line that is not a JSON object ends the connection.
+
+The Unix socket is only accessible to its owner. A TCP daemon is reachable
+by anyone who can connect to its port, so every request must carry the
+shared token from AGENT_DAEMON_TOKEN or, when that is unset, the one the
+daemon writes to agent_daemon.token in its output directory. The daemon
+never reads or writes a path chosen by the client outside its output
+directory; batch routing sends the request lines and returns the routes.
+
+Usage:
+    python augment_agent_integration.py --serve
+    python augment_agent_integration.py --serve --socket tcp://127.0.0.1:8765
+    python augment_agent_integration.py --list-agents      # forwarded while a daemon runs
+"""
+
+import hmac
+import io
+import json
+import logging
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Environment variable holding the shared TCP token, and the file a daemon writes it to otherwise
+TOKEN_ENV = 'AGENT_DAEMON_TOKEN'
+TOKEN_FILE = 'agent_daemon.token'
+
+class AgentDaemonError(RuntimeError):
+    """Raised when the daemon cannot be reached or rejects a request"""
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """Turn 'tcp://host:port' or a Unix socket path into (family, address)"""
+    if address.startswith('tcp://'):
+        host, _, port = address[len('tcp://'):].rpartition(':')
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    return socket.AF_UNIX, address
+
+def read_token(output_dir: str) -> Optional[str]:
+    """The shared TCP token from the environment or the daemon's token file, None when neither exists"""
+    token = os.environ.get(TOKEN_ENV)
+    if token:
+        return token
+    try:
+        with open(Path(output_dir) / TOKEN_FILE, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _write_token(output_dir: Path, token: str) -> Path:
+    """Write token to a file only its owner can read"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    token_file = output_dir / TOKEN_FILE
+    fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token + '\n')
+    os.chmod(token_file, 0o600)
+    return token_file
+
+def _confine(path: str, directory: Path) -> str:
+    """Resolve path, refusing anything outside directory"""
+    resolved = Path(path).resolve()
+    if not resolved.is_relative_to(directory.resolve()):
+        raise ValueError(f"Path {path} is outside the daemon output directory {directory}")
+    return str(resolved)
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers newline-delimited JSON requests until the client disconnects
+
+    The connection is closed after the first line that is not a JSON object
+    or that carries the wrong token.
+    """
+
+    def respond(self, response: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("Daemon requests must be JSON objects")
+            except ValueError as e:
+                logging.warning(f"Closing daemon connection after a malformed request: {e}")
+                self.respond({'ok': False, 'error': f"Malformed request: {e}"})
+                return
+            token = self.server.token
+            if token is not None and not hmac.compare_digest(str(request.get('token', '')).encode('utf-8'),
+                                                             token.encode('utf-8')):
+                logging.warning("Closing daemon connection after a request with an invalid token")
+                self.respond({'ok': False, 'error': "Invalid or missing daemon token"})
+                return
+            try:
+                response = {'ok': True, 'result': self.server.dispatch(request)}
+            except Exception as e:
+                logging.error(f"Daemon request failed: {e}")
+                response = {'ok': False, 'error': str(e)}
+            self.respond(response)
+
+class _DaemonMixin:
+    """Dispatches protocol operations to the warm agent system"""
+
+    system: Any = None
+    # Shared token every request must carry, None when the socket itself restricts access
+    token: Optional[str] = None
+    token_file: Optional[Path] = None
+
+    def dispatch(self, request: Dict[str, Any]) -> Any:
+        from augment_agent_integration import _agent_to_dict
+
+        op = request.get('op')
+        system = self.system
+        if op == 'ping':
+            return {'agents_dir': str(system.agents_dir.resolve()), 'total_agents': len(system.agents)}
+        if op == 'list':
+            text = system.format_agents_list()
+            output_file = system.save_agents_list(text) if text is not None and request.get('save') else None
+            return {'text': text, 'output_file': output_file}
+        if op == 'search':
+            return [_agent_to_dict(agent) for agent in system.search_agents(request['term'], request.get('search_in'))]
+        if op == 'route':
+            return [_agent_to_dict(agent) for agent in system.find_relevant_agents(request['query'],
+                                                                                   request.get('limit', 3))]
+        if op == 'execute':
+            return system.execute_agent(request['agent_name'], request['user_query'],
+                                        request.get('context', ''), request.get('save_output', False))
+        if op == 'stats':
+            return system.get_agent_statistics()
+        if op == 'validate':
+            return system.validate_agents()
+        if op == 'export':
+            return system.export_agents_data(request['format'], request.get('dedup', False), request.get('fields'),
+                                             request.get('compression'))
+        if op == 'save_mapped_registry':
+            path = request.get('path')
+            return system.save_mapped_registry(_confine(path, system.output_dir) if path else None)
+        if op == 'batch_route':
+            output = io.StringIO()
+            stats = system.route_requests(request['lines'], output, request.get('top_k', 3),
+                                          request.get('chunk_size', 1024))
+            return {'stats': stats, 'routes': output.getvalue()}
+        if op == 'reload':
+            return system.refresh()
+        raise ValueError(f"Unsupported daemon operation: {op}")
+
+class _UnixDaemonServer(_DaemonMixin, socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+class _TCPDaemonServer(_DaemonMixin, socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def create_server(system: Any, address: str, token: Optional[str] = None) -> socketserver.BaseServer:
+    """Bind a daemon server for system on address without starting it
+
+    The Unix socket is created with 0600 permissions. A TCP server requires
+    token, else AGENT_DAEMON_TOKEN, else a random token written to
+    agent_daemon.token in the system's output directory.
+    """
+    family, bind_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            # A socket file left by a daemon that did not shut down cleanly
+            if connect(address, timeout=0.5) is not None:
+                raise AgentDaemonError(f"A daemon is already serving {address}")
+            os.unlink(bind_address)
+        # Bind under a umask so the socket is never reachable by others, then drop the unused execute bit
+        old_umask = os.umask(0o077)
+        try:
+            server = _UnixDaemonServer(bind_address, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        os.chmod(bind_address, 0o600)
+    else:
+        server = _TCPDaemonServer(bind_address, _RequestHandler)
+        server.token = token or os.environ.get(TOKEN_ENV)
+        if not server.token:
+            server.token = secrets.token_urlsafe(32)
+            server.token_file = _write_token(Path(system.output_dir), server.token)
+    server.system = system
+    return server
+
+def serve(system: Any, address: str, watch_interval: float = 2.0) -> None:
+    """Serve requests for system on address until interrupted or terminated
+
+    Agent files are polled every watch_interval seconds so edits are served
+    without restarting the daemon; 0 disables polling.
+    """
+    server = create_server(system, address)
+    if watch_interval > 0:
+        system.watch(watch_interval)
+
+    def stop(signum: int, frame: Any) -> None:
+        raise KeyboardInterrupt
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, stop)
+
+    logging.info(f"Agent daemon serving {len(system.agents)} agents on {address}")
+    if server.token_file is not None:
+        logging.info(f"TCP clients authenticate with the token in {server.token_file}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watch_interval > 0:
+            system.stop_watching()
+        server.server_close()
+        family, bind_address = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(bind_address):
+            os.unlink(bind_address)
+        if server.token_file is not None and server.token_file.exists():
+            server.token_file.unlink()
+        logging.info("Agent daemon stopped")
+
+class RemoteAgentSystem:
+    """Client that exposes the AugmentAgentSystem calls used by the CLI over the daemon socket"""
+
+    def __init__(self, address: str, output_dir: str = "output", timeout: Optional[float] = None,
+                 request_timeout: Optional[float] = None, token: Optional[str] = None):
+        """timeout bounds connecting; request_timeout bounds each request, None waiting as long as it takes
+
+        TCP requests carry token, by default the one read_token finds for output_dir.
+        """
+        self.address = address
+        self.output_dir = Path(output_dir)
+        family, connect_address = parse_address(address)
+        self.token = (token or read_token(output_dir)) if family != socket.AF_UNIX else None
+        self._socket = socket.socket(family, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        try:
+            self._socket.connect(connect_address)
+        except OSError as e:
+            self._socket.close()
+            raise AgentDaemonError(f"Cannot connect to agent daemon at {address}: {e}")
+        self._socket.settimeout(request_timeout)
+        self._file = self._socket.makefile('rwb')
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def request(self, op: str, **arguments: Any) -> Any:
+        """Send one request and return its result"""
+        try:
+            request = dict(arguments, op=op)
+            if self.token is not None:
+                request['token'] = self.token
+            self._file.write(json.dumps(request).encode('utf-8') + b'\n')
+            self._file.flush()
+            line = self._file.readline()
+        except OSError as e:
+            raise AgentDaemonError(f"Agent daemon connection failed: {e}")
+        if not line:
+            raise AgentDaemonError("Agent daemon closed the connection")
+        response = json.loads(line)
+        if not response['ok']:
+            raise AgentDaemonError(response['error'])
+        return response['result']
+
+    def list_agents(self, save_to_file: bool = False) -> Optional[str]:
+        listing = self.request('list', save=save_to_file)
+        print(listing['text'] if listing['text'] is not None else "No agents loaded")
+        return listing['output_file']
+
+    def search_agents(self, search_term: str, search_in: List[str] = None) -> List[Dict[str, Any]]:
+        return self.request('search', term=search_term, search_in=search_in)
+
+    def find_relevant_agents(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        return self.request('route', query=query, limit=limit)
+
+    def execute_agent(self, agent_name: str, user_query: str, context: str = "",
+                      save_output: bool = False) -> Dict[str, Any]:
+        return self.request('execute', agent_name=agent_name, user_query=user_query,
+                            context=context, save_output=save_output)
+
+    def get_agent_statistics(self) -> Dict[str, Any]:
+        return self.request('stats')
+
+    def validate_agents(self) -> Dict[str, List[str]]:
+        return self.request('validate')
+
+    def export_agents_data(self, format_type: str = 'json', dedup: bool = False,
+                           fields: Optional[List[str]] = None, compression: Optional[str] = None) -> str:
+        return self.request('export', format=format_type, dedup=dedup, fields=fields, compression=compression)
+
+    def save_mapped_registry(self, path: Optional[str] = None) -> str:
+        # The daemon may run from another directory, so send an absolute path; it must be in its output_dir
+        return self.request('save_mapped_registry', path=os.path.abspath(path) if path else None)
+
+    def batch_route(self, input_path: str, output_path: Optional[str] = None, top_k: int = 3,
+                    chunk_size: int = 1024) -> Dict[str, Any]:
+        """Route input_path through the daemon, reading and writing the files here"""
+        if output_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = str(self.output_dir / f'batch_routes_{timestamp}.jsonl')
+        with open(input_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        routed = self.request('batch_route', lines=lines, top_k=top_k, chunk_size=chunk_size)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(routed['routes'])
+        return dict(routed['stats'], output_file=output_path)
+
+def connect(address: str, agents_dir: Optional[str] = None, output_dir: str = "output",
+            timeout: float = 2.0, request_timeout: Optional[float] = None,
+            token: Optional[str] = None) -> Optional[RemoteAgentSystem]:
+    """Connect to a running daemon, or return None when none serves agents_dir at address
+
+    timeout bounds only connecting and the ping probe; later requests wait
+    up to request_timeout, by default as long as the operation takes. A TCP
+    daemon that rejects the token is treated as not running.
+    """
+    family, connect_address = parse_address(address)
+    if family == socket.AF_UNIX and not os.path.exists(connect_address):
+        return None
+    try:
+        remote = RemoteAgentSystem(address, output_dir, timeout, request_timeout, token)
+    except AgentDaemonError:
+        return None
+    try:
+        remote._socket.settimeout(timeout)
+        served_dir = remote.request('ping')['agents_dir']
+        remote._socket.settimeout(request_timeout)
+    except (AgentDaemonError, ValueError):
+        remote.close()
+        return None
+    if agents_dir is not None and Path(served_dir) != Path(agents_dir).resolve():
+        remote.close()
+        return None
+    return remote
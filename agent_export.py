@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Agent Export
+Streaming writers for agent exports
+
+JSON Lines, CSV and YAML multi-document exports are written one agent at a
+time, so memory use does not grow with the registry and output reaches
+disk as it is produced. Any export can be compressed with gzip or lzma, and
+a field projection leaves out fields such as system prompts, which lazily
+loaded agents then never read from disk.
+"""
+
+import csv
+import json
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence
+
+from agent_record import AGENT_FIELDS
+
+# Formats written one agent at a time
+STREAMING_FORMATS = ('jsonl', 'csv', 'yaml-stream')
+
+EXPORT_FORMATS = ('json', 'yaml') + STREAMING_FORMATS
+
+# File name suffix of each compression
+COMPRESSIONS = {'gzip': '.gz', 'lzma': '.xz'}
+
+# gzip's command line default and a middle lzma preset: on agent exports the
+# slowest levels compress a few percent smaller at several times the cost
+GZIP_LEVEL = 6
+LZMA_PRESET = 3
+
+# Columns of CSV exports without a field projection
+CSV_COLUMNS = ('Name', 'Category', 'Description', 'Tools', 'File Path')
+
+def parse_fields(fields: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """Validate a field projection, accepting a comma-separated string or a list"""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    fields = list(dict.fromkeys(field.strip() for field in fields if field.strip()))
+    unknown = [field for field in fields if field not in AGENT_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unsupported export fields: {', '.join(unknown) or '(none)'}; "
+                         f"choose from {', '.join(AGENT_FIELDS)}")
+    return fields
+
+def open_export(path: str, compression: Optional[str] = None) -> IO[str]:
+    """Open an export file for text writing, compressing it when asked"""
+    if compression is None:
+        return open(path, 'w', encoding='utf-8', newline='')
+    if compression == 'gzip':
+        import gzip
+
+        return gzip.open(path, 'wt', compresslevel=GZIP_LEVEL, encoding='utf-8', newline='')
+    if compression == 'lzma':
+        import lzma
+
+        return lzma.open(path, 'wt', preset=LZMA_PRESET, encoding='utf-8', newline='')
+    raise ValueError(f"Unsupported export compression: {compression}")
+
+def project(agent: Any, fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Plain dict of an agent's fields, or of only the given ones"""
+    if fields is None:
+        return agent.to_dict() if hasattr(agent, 'to_dict') else dict(agent)
+    return {field: agent[field] for field in fields if field in agent}
+
+def write_jsonl(agents: Iterable[Any], f: IO[str], fields: Optional[Sequence[str]] = None) -> int:
+    """Write one JSON object per agent and line, returning the number of agents"""
+    count = 0
+    for agent in agents:
+        f.write(json.dumps(project(agent, fields), ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value)
+    return value
+
+def write_csv(agents: Iterable[Any], f: IO[str], fields: Optional[Sequence[str]] = None) -> int:
+    """Write a header and one CSV row per agent, returning the number of agents
+
+    Without fields the columns are CSV_COLUMNS, with descriptions on one line.
+    """
+    writer = csv.writer(f)
+    count = 0
+    if fields is None:
+        writer.writerow(CSV_COLUMNS)
+        for agent in agents:
+            writer.writerow([
+                agent['name'],
+                agent['category'],
+                agent['description'].replace('\n', ' ').strip(),
+                ', '.join(agent['tools']) if agent['tools'] else '',
+                agent['file_path']
+            ])
+            count += 1
+        return count
+
+    writer.writerow(fields)
+    for agent in agents:
+        writer.writerow([_csv_value(agent.get(field)) for field in fields])
+        count += 1
+    return count
+
+def write_yaml_stream(agents: Iterable[Any], f: IO[str], fields: Optional[Sequence[str]] = None) -> int:
+    """Write one YAML document per agent, returning the number of agents"""
+    import yaml
+
+    dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+    count = 0
+    for agent in agents:
+        yaml.dump(project(agent, fields), f, Dumper=dumper, explicit_start=True,
+                  default_flow_style=False, allow_unicode=True)
+        count += 1
+    return count
+
+STREAM_WRITERS = {'jsonl': write_jsonl, 'csv': write_csv, 'yaml-stream': write_yaml_stream}
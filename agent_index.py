@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Agent Index
+In-memory indexes over loaded agents for routing queries to agents
+"""
+
+import heapq
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Query terms that boost specific agents regardless of their descriptions
+RESEARCH_TERMS = {
+    'literature': ['literature-synthesizer', 'paper-finder', 'citation-analyzer'],
+    'statistical': ['statistical-analyst', 'statistical-consultant'],
+    'analysis': ['statistical-analyst', 'data-visualizer', 'results-interpreter'],
+    'writing': ['academic-writer', 'research-documenter'],
+    'ideas': ['research-ideator', 'hypothesis-generator'],
+    'experiment': ['experiment-planner', 'methodology-designer'],
+    'data': ['data-visualizer', 'statistical-analyst', 'ml-researcher']
+}
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Scores are compared at this many decimals so equal sums of impacts tie
+# regardless of the order they were added in
+SCORE_DECIMALS = 9
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    return _TOKEN_PATTERN.findall(text.lower())
+
+def rank_impacts(term_impacts: List[Tuple[float, Dict[Any, float]]], limit: int,
+                 order: Any) -> List[Tuple[float, Any]]:
+    """Return up to limit (score, key) pairs from per-term impacts, best first, ties by order[key]
+
+    Each entry is a term's largest impact and its impact per key. Terms are
+    accumulated strongest first. Once the terms still to come cannot lift an
+    unscored key to the current top results, only the existing candidates
+    that can still make it are updated.
+    """
+    if limit <= 0:
+        return []
+    term_impacts = sorted((entry for entry in term_impacts if entry[1]), key=lambda entry: -entry[0])
+
+    # Upper bound on what the terms from each position onward can still add
+    bounds = [0.0] * (len(term_impacts) + 1)
+    for position in range(len(term_impacts) - 1, -1, -1):
+        bounds[position] = bounds[position + 1] + term_impacts[position][0]
+
+    tolerance = 10 ** -SCORE_DECIMALS
+    scores: Dict[Any, float] = {}
+    for position, (_, impacts) in enumerate(term_impacts):
+        remaining = bounds[position]
+        threshold = heapq.nlargest(limit, scores.values())[-1] - tolerance if len(scores) >= limit else None
+        if threshold is not None and remaining < threshold:
+            scores = {key: score + impacts.get(key, 0.0) for key, score in scores.items()
+                      if score + remaining >= threshold}
+        else:
+            for key, impact in impacts.items():
+                scores[key] = scores.get(key, 0.0) + impact
+
+    top = heapq.nlargest(limit, ((round(score, SCORE_DECIMALS), -order[key], key)
+                                 for key, score in scores.items()))
+    return [(score, key) for score, _, key in top]
+
+class AgentRouter:
+    """BM25 ranking of agents over an inverted index of their descriptions
+
+    Each query term contributes a precomputed impact per agent: the BM25 score
+    of the term in the agent's description, plus name_weight when the term is
+    one of the agent's name tokens, plus term_boost when research_terms maps the
+    term to the agent. Impacts are cached per term and rebuilt lazily after the
+    index changes, and the top results are selected with a heap.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, name_weight: float = 2.0,
+                 term_boost: float = 5.0, research_terms: Optional[Dict[str, List[str]]] = None):
+        self.k1 = k1
+        self.b = b
+        self.name_weight = name_weight
+        self.term_boost = term_boost
+        self.research_terms = RESEARCH_TERMS if research_terms is None else research_terms
+        self._boosted: Dict[str, Set[str]] = {
+            term: set(agent_names) for term, agent_names in self.research_terms.items()}
+
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._name_postings: Dict[str, Set[str]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        self._total_length = 0
+        self._impacts: Dict[str, Tuple[float, Dict[str, float]]] = {}
+        # Posting containers may be shared with copies; None means all are owned
+        self._owned: Optional[Set[Tuple[bool, str]]] = None
+
+    @classmethod
+    def from_agents(cls, agents: Iterable[Dict[str, Any]], **weights: Any) -> 'AgentRouter':
+        """Build a router over agents in registry order"""
+        router = cls(**weights)
+        for agent in agents:
+            router.add(agent)
+        return router
+
+    def copy(self) -> 'AgentRouter':
+        """Return an independent router that shares posting lists until either side changes them"""
+        clone = AgentRouter(self.k1, self.b, self.name_weight, self.term_boost, self.research_terms)
+        clone._postings = dict(self._postings)
+        clone._name_postings = dict(self._name_postings)
+        clone._doc_lengths = dict(self._doc_lengths)
+        clone._doc_terms = dict(self._doc_terms)
+        clone._order = dict(self._order)
+        clone._next_order = self._next_order
+        clone._total_length = self._total_length
+        clone._owned = set()
+        self._owned = set()
+        return clone
+
+    def _own(self, table: Dict[str, Any], is_name: bool, term: str) -> Any:
+        """Posting container for term that this router may modify, copying a shared one first"""
+        container = table[term]
+        if self._owned is not None and (is_name, term) not in self._owned:
+            container = table[term] = container.copy()
+            self._owned.add((is_name, term))
+        return container
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, agent: Dict[str, Any]) -> None:
+        """Index an agent, replacing any agent already indexed under the same name"""
+        name = agent['name']
+        # A replaced agent keeps its registry position, like a dict key does
+        order = self._order.get(name)
+        if order is not None:
+            self.remove(name)
+        else:
+            order = self._next_order
+            self._next_order += 1
+
+        term_counts: Dict[str, int] = {}
+        # An empty description: key parses to None, and YAML may give non-strings
+        tokens = tokenize(str(agent.get('description') or ''))
+        for token in tokens:
+            term_counts[token] = term_counts.get(token, 0) + 1
+        for term, count in term_counts.items():
+            if term in self._postings:
+                self._own(self._postings, False, term)[name] = count
+            else:
+                self._postings[term] = {name: count}
+                if self._owned is not None:
+                    self._owned.add((False, term))
+
+        name_terms = set(tokenize(str(name or '')))
+        for term in name_terms:
+            if term in self._name_postings:
+                self._own(self._name_postings, True, term).add(name)
+            else:
+                self._name_postings[term] = {name}
+                if self._owned is not None:
+                    self._owned.add((True, term))
+
+        self._doc_lengths[name] = len(tokens)
+        self._doc_terms[name] = (set(term_counts), name_terms)
+        self._order[name] = order
+        self._total_length += len(tokens)
+        self._impacts.clear()
+
+    def remove(self, name: str) -> None:
+        """Drop an agent from the index"""
+        if name not in self._doc_lengths:
+            return
+        description_terms, name_terms = self._doc_terms.pop(name)
+        for term in description_terms:
+            postings = self._own(self._postings, False, term)
+            del postings[name]
+            if not postings:
+                del self._postings[term]
+        for term in name_terms:
+            names = self._own(self._name_postings, True, term)
+            names.discard(name)
+            if not names:
+                del self._name_postings[term]
+
+        self._total_length -= self._doc_lengths.pop(name)
+        del self._order[name]
+        self._impacts.clear()
+
+    def agent_names(self) -> List[str]:
+        """Indexed agent names in registry order"""
+        return sorted(self._order, key=self._order.__getitem__)
+
+    def term_impacts(self, term: str) -> Dict[str, float]:
+        """Score contribution of a query term to each agent it touches"""
+        return self._term_impacts(term)[1]
+
+    def _term_impacts(self, term: str) -> Tuple[float, Dict[str, float]]:
+        """Largest impact of a term and its impact on each agent it touches"""
+        cached = self._impacts.get(term)
+        if cached is not None:
+            return cached
+
+        impacts: Dict[str, float] = {}
+        postings = self._postings.get(term)
+        if postings:
+            doc_count = len(self._doc_lengths)
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            average_length = self._total_length / doc_count if doc_count else 0.0
+            k1, b = self.k1, self.b
+            for name, tf in postings.items():
+                norm = k1 * (1 - b + b * self._doc_lengths[name] / average_length) if average_length else k1
+                impacts[name] = idf * tf * (k1 + 1) / (tf + norm)
+        for name in self._name_postings.get(term, ()):
+            impacts[name] = impacts.get(name, 0.0) + self.name_weight
+        for name in self._boosted.get(term, ()):
+            if name in self._order:
+                impacts[name] = impacts.get(name, 0.0) + self.term_boost
+
+        impacts = {name: impact for name, impact in impacts.items() if impact > 0}
+        cached = (max(impacts.values(), default=0.0), impacts)
+        self._impacts[term] = cached
+        return cached
+
+    def vocabulary(self) -> Set[str]:
+        """Every query term that can have an impact on some agent"""
+        return set(self._postings) | set(self._name_postings) | set(self._boosted)
+
+    def search(self, query: str, limit: int = 3) -> List[Tuple[float, str]]:
+        """Return up to limit (score, agent name) pairs, best first, ties in registry order"""
+        if limit <= 0:
+            return []
+        term_impacts = [self._term_impacts(term) for term in dict.fromkeys(tokenize(query))]
+        return rank_impacts(term_impacts, limit, self._order)
+
+class AgentSearchIndex:
+    """Trigram index over the lowercased searchable fields of each agent
+
+    Matches are exactly those of a case-insensitive substring scan over
+    str(agent[field]); trigrams only narrow the candidates that are checked.
+    """
+
+    FIELDS = ('name', 'description', 'category')
+
+    def __init__(self):
+        self._texts: Dict[str, Dict[str, str]] = {field: {} for field in self.FIELDS}
+        self._grams: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.FIELDS}
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        # Trigram sets may be shared with copies; None means all are owned
+        self._owned: Optional[Set[Tuple[str, str]]] = None
+
+    @classmethod
+    def from_agents(cls, agents: Iterable[Dict[str, Any]]) -> 'AgentSearchIndex':
+        """Build a search index over agents in registry order"""
+        index = cls()
+        for agent in agents:
+            index.add(agent)
+        return index
+
+    def copy(self) -> 'AgentSearchIndex':
+        """Return an independent index that shares trigram sets until either side changes them"""
+        clone = AgentSearchIndex()
+        clone._texts = {field: dict(texts) for field, texts in self._texts.items()}
+        clone._grams = {field: dict(grams) for field, grams in self._grams.items()}
+        clone._order = dict(self._order)
+        clone._next_order = self._next_order
+        clone._owned = set()
+        self._owned = set()
+        return clone
+
+    def _own(self, field: str, gram: str) -> Set[str]:
+        """Trigram set that this index may modify, copying a shared one first"""
+        grams = self._grams[field]
+        names = grams[gram]
+        if self._owned is not None and (field, gram) not in self._owned:
+            names = grams[gram] = set(names)
+            self._owned.add((field, gram))
+        return names
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    @staticmethod
+    def _trigrams(text: str) -> Set[str]:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, agent: Dict[str, Any]) -> None:
+        """Index an agent, replacing any agent already indexed under the same name"""
+        name = agent['name']
+        # A replaced agent keeps its registry position, like a dict key does
+        order = self._order.get(name)
+        if order is not None:
+            self.remove(name)
+        else:
+            order = self._next_order
+            self._next_order += 1
+
+        for field in self.FIELDS:
+            text = str(agent[field]).lower()
+            self._texts[field][name] = text
+            grams = self._grams[field]
+            for gram in self._trigrams(text):
+                if gram not in grams:
+                    grams[gram] = {name}
+                    if self._owned is not None:
+                        self._owned.add((field, gram))
+                elif self._owned is None:
+                    grams[gram].add(name)
+                else:
+                    self._own(field, gram).add(name)
+        self._order[name] = order
+
+    def remove(self, name: str) -> None:
+        """Drop an agent from the index"""
+        if name not in self._order:
+            return
+        for field in self.FIELDS:
+            grams = self._grams[field]
+            for gram in self._trigrams(self._texts[field].pop(name)):
+                names = self._own(field, gram)
+                names.discard(name)
+                if not names:
+                    del grams[gram]
+        del self._order[name]
+
+    def search(self, search_term: str, fields: Iterable[str]) -> List[str]:
+        """Names of agents whose given indexed fields contain search_term, in registry order"""
+        term = search_term.lower()
+        term_grams = self._trigrams(term)
+        matches: Set[str] = set()
+        for field in dict.fromkeys(fields):
+            texts = self._texts[field]
+            if term_grams:
+                posting_sets = []
+                for gram in term_grams:
+                    names = self._grams[field].get(gram)
+                    if not names:
+                        break
+                    posting_sets.append(names)
+                else:
+                    posting_sets.sort(key=len)
+                    candidates = posting_sets[0].intersection(*posting_sets[1:])
+                    matches.update(name for name in candidates if name not in matches and term in texts[name])
+            else:
+                # Terms shorter than a trigram are checked against every agent
+                matches.update(name for name, text in texts.items() if term in text)
+        return sorted(matches, key=self._order.__getitem__)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Agent Logging
+Queue-based logging setup for the agent system
+
+Log calls only put records on a queue; a background listener thread formats
+them and writes them to the console as text and to a size-rotated log file as
+JSON lines. Fields passed with extra={...} are kept as top-level JSON keys.
+setup_logging() only creates the handlers when the first record is logged, so
+quiet one-shot commands never import logging.handlers and socket.
+"""
+
+import atexit
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Rotate agent_system.log at this size, keeping this many older files
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: Optional['logging.handlers.QueueListener'] = None
+# Held while the first record starts the listener, so threads logging at once start only one
+_setup_lock = threading.Lock()
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def start_queue_logging(log_file: Path, level: int = logging.INFO, logger: Optional[logging.Logger] = None,
+                        max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT,
+                        console: bool = True) -> 'logging.handlers.QueueListener':
+    """Route logger (the root logger by default) through a queue to console and rotating JSON file handlers"""
+    import logging.handlers
+
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                        encoding='utf-8')
+    file_handler.setFormatter(JsonLinesFormatter())
+    handlers = [file_handler]
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(stream_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    logger = logger if logger is not None else logging.getLogger()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(level)
+    listener.start()
+    return listener
+
+class _SetupOnFirstRecord(logging.Handler):
+    """Placeholder root handler that starts queued logging when the first record reaches it"""
+
+    def __init__(self, log_file: Path):
+        super().__init__()
+        self.log_file = log_file
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        global _listener
+        root = logging.getLogger()
+        if _listener is None:
+            with _setup_lock:
+                if _listener is None:
+                    # Swap this placeholder for the queue handler in one assignment: the root logger
+                    # is never without handlers (logging.info() would call basicConfig) and never
+                    # has both, so no concurrent record is lost or written twice
+                    staging = logging.Logger(__name__)
+                    _listener = start_queue_logging(self.log_file, root.level, logger=staging)
+                    root.handlers = [handler for handler in root.handlers if handler is not self] + staging.handlers
+                    # Flush queued records before the interpreter exits
+                    atexit.register(_listener.stop)
+        for handler in [handler for handler in root.handlers if handler is not self]:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+def setup_logging(output_dir: Path, verbose: bool = False) -> None:
+    """Configure process-wide logging once, like logging.basicConfig
+
+    Nothing changes when the root logger already has handlers, so embedding
+    applications and test runners keep their own configuration.
+    """
+    root = logging.getLogger()
+    if _listener is not None or root.handlers:
+        return
+    root.setLevel(logging.DEBUG if verbose else logging.INFO)
+    root.addHandler(_SetupOnFirstRecord(Path(output_dir) / 'agent_system.log'))
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Agent Mapped Registry
+Binary registry snapshot that worker processes share through mmap
+
+A snapshot file holds a string table, one fixed-size record per agent with
+the offsets of its fields, agent names sorted for binary search, and the
+routing index: each query term with the final BM25 impact it has on every
+agent it touches, as computed by AgentRouter. Workers open the file with
+MappedRegistry, which maps it read-only, so every process reading the same
+file shares one copy of it in the page cache instead of parsing the agent
+tree and building the router itself. Lookups and routing read the mapped
+buffer directly and decode only the agents they return.
+
+Routing results equal those of the AgentRouter the snapshot was written from.
+Snapshots are written to a temporary file and renamed into place, so workers
+that still map an older snapshot keep reading it unchanged.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from agent_index import AgentRouter, rank_impacts, tokenize
+from agent_record import AGENT_FIELDS, AgentRecord
+
+MAPPED_REGISTRY_MAGIC = b'AGNTSNAP'
+
+# Bump whenever the file layout changes
+MAPPED_REGISTRY_VERSION = 1
+
+MAPPED_REGISTRY_FILE = 'agent_registry.snapshot'
+
+# magic, version, agent/name/term counts, metadata (offset, length), then the
+# offsets of the agent records, name table, term table and the two posting arrays
+_HEADER = struct.Struct('<8sIIIIQIQQQQQ')
+
+# Kinds of a stored field value
+_KIND_STR, _KIND_NONE, _KIND_JSON = 0, 1, 2
+
+# (offset, length, kind) of each field in AGENT_FIELDS order
+_FIELD = 'QIB'
+_AGENT = struct.Struct('<' + _FIELD * len(AGENT_FIELDS))
+
+# agent id of each name, in byte order of the names
+_NAME = struct.Struct('<I')
+
+# term (offset, length), largest impact, first posting, posting count
+_TERM = struct.Struct('<QIdQI')
+
+# Routed terms whose impacts are kept decoded per process
+TERM_CACHE_SIZE = 1024
+
+class _StringTable:
+    """Concatenated UTF-8 strings, each distinct value stored once"""
+
+    def __init__(self, base: int):
+        self.base = base
+        self.size = 0
+        self.chunks: List[bytes] = []
+        self._offsets: Dict[bytes, int] = {}
+
+    def add(self, data: bytes) -> Tuple[int, int]:
+        offset = self._offsets.get(data)
+        if offset is None:
+            offset = self._offsets[data] = self.base + self.size
+            self.chunks.append(data)
+            self.size += len(data)
+        return offset, len(data)
+
+    def add_value(self, value: Any) -> Tuple[int, int, int]:
+        if value is None:
+            return 0, 0, _KIND_NONE
+        if isinstance(value, str):
+            return (*self.add(value.encode('utf-8')), _KIND_STR)
+        return (*self.add(json.dumps(value, default=str).encode('utf-8')), _KIND_JSON)
+
+def _pad(size: int, alignment: int = 8) -> int:
+    return -size % alignment
+
+def write_mapped_registry(agents: Mapping[str, AgentRecord], router: AgentRouter, path: str,
+                          metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Write agents and the routing index of router to path atomically and return the path"""
+    names = router.agent_names()
+    ids = {name: agent_id for agent_id, name in enumerate(names)}
+    terms = sorted((term.encode('utf-8'), term) for term in router.vocabulary())
+    routed = [(encoded, router.term_impacts(term)) for encoded, term in terms]
+    routed = [(encoded, impacts) for encoded, impacts in routed if impacts]
+    posting_count = sum(len(impacts) for _, impacts in routed)
+    named = sorted((name.encode('utf-8'), ids[name]) for name in names if isinstance(name, str))
+
+    # Fixed-size sections come first so their offsets are known before the strings
+    agents_offset = _HEADER.size
+    names_offset = agents_offset + _AGENT.size * len(names)
+    terms_offset = names_offset + _NAME.size * len(named)
+    ids_offset = terms_offset + _TERM.size * len(routed)
+    impacts_offset = ids_offset + 4 * posting_count
+    impacts_offset += _pad(impacts_offset)
+    strings = _StringTable(impacts_offset + 8 * posting_count)
+
+    agent_records = bytearray()
+    for name in names:
+        agent = agents[name]
+        fields = []
+        for field in AGENT_FIELDS:
+            fields.extend(strings.add_value(agent.get(field)))
+        agent_records += _AGENT.pack(*fields)
+
+    term_records = bytearray()
+    posting_ids: List[int] = []
+    posting_impacts: List[float] = []
+    for encoded, impacts in routed:
+        term_records += _TERM.pack(*strings.add(encoded), max(impacts.values()), len(posting_ids), len(impacts))
+        postings = sorted((ids[name], impact) for name, impact in impacts.items())
+        posting_ids.extend(agent_id for agent_id, _ in postings)
+        posting_impacts.extend(impact for _, impact in postings)
+
+    meta = strings.add(json.dumps(metadata or {}).encode('utf-8'))
+    header = _HEADER.pack(MAPPED_REGISTRY_MAGIC, MAPPED_REGISTRY_VERSION, len(names), len(named), len(routed),
+                          *meta, agents_offset, names_offset, terms_offset, ids_offset, impacts_offset)
+
+    path = str(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.agent_registry.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(agent_records)
+            f.write(b''.join(_NAME.pack(agent_id) for _, agent_id in named))
+            f.write(term_records)
+            f.write(struct.pack(f'<{posting_count}I', *posting_ids))
+            f.write(b'\0' * (impacts_offset - ids_offset - 4 * posting_count))
+            f.write(struct.pack(f'<{posting_count}d', *posting_impacts))
+            f.writelines(strings.chunks)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logging.info(f"Saved mapped registry of {len(names)} agents to {path}")
+    return path
+
+class MappedRegistry:
+    """Read-only view of a registry snapshot file mapped into memory
+
+    get_agent and find_relevant_agents answer like the AugmentAgentSystem the
+    file was written from. The impacts of recently routed terms are kept
+    decoded; everything else is read from the mapping on each call.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except BaseException:
+            self._mmap.close()
+            raise
+        self._impacts: Dict[str, Tuple[float, Dict[int, float]]] = {}
+
+    def _open(self) -> None:
+        buffer = self._mmap
+        if len(buffer) < _HEADER.size:
+            raise ValueError(f"Not a mapped agent registry: {self.path}")
+        (magic, version, self._agent_count, self._name_count, self._term_count, meta_offset, meta_length,
+         self._agents_offset, self._names_offset, self._terms_offset, self._ids_offset,
+         self._impacts_offset) = _HEADER.unpack_from(buffer)
+        if magic != MAPPED_REGISTRY_MAGIC:
+            raise ValueError(f"Not a mapped agent registry: {self.path}")
+        if version != MAPPED_REGISTRY_VERSION:
+            raise ValueError(f"Unsupported mapped agent registry version {version}: {self.path}")
+        self.metadata = json.loads(buffer[meta_offset:meta_offset + meta_length])
+        self._view = memoryview(buffer)
+
+    def close(self) -> None:
+        self._impacts.clear()
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'MappedRegistry':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._agent_count
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and self._find_name(name) is not None
+
+    def _value(self, offset: int, length: int, kind: int) -> Any:
+        if kind == _KIND_NONE:
+            return None
+        text = str(self._mmap[offset:offset + length], 'utf-8')
+        return text if kind == _KIND_STR else json.loads(text)
+
+    def _agent_fields(self, agent_id: int) -> List[Any]:
+        fields = _AGENT.unpack_from(self._mmap, self._agents_offset + agent_id * _AGENT.size)
+        return [self._value(*fields[i:i + 3]) for i in range(0, len(fields), 3)]
+
+    def _agent(self, agent_id: int) -> AgentRecord:
+        return AgentRecord(*self._agent_fields(agent_id))
+
+    def _agent_name(self, agent_id: int) -> Any:
+        return self._value(*_AGENT.unpack_from(self._mmap, self._agents_offset + agent_id * _AGENT.size)[:3])
+
+    def _find_name(self, name: str) -> Optional[int]:
+        """Binary search of the name table for the agent id of name"""
+        target = name.encode('utf-8')
+        buffer, agents_offset = self._mmap, self._agents_offset
+        low, high = 0, self._name_count
+        while low < high:
+            middle = (low + high) // 2
+            agent_id, = _NAME.unpack_from(buffer, self._names_offset + middle * _NAME.size)
+            offset, length = struct.unpack_from('<QI', buffer, agents_offset + agent_id * _AGENT.size)
+            candidate = buffer[offset:offset + length]
+            if candidate == target:
+                return agent_id
+            if candidate < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def agent_names(self) -> List[Any]:
+        """Agent names in registry order"""
+        return [self._agent_name(agent_id) for agent_id in range(self._agent_count)]
+
+    def get_agent(self, name: str) -> Optional[AgentRecord]:
+        """Get a specific agent by name"""
+        agent_id = self._find_name(name) if isinstance(name, str) else None
+        return None if agent_id is None else self._agent(agent_id)
+
+    def _postings(self, start: int, count: int) -> Tuple[Any, Any]:
+        """Agent ids and impacts of count postings from start, as views of the mapping where possible"""
+        ids_start = self._ids_offset + 4 * start
+        impacts_start = self._impacts_offset + 8 * start
+        if sys.byteorder == 'little':
+            return (self._view[ids_start:ids_start + 4 * count].cast('I'),
+                    self._view[impacts_start:impacts_start + 8 * count].cast('d'))
+        return (struct.unpack_from(f'<{count}I', self._mmap, ids_start),
+                struct.unpack_from(f'<{count}d', self._mmap, impacts_start))
+
+    def _term_impacts(self, term: str) -> Tuple[float, Dict[int, float]]:
+        """Largest impact of a term and its impact on each agent id it touches"""
+        cached = self._impacts.get(term)
+        if cached is not None:
+            return cached
+
+        target = term.encode('utf-8')
+        buffer = self._mmap
+        cached = (0.0, {})
+        low, high = 0, self._term_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, largest, start, count = _TERM.unpack_from(buffer, self._terms_offset + middle * _TERM.size)
+            candidate = buffer[offset:offset + length]
+            if candidate == target:
+                ids, impacts = self._postings(start, count)
+                cached = (largest, dict(zip(ids, impacts)))
+                break
+            if candidate < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        if len(self._impacts) >= TERM_CACHE_SIZE:
+            self._impacts.clear()
+        self._impacts[term] = cached
+        return cached
+
+    def _rank(self, query: str, limit: int) -> List[Tuple[float, int]]:
+        term_impacts = [self._term_impacts(term) for term in dict.fromkeys(tokenize(query))]
+        return rank_impacts(term_impacts, limit, range(self._agent_count))
+
+    def route(self, query: str, limit: int = 3) -> List[Tuple[float, Any]]:
+        """Return up to limit (score, agent name) pairs, best first, ties in registry order"""
+        return [(score, self._agent_name(agent_id)) for score, agent_id in self._rank(query, limit)]
+
+    def find_relevant_agents(self, query: str, limit: int = 3) -> List[AgentRecord]:
+        """Find the most relevant agents for a query"""
+        return [self._agent(agent_id) for _, agent_id in self._rank(query, limit)]
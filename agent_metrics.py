@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Agent Metrics
+Stage timers and event counters for the agent system
+
+Timers use the monotonic perf_counter_ns clock and keep only a call count, a
+total and a maximum per stage, so instrumenting a hot path costs one clock read
+on each side and a short locked update.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+class StageMetrics:
+    """Thread-safe per-stage timings and named counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[int]] = {}
+        self._counters: Dict[str, int] = {}
+
+    def stage(self, name: str) -> '_StageTimer':
+        """Context manager timing the enclosed block as one call of stage name"""
+        return _StageTimer(self, name)
+
+    def add_time(self, name: str, elapsed_ns: int, calls: int = 1,
+                 max_ns: Optional[int] = None) -> None:
+        """Record calls of stage name that took elapsed_ns in total"""
+        longest = elapsed_ns if max_ns is None else max_ns
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                self._stages[name] = [calls, elapsed_ns, longest]
+            else:
+                stage[0] += calls
+                stage[1] += elapsed_ns
+                if longest > stage[2]:
+                    stage[2] = longest
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Add amount to counter name"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def reset(self) -> None:
+        """Forget all timings and counts"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable copy of the timings in milliseconds and the counters"""
+        with self._lock:
+            stages = {name: list(values) for name, values in self._stages.items()}
+            counters = dict(self._counters)
+        return {
+            'stages': {
+                name: {
+                    'calls': calls,
+                    'total_ms': total_ns / 1e6,
+                    'mean_ms': total_ns / calls / 1e6 if calls else 0.0,
+                    'max_ms': max_ns / 1e6
+                }
+                for name, (calls, total_ns, max_ns) in stages.items()
+            },
+            'counters': counters
+        }
+
+class _StageTimer:
+    """Times one block for StageMetrics.stage; cheaper than a generator-based context manager"""
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: StageMetrics, name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.metrics.add_time(self.name, time.perf_counter_ns() - self.start)
+
+def format_profile(profile: Dict[str, Any]) -> str:
+    """Render a metrics snapshot as a per-stage table, slowest stage first"""
+    lines = ["⏱️  Stage Profile:", "=" * 62,
+             f"{'Stage':<24}{'Calls':>8}{'Total ms':>11}{'Mean ms':>10}{'Max ms':>9}"]
+    for name, stage in sorted(profile['stages'].items(), key=lambda item: -item[1]['total_ms']):
+        lines.append(f"{name:<24}{stage['calls']:>8}{stage['total_ms']:>11.3f}"
+                     f"{stage['mean_ms']:>10.3f}{stage['max_ms']:>9.3f}")
+    if profile['counters']:
+        lines.append("\nCounters:")
+        for name, value in sorted(profile['counters'].items()):
+            lines.append(f"  • {name}: {value}")
+    return '\n'.join(lines)
+
+def save_profile(profile: Dict[str, Any], output_path: str) -> None:
+    """Write a metrics snapshot as JSON for trend tracking"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
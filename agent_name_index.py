@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Agent Name Index
+Small on-disk index that lets one-shot CLI calls skip the agent tree walk
+
+The index holds every agent as a LazyAgent, which pickles without its system
+prompt and records the byte offset where the prompt starts, and the mtimes of the agent files and of the
+directories containing them. A loader re-stats those paths instead of walking
+and parsing the tree: an edited file changes its own mtime or size, and an
+added, removed or renamed file changes its directory's mtime. Any mismatch
+makes the index unusable and the caller falls back to a full load, which
+writes a fresh index.
+
+The file holds a small header pickle (directories and whether any path was
+racily written) followed by the agents, so a full load that changed no files
+can confirm the index is current by reading the header alone.
+
+Hidden directories such as .git and __pycache__ directories change on their
+own all the time and are not watched, so a new agent file added inside one is
+only seen by a full load. Edits to files already indexed there are still seen.
+"""
+
+import logging
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Mapping, Optional
+
+from agent_record import AgentRecord, LazyAgent
+
+# Bump whenever the index layout changes
+NAME_INDEX_VERSION = 3
+
+NAME_INDEX_FILE = 'agent_name_index.pickle'
+
+# Paths modified this close to the index write time may have changed within
+# one mtime tick, so the index is not trusted for them
+RACY_WINDOW_NS = 2_000_000_000
+
+def _directory_mtimes(agents_dir: Path, output_dir: Path) -> Dict[str, int]:
+    """mtime of every watched directory under agents_dir; output_dir changes on every run and is skipped too"""
+    excluded = os.path.realpath(output_dir)
+    directories = {}
+    for root, dirnames, _ in os.walk(agents_dir):
+        dirnames[:] = [dirname for dirname in dirnames
+                       if not dirname.startswith('.') and dirname != '__pycache__'
+                       and os.path.realpath(os.path.join(root, dirname)) != excluded]
+        directories[root] = os.stat(root).st_mtime_ns
+    return directories
+
+def build_name_index(agents_dir: Path, output_dir: Path, file_entries: Dict[str, Dict[str, Any]],
+                     agents: Mapping[str, AgentRecord]) -> Dict[str, Any]:
+    """Index agents, in registry order, against the file entries they were loaded from"""
+    written_at_ns = time.time_ns()
+    directories = _directory_mtimes(agents_dir, output_dir)
+    files = {path: (entry['mtime_ns'], entry['size']) for path, entry in file_entries.items()}
+    racy_after_ns = written_at_ns - RACY_WINDOW_NS
+    racy = (any(mtime_ns >= racy_after_ns for mtime_ns in directories.values())
+            or any(mtime_ns >= racy_after_ns for mtime_ns, _ in files.values()))
+    return {
+        'version': NAME_INDEX_VERSION,
+        'agents_directory': str(agents_dir.resolve()),
+        'racy': racy,
+        'directories': directories,
+        'files': files,
+        'agents': {name: LazyAgent.from_record(agent, file_entries[agent.file_path]['body_offset'])
+                   for name, agent in agents.items()}
+    }
+
+def _read_header(f: BinaryIO, agents_dir: Path) -> Optional[Dict[str, Any]]:
+    """Read the header and return it if it is usable for agents_dir and no directory changed"""
+    header = pickle.load(f)
+    if (not isinstance(header, dict) or header.get('version') != NAME_INDEX_VERSION
+            or header.get('agents_directory') != str(agents_dir.resolve()) or header['racy']):
+        return None
+    for directory, mtime_ns in header['directories'].items():
+        if os.stat(directory).st_mtime_ns != mtime_ns:
+            return None
+    return header
+
+def name_index_is_current(index_file: Path, agents_dir: Path) -> bool:
+    """Whether the index on disk is usable as far as its header tells, without reading the agents
+
+    A caller that knows no agent file changed since the index was written can
+    skip rewriting it when this is true.
+    """
+    try:
+        with open(index_file, 'rb') as f:
+            return _read_header(f, agents_dir) is not None
+    except Exception:
+        return False
+
+def load_name_index(index_file: Path, agents_dir: Path) -> Optional[Dict[str, Any]]:
+    """Load the index if every indexed path is unchanged since it was written, else None"""
+    try:
+        with open(index_file, 'rb') as f:
+            header = _read_header(f, agents_dir)
+            if header is None:
+                return None
+            body = pickle.load(f)
+        for path, (mtime_ns, size) in body['files'].items():
+            stat = os.stat(path)
+            if stat.st_mtime_ns != mtime_ns or stat.st_size != size:
+                return None
+    except FileNotFoundError:
+        return None
+    except OSError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable agent name index {index_file}: {e}")
+        return None
+    return dict(header, **body)
+
+def save_name_index(index: Dict[str, Any], index_file: Path) -> None:
+    """Atomically write the index next to the registry cache"""
+    import tempfile
+
+    header = {key: index[key] for key in ('version', 'agents_directory', 'racy', 'directories')}
+    body = {'files': index['files'], 'agents': index['agents']}
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=index_file.parent, prefix='.agent_name_index.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(body, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, index_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logging.debug(f"Saved agent name index to {index_file}")
+    except Exception as e:
+        logging.error(f"Failed to save agent name index: {e}")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Agent Record
+Compact agent record types for the agent registry
+
+Records keep their fields in slots instead of a per-agent dict and intern
+the color, category and tool strings, so agents share one copy of each. They
+read like the dicts they replace: record['tools'], record.get('color'),
+'system_prompt' in record, dict(record) and record.items() all work, with the
+keys in the order the dicts had.
+"""
+
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Field order of the dicts agents used to be, kept for exports and listings
+AGENT_FIELDS = ('name', 'description', 'color', 'tools', 'system_prompt', 'file_path', 'category')
+
+_FIELD_SET = frozenset(AGENT_FIELDS)
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if type(value) is str else value
+
+def _normalize_newlines(raw: bytes) -> str:
+    """Decode agent file bytes the way text-mode reads do"""
+    return raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+class AgentRecord:
+    """One agent's metadata and system prompt with read-only dict-style access
+
+    A system prompt of None leaves the field out, like a dict without the key.
+    """
+
+    __slots__ = AGENT_FIELDS
+
+    def __init__(self, name: Optional[str], description: Any, color: Any, tools: Any,
+                 system_prompt: Optional[str], file_path: str, category: str):
+        self.name = name
+        self.description = description
+        self.color = _intern(color)
+        self.tools = [_intern(tool) for tool in tools] if isinstance(tools, list) else tools
+        if system_prompt is not None:
+            self.system_prompt = system_prompt
+        self.file_path = file_path
+        self.category = _intern(category)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Rebuilding through __init__ interns the strings again after unpickling
+        return (AgentRecord, (self.name, self.description, self.color, self.tools,
+                              _SLOT_SYSTEM_PROMPT.__get__(self) if self._has_prompt() else None,
+                              self.file_path, self.category))
+
+    def _has_prompt(self) -> bool:
+        """Whether the prompt is held, without loading a deferred one"""
+        try:
+            _SLOT_SYSTEM_PROMPT.__get__(self)
+        except AttributeError:
+            return False
+        return True
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in _FIELD_SET and (key != 'system_prompt' or self._has_prompt())
+
+    def keys(self) -> List[str]:
+        """Fields that are set, without loading a deferred system prompt"""
+        if self._has_prompt():
+            return list(AGENT_FIELDS)
+        return [field for field in AGENT_FIELDS if field != 'system_prompt']
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def values(self) -> List[Any]:
+        return [self[key] for key in self.keys()]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, self[key]) for key in self.keys()]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a plain dict for serialization, loading a deferred system prompt"""
+        if 'system_prompt' not in self:
+            return {'name': self.name, 'description': self.description, 'color': self.color, 'tools': self.tools,
+                    'file_path': self.file_path, 'category': self.category}
+        return {'name': self.name, 'description': self.description, 'color': self.color, 'tools': self.tools,
+                'system_prompt': self.system_prompt, 'file_path': self.file_path, 'category': self.category}
+
+    def __eq__(self, other: object) -> bool:
+        # Compares the fields that are set, like dicts compare their keys
+        if isinstance(other, AgentRecord):
+            return dict(self.items()) == dict(other.items())
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+_SLOT_SYSTEM_PROMPT = AgentRecord.system_prompt
+
+class LazyAgent(AgentRecord):
+    """Agent record whose system prompt is read from the agent file on first access"""
+
+    __slots__ = ('body_offset',)
+
+    def __init__(self, name: Optional[str], description: Any, color: Any, tools: Any,
+                 file_path: str, category: str, body_offset: int):
+        super().__init__(name, description, color, tools, None, file_path, category)
+        self.body_offset = body_offset
+
+    @classmethod
+    def from_record(cls, record: AgentRecord, body_offset: int) -> 'LazyAgent':
+        """Wrap a record's metadata, dropping any system prompt it holds"""
+        return cls(record.name, record.description, record.color, record.tools, record.file_path,
+                   record.category, body_offset)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # The prompt stays on disk
+        return (LazyAgent, (self.name, self.description, self.color, self.tools, self.file_path,
+                            self.category, self.body_offset))
+
+    @property
+    def system_prompt(self) -> str:
+        try:
+            return _SLOT_SYSTEM_PROMPT.__get__(self)
+        except AttributeError:
+            pass
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.body_offset)
+            system_prompt = _normalize_newlines(f.read()).strip()
+        _SLOT_SYSTEM_PROMPT.__set__(self, system_prompt)
+        return system_prompt
+
+    def __contains__(self, key: object) -> bool:
+        return key in _FIELD_SET
+
+class ChunkedAgent(AgentRecord):
+    """Agent record whose system prompt is kept as sections shared with other agents
+
+    The prompt is joined from its sections on each access, so identical
+    sections cost memory once however many agents contain them.
+    """
+
+    __slots__ = ('prompt_chunks',)
+
+    def __init__(self, name: Optional[str], description: Any, color: Any, tools: Any,
+                 prompt_chunks: Tuple[str, ...], file_path: str, category: str):
+        super().__init__(name, description, color, tools, None, file_path, category)
+        self.prompt_chunks = prompt_chunks
+
+    @classmethod
+    def from_record(cls, record: AgentRecord, store: Any) -> 'ChunkedAgent':
+        """Split a record's prompt into sections of store, sharing its description too"""
+        description = store.share(record.description) if isinstance(record.description, str) else record.description
+        return cls(record.name, description, record.color, record.tools, store.sections(record.system_prompt),
+                   record.file_path, record.category)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Pickle memoizes the shared section strings, so a cache stores each once
+        return (ChunkedAgent, (self.name, self.description, self.color, self.tools, self.prompt_chunks,
+                               self.file_path, self.category))
+
+    def _has_prompt(self) -> bool:
+        return True
+
+    @property
+    def system_prompt(self) -> str:
+        return ''.join(self.prompt_chunks)
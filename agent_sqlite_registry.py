@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Agent SQLite Registry
+Optional agent registry kept in a SQLite database
+
+Agents, their tools and categories are stored in indexed tables together
+with the mtime, size and sha256 of the file each agent came from. sync()
+walks the agents directory and upserts only the files that changed, so a
+large catalog is parsed once and then kept current incrementally, and
+queries read only the rows they return.
+
+Searches and routing run as FTS5 queries. A trigram table over the name,
+description and category narrows search_agents to candidates that are then
+checked for the exact substring, so matches equal those of the in-memory
+search. A second table holds each description as the tokens AgentRouter
+indexes; routing ranks it with SQLite's bm25() and adds the router's name
+and research term boosts. SQLite's BM25 uses its own constants, so close
+calls may rank differently from the in-memory router.
+
+When several files define the same name, the file walked last wins, as in
+a full load. Only the winning agents are active in searches and routing.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agent_index import AgentRouter, SCORE_DECIMALS, tokenize
+from agent_record import AgentRecord
+from augment_agent_integration import (CACHE_RACY_WINDOW_NS, AugmentAgentSystem, RegistrySnapshot,
+                                       _load_agent_file)
+
+# Bump whenever the schema or the stored agent layout changes; older databases are rebuilt
+SQLITE_SCHEMA_VERSION = 1
+
+SEARCH_FIELDS = ('name', 'description', 'category')
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE files (
+    path TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT,
+    racy INTEGER NOT NULL
+);
+CREATE TABLE categories (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE tools (id INTEGER PRIMARY KEY, name NOT NULL UNIQUE);
+CREATE TABLE agents (
+    id INTEGER PRIMARY KEY,
+    file_path TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL,
+    active INTEGER NOT NULL DEFAULT 0,
+    name,
+    description,
+    color,
+    tools TEXT NOT NULL,
+    category_id INTEGER NOT NULL REFERENCES categories(id)
+);
+-- Prompts are kept apart so agent rows stay small to scan and update
+CREATE TABLE agent_prompts (agent_id INTEGER PRIMARY KEY REFERENCES agents(id), system_prompt);
+CREATE INDEX agents_name ON agents(name);
+CREATE INDEX agents_active ON agents(active, position);
+CREATE TABLE agent_tools (
+    agent_id INTEGER NOT NULL REFERENCES agents(id),
+    position INTEGER NOT NULL,
+    tool_id INTEGER NOT NULL REFERENCES tools(id),
+    PRIMARY KEY (agent_id, position)
+);
+CREATE INDEX agent_tools_tool ON agent_tools(tool_id);
+CREATE TABLE agent_name_terms (
+    term TEXT NOT NULL,
+    agent_id INTEGER NOT NULL REFERENCES agents(id),
+    PRIMARY KEY (term, agent_id)
+) WITHOUT ROWID;
+CREATE INDEX agent_name_terms_agent ON agent_name_terms(agent_id);
+CREATE VIRTUAL TABLE agent_search USING fts5(name, description, category, tokenize='trigram');
+CREATE VIRTUAL TABLE agent_route USING fts5(terms, tokenize='unicode61')
+"""
+
+# Dropped in this order when the schema is rebuilt
+_TABLES = ('agent_route', 'agent_search', 'agent_name_terms', 'agent_tools', 'agent_prompts', 'agents', 'tools', 'categories',
+           'files', 'meta')
+
+_SELECT_AGENTS = ('SELECT a.name, a.description, a.color, a.tools, p.system_prompt, a.file_path, c.name '
+                  'FROM agents a JOIN categories c ON c.id = a.category_id '
+                  'LEFT JOIN agent_prompts p ON p.agent_id = a.id')
+
+def _sql_value(value: Any) -> Any:
+    """Frontmatter values SQLite cannot hold natively are stored as JSON text"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return json.dumps(value, default=str)
+
+def _record(row: Tuple[Any, ...]) -> AgentRecord:
+    name, description, color, tools, system_prompt, file_path, category = row
+    return AgentRecord(name, description, color, json.loads(tools), system_prompt, file_path, category)
+
+def _fts_phrase(text: str) -> str:
+    """Quote text as one FTS5 string"""
+    return '"' + text.replace('"', '""') + '"'
+
+class SQLiteAgentRegistry:
+    """Agent registry stored in a SQLite database and synced from an agents directory"""
+
+    def __init__(self, db_path: str, agents_dir: str = ".", routing_weights: Optional[Dict[str, Any]] = None):
+        self.db_path = str(db_path)
+        self.agents_dir = Path(agents_dir)
+        # Boosts follow the same defaults and overrides as the in-memory router
+        router = AgentRouter(**(routing_weights or {}))
+        self.name_weight = router.name_weight
+        self.term_boost = router.term_boost
+        self.research_terms = router.research_terms
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._open_schema()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's connection, so a daemon's readers never see a sync in progress"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # Readers keep answering from the last committed sync while another connection writes
+            conn.execute('PRAGMA journal_mode=WAL')
+            # The database can always be rebuilt from the agent files, so commits need not wait for fsync
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _open_schema(self) -> None:
+        """Create the schema, or rebuild it when it is from another version or agents directory"""
+        conn = self._conn
+        directory = str(self.agents_dir.resolve())
+        try:
+            meta = dict(conn.execute('SELECT key, value FROM meta'))
+        except sqlite3.OperationalError:
+            meta = {}
+        if meta.get('schema_version') == str(SQLITE_SCHEMA_VERSION) and meta.get('agents_directory') == directory:
+            return
+        if meta:
+            logging.info(f"Rebuilding agent database {self.db_path}")
+        with conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table in _TABLES:
+                if table in tables:
+                    conn.execute(f'DROP TABLE {table}')
+            for statement in _SCHEMA.split(';'):
+                conn.execute(statement)
+            conn.executemany('INSERT INTO meta (key, value) VALUES (?, ?)',
+                             [('schema_version', str(SQLITE_SCHEMA_VERSION)), ('agents_directory', directory),
+                              ('generation', '0')])
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every sync that changed the registry"""
+        return int(self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+    def sync(self) -> Dict[str, List[str]]:
+        """Upsert agent files added or changed since the last sync and drop deleted ones
+
+        Files are re-read only when their mtime or size changed, or when they
+        were written too close to the previous sync to trust the mtime; those
+        are re-hashed and reused when the content is the same. Files with
+        parse errors are read again on every sync so their errors are reported.
+        Returns the affected file paths by kind of change.
+        """
+        changes: Dict[str, List[str]] = {'added': [], 'changed': [], 'removed': []}
+        conn = self._conn
+        started_ns = time.time_ns()
+        agent_files = list(self.agents_dir.rglob("*.md")) if self.agents_dir.exists() else []
+
+        with conn:
+            known = {row[0]: row[1:] for row in conn.execute(
+                'SELECT path, position, mtime_ns, size, sha256, racy FROM files')}
+            affected_names = set()
+            moved = False
+            for position, agent_file in enumerate(agent_files):
+                path = str(agent_file)
+                entry = known.pop(path, None)
+                try:
+                    stat = agent_file.stat()
+                except OSError as e:
+                    logging.error(f"Error loading agent {agent_file}: {e}")
+                    continue
+                if entry is not None and entry[0] != position:
+                    moved = True
+                    conn.execute('UPDATE files SET position = ? WHERE path = ?', (position, path))
+                    conn.execute('UPDATE agents SET position = ? WHERE file_path = ?', (position, path))
+                if entry is not None and entry[1:3] == (stat.st_mtime_ns, stat.st_size) and not entry[4]:
+                    continue
+
+                # Files that failed to parse are parsed again even when unchanged, to report their errors
+                trusted_sha256 = entry[3] if entry is not None and entry[1] != -1 else None
+                outcome = _load_agent_file(agent_file, trusted_sha256)
+                if 'load_error' in outcome:
+                    logging.error(f"Error loading agent {agent_file}: {outcome['load_error']}")
+                    continue
+                for error in outcome['errors']:
+                    logging.error(error)
+                trusted = outcome['reused'] or outcome['cacheable']
+                conn.execute('INSERT OR REPLACE INTO files (path, position, mtime_ns, size, sha256, racy) '
+                             'VALUES (?, ?, ?, ?, ?, ?)',
+                             (path, position, stat.st_mtime_ns if trusted else -1, stat.st_size,
+                              outcome['sha256'], stat.st_mtime_ns >= started_ns - CACHE_RACY_WINDOW_NS))
+                if outcome['reused'] or (entry is not None and entry[3] == outcome['sha256']):
+                    continue
+
+                changes['changed' if entry is not None else 'added'].append(path)
+                affected_names.update(self._delete_file_agent(path))
+                agent = outcome['agent']
+                if agent is not None:
+                    self._insert_agent(agent, position)
+                    affected_names.add(agent.name)
+
+            for path in known:
+                changes['removed'].append(path)
+                conn.execute('DELETE FROM files WHERE path = ?', (path,))
+                affected_names.update(self._delete_file_agent(path))
+
+            if moved:
+                # Walk order decides which of several same-named files wins
+                affected_names.update(row[0] for row in conn.execute(
+                    'SELECT name FROM agents GROUP BY name HAVING COUNT(*) > 1'))
+            for name in affected_names:
+                self._activate_winner(name)
+            if any(changes.values()):
+                conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+
+        if any(changes.values()):
+            logging.info(f"Synced agent database {self.db_path}: {len(changes['added'])} added, "
+                         f"{len(changes['changed'])} changed, {len(changes['removed'])} removed",
+                         extra={'event': 'agents_synced', **{kind: len(paths) for kind, paths in changes.items()}})
+        return changes
+
+    def _row_id(self, table: str, name: Any) -> int:
+        """Id of a category or tool row, inserting it when new"""
+        conn = self._conn
+        row = conn.execute(f'SELECT id FROM {table} WHERE name = ?', (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        return conn.execute(f'INSERT INTO {table} (name) VALUES (?)', (name,)).lastrowid
+
+    def _insert_agent(self, agent: AgentRecord, position: int) -> None:
+        conn = self._conn
+        agent_id = conn.execute(
+            'INSERT INTO agents (file_path, position, name, description, color, tools, category_id) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (agent.file_path, position, _sql_value(agent.name), _sql_value(agent.description),
+             _sql_value(agent.color), json.dumps(agent.tools, default=str),
+             self._row_id('categories', agent.category))).lastrowid
+        if 'system_prompt' in agent:
+            conn.execute('INSERT INTO agent_prompts (agent_id, system_prompt) VALUES (?, ?)',
+                         (agent_id, agent.system_prompt))
+        if isinstance(agent.tools, list):
+            conn.executemany('INSERT INTO agent_tools (agent_id, position, tool_id) VALUES (?, ?, ?)',
+                             [(agent_id, index, self._row_id('tools', _sql_value(tool)))
+                              for index, tool in enumerate(agent.tools)])
+        conn.executemany('INSERT INTO agent_name_terms (term, agent_id) VALUES (?, ?)',
+                         [(term, agent_id) for term in set(tokenize(agent.name or ''))])
+
+    def _delete_file_agent(self, path: str) -> List[Any]:
+        """Remove the agent defined by a file, returning its name if there was one"""
+        conn = self._conn
+        row = conn.execute('SELECT id, name, active FROM agents WHERE file_path = ?', (path,)).fetchone()
+        if row is None:
+            return []
+        agent_id, name, active = row
+        if active:
+            self._set_active(agent_id, False)
+        conn.execute('DELETE FROM agent_tools WHERE agent_id = ?', (agent_id,))
+        conn.execute('DELETE FROM agent_name_terms WHERE agent_id = ?', (agent_id,))
+        conn.execute('DELETE FROM agent_prompts WHERE agent_id = ?', (agent_id,))
+        conn.execute('DELETE FROM agents WHERE id = ?', (agent_id,))
+        return [name]
+
+    def _activate_winner(self, name: Any) -> None:
+        """Make the last walked agent with a name the active one"""
+        rows = self._conn.execute('SELECT id, active FROM agents WHERE name IS ? ORDER BY position DESC',
+                                  (_sql_value(name),)).fetchall()
+        for index, (agent_id, active) in enumerate(rows):
+            if bool(active) != (index == 0):
+                self._set_active(agent_id, index == 0)
+
+    def _set_active(self, agent_id: int, active: bool) -> None:
+        """Add an agent to the search tables or take it out"""
+        conn = self._conn
+        conn.execute('UPDATE agents SET active = ? WHERE id = ?', (int(active), agent_id))
+        if not active:
+            conn.execute('DELETE FROM agent_search WHERE rowid = ?', (agent_id,))
+            conn.execute('DELETE FROM agent_route WHERE rowid = ?', (agent_id,))
+            return
+        name, description, category = conn.execute(
+            'SELECT a.name, a.description, c.name FROM agents a JOIN categories c ON c.id = a.category_id '
+            'WHERE a.id = ?', (agent_id,)).fetchone()
+        # Searched like str(agent[field]).lower() in the in-memory index
+        conn.execute('INSERT INTO agent_search (rowid, name, description, category) VALUES (?, ?, ?, ?)',
+                     (agent_id, *(str(value).lower() for value in (name, description, category))))
+        terms = ' '.join(tokenize(description)) if isinstance(description, str) else ''
+        conn.execute('INSERT INTO agent_route (rowid, terms) VALUES (?, ?)', (agent_id, terms))
+
+    def _agents_by_ids(self, agent_ids: List[int]) -> List[AgentRecord]:
+        """Agents with the given ids, in that order"""
+        if not agent_ids:
+            return []
+        placeholders = ', '.join('?' * len(agent_ids))
+        rows = {row[0]: row[1:] for row in self._conn.execute(
+            _SELECT_AGENTS.replace('SELECT ', 'SELECT a.id, ', 1) + f' WHERE a.id IN ({placeholders})', agent_ids)}
+        return [_record(rows[agent_id]) for agent_id in agent_ids]
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM agents WHERE active').fetchone()[0]
+
+    def agent_names(self) -> List[Any]:
+        """Active agent names in walk order"""
+        return [row[0] for row in self._conn.execute('SELECT name FROM agents WHERE active ORDER BY position')]
+
+    def all_agents(self) -> Dict[Any, AgentRecord]:
+        """Every active agent by name, in walk order"""
+        rows = self._conn.execute(_SELECT_AGENTS + ' WHERE a.active ORDER BY a.position')
+        return {agent.name: agent for agent in map(_record, rows)}
+
+    def get_agent(self, name: str) -> Optional[AgentRecord]:
+        """Get a specific agent by name"""
+        row = self._conn.execute(_SELECT_AGENTS + ' WHERE a.name = ? AND a.active', (name,)).fetchone()
+        return _record(row) if row is not None else None
+
+    def search_agents(self, search_term: str, search_in: Optional[Iterable[str]] = None) -> List[AgentRecord]:
+        """Agents whose fields contain search_term, ignoring case, in walk order"""
+        fields = list(dict.fromkeys(SEARCH_FIELDS if search_in is None else search_in))
+        term = search_term.lower()
+        indexed = [field for field in fields if field in SEARCH_FIELDS]
+        other = [field for field in fields if field not in SEARCH_FIELDS]
+        conn = self._conn
+
+        matches = set()
+        if indexed:
+            columns = ', '.join(indexed)
+            if len(term) >= 3:
+                # Trigrams find the candidates; the substring check below decides
+                rows = conn.execute(f'SELECT rowid, {columns} FROM agent_search WHERE agent_search MATCH ?',
+                                    (f'{{{" ".join(indexed)}}} : {_fts_phrase(term)}',))
+            else:
+                rows = conn.execute(f'SELECT rowid, {columns} FROM agent_search')
+            matches.update(row[0] for row in rows if any(term in text for text in row[1:]))
+        if other:
+            # Fields outside the search table are scanned directly
+            for agent_id, agent in zip(*self._active_agents()):
+                if agent_id not in matches and any(field in agent and term in str(agent[field]).lower()
+                                                   for field in other):
+                    matches.add(agent_id)
+        if not matches:
+            return []
+        placeholders = ', '.join('?' * len(matches))
+        ordered = [row[0] for row in conn.execute(
+            f'SELECT id FROM agents WHERE id IN ({placeholders}) ORDER BY position', list(matches))]
+        return self._agents_by_ids(ordered)
+
+    def _active_agents(self) -> Tuple[List[int], List[AgentRecord]]:
+        rows = self._conn.execute(_SELECT_AGENTS.replace('SELECT ', 'SELECT a.id, ', 1) + ' WHERE a.active')
+        ids, agents = [], []
+        for row in rows:
+            ids.append(row[0])
+            agents.append(_record(row[1:]))
+        return ids, agents
+
+    def route(self, query: str, limit: int = 3) -> List[Tuple[float, Any]]:
+        """Return up to limit (score, agent name) pairs, best first, ties in walk order"""
+        return [(score, name) for _, score, name in self._route(query, limit)]
+
+    def _route(self, query: str, limit: int) -> List[Tuple[int, float, Any]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if limit <= 0 or not terms:
+            return []
+        # Number of query terms that boost each agent name
+        boosts: Dict[str, int] = {}
+        for term in terms:
+            for name in self.research_terms.get(term, ()):
+                boosts[name] = boosts.get(name, 0) + 1
+        term_list = ', '.join('?' * len(terms))
+        boost_list = ', '.join('(?, ?)' for _ in boosts) or '(NULL, 0)'
+        sql = f"""
+            WITH boosts(name, hits) AS (VALUES {boost_list}),
+            contributions(id, score) AS (
+                SELECT rowid, -bm25(agent_route) FROM agent_route WHERE agent_route MATCH ?
+                UNION ALL
+                SELECT agent_id, ? * COUNT(*) FROM agent_name_terms WHERE term IN ({term_list}) GROUP BY agent_id
+                UNION ALL
+                SELECT a.id, ? * b.hits FROM boosts b JOIN agents a ON a.name = b.name AND a.active
+            )
+            SELECT a.id, ROUND(SUM(c.score), {SCORE_DECIMALS}) AS total, a.name
+            FROM contributions c JOIN agents a ON a.id = c.id AND a.active
+            GROUP BY a.id HAVING total > 0
+            ORDER BY total DESC, a.position
+            LIMIT ?
+        """
+        parameters = [value for item in boosts.items() for value in item]
+        parameters += [' OR '.join(_fts_phrase(term) for term in terms), self.name_weight, *terms,
+                       self.term_boost, limit]
+        return self._conn.execute(sql, parameters).fetchall()
+
+    def find_relevant_agents(self, query: str, limit: int = 3) -> List[AgentRecord]:
+        """Find the most relevant agents for a query"""
+        return self._agents_by_ids([agent_id for agent_id, _, _ in self._route(query, limit)])
+
+    def statistics(self) -> Tuple[int, Dict[Any, int], Dict[Any, int]]:
+        """Active agent count, agents per category and uses of each tool"""
+        conn = self._conn
+        categories = dict(conn.execute(
+            'SELECT c.name, COUNT(*) FROM agents a JOIN categories c ON c.id = a.category_id '
+            'WHERE a.active GROUP BY c.name'))
+        tools_usage = dict(conn.execute(
+            'SELECT t.name, COUNT(*) FROM agent_tools at JOIN agents a ON a.id = at.agent_id '
+            'JOIN tools t ON t.id = at.tool_id WHERE a.active GROUP BY t.name'))
+        return len(self), categories, tools_usage
+
+class SQLiteAgentSystem(AugmentAgentSystem):
+    """AugmentAgentSystem whose registry lives in a SQLite database
+
+    Loading and refreshing sync the database with the agents directory.
+    Lookups, routing, searches and statistics are answered by queries; other
+    operations, such as exports and batch routing, read every agent from the
+    database on first use.
+    """
+
+    def __init__(self, db_path: str, agents_dir: str = ".", output_dir: str = "output", verbose: bool = False,
+                 routing_weights: Optional[Dict[str, Any]] = None, autoload: bool = True):
+        self.registry = SQLiteAgentRegistry(db_path, agents_dir, routing_weights)
+        self._loaded: Optional[RegistrySnapshot] = None
+        super().__init__(agents_dir, output_dir, verbose, routing_weights=routing_weights, autoload=autoload)
+
+    @property
+    def _snapshot(self) -> RegistrySnapshot:
+        """The whole registry read from the database, for operations not answered by queries"""
+        generation = self.registry.generation
+        snapshot = self._loaded
+        if snapshot is None or snapshot.generation != generation:
+            snapshot = self._loaded = RegistrySnapshot.build(self.registry.all_agents(), self.routing_weights,
+                                                             generation, build_router=False)
+        return snapshot
+
+    @_snapshot.setter
+    def _snapshot(self, snapshot: RegistrySnapshot) -> None:
+        # The database is the registry; snapshots set up by the base class are not used
+        pass
+
+    def load_agents(self) -> None:
+        """Sync the database with the agents directory"""
+        with self._reload_lock, self.metrics.stage('load_agents'):
+            self.registry.sync()
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """Sync the database with the agents directory and return the affected file paths"""
+        with self._reload_lock, self.metrics.stage('refresh'):
+            return self.registry.sync()
+
+    def get_agent(self, name: str) -> Optional[AgentRecord]:
+        """Get a specific agent by name"""
+        return self.registry.get_agent(name)
+
+    def find_relevant_agents(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Find the most relevant agents for a query"""
+        with self.metrics.stage('route'):
+            return self.registry.find_relevant_agents(query, limit)
+
+    def search_agents(self, search_term: str, search_in: List[str] = None) -> List[Dict[str, Any]]:
+        """Search agents by term in specified fields"""
+        with self.metrics.stage('search'):
+            return self.registry.search_agents(search_term, search_in)
+
+    def _usage_counts(self) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+        return self.registry.statistics()
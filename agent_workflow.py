@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Agent Workflow
+Declarative multi-agent workflows executed as a dependency graph
+
+A workflow is a list of steps, each naming an agent, a query template and the
+steps it depends on. It can be defined in Python or loaded from YAML:
+
+    name: literature-review
+    context:
+      topic: sparse time series forecasting
+    steps:
+      - id: papers
+        agent: paper-finder
+        query: Find key papers on {topic}.
+      - id: synthesis
+        agent: literature-synthesizer
+        depends_on: [papers]
+        query: Synthesize the literature on {topic}.
+
+Query templates are filled from the workflow context with str.format. A
+step starts as soon as every step it depends on has succeeded, so
+independent branches run in parallel on a thread or process pool. The
+responses of its dependencies reach a step as its execution context. The
+run report holds per-step timings and the critical path: the chain of
+dependent steps that bounds the run's wall time.
+
+A batch runs one instance of a workflow per context in a parameter file,
+all sharing one pool, and writes every step's result to a run directory
+with a summary.json for the job runner that started it.
+
+Usage:
+    python augment_agent_integration.py --run-workflow workflows/sparse_forecasting.yaml --backend mock
+    python augment_agent_integration.py --run-workflow workflows/sparse_forecasting.yaml --workflow-params contexts.yaml
+"""
+
+import json
+import logging
+import re
+import string
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+# Status of a step in a run report
+SUCCEEDED, FAILED, SKIPPED = 'succeeded', 'failed', 'skipped'
+
+WORKFLOW_EXECUTORS = ('thread', 'process')
+
+class WorkflowStep:
+    """One agent execution in a workflow"""
+
+    def __init__(self, id: str, agent: str, query: str, depends_on: Iterable[str] = (),
+                 label: Optional[str] = None, phase: Optional[int] = None, timeout: Optional[float] = None):
+        self.id = id
+        self.agent = agent
+        self.query = query
+        self.depends_on = list(depends_on)
+        self.label = label or id
+        self.phase = phase
+        self.timeout = timeout
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'WorkflowStep':
+        missing = [key for key in ('id', 'agent', 'query') if not data.get(key)]
+        if missing:
+            raise ValueError(f"Workflow step {data.get('id', '?')} is missing {', '.join(missing)}")
+        unknown = set(data) - {'id', 'agent', 'query', 'depends_on', 'label', 'phase', 'timeout'}
+        if unknown:
+            raise ValueError(f"Workflow step {data['id']} has unknown keys: {', '.join(sorted(unknown))}")
+        depends_on = data.get('depends_on') or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        return cls(str(data['id']), str(data['agent']), str(data['query']), [str(step) for step in depends_on],
+                   data.get('label'), data.get('phase'), data.get('timeout'))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'id': self.id, 'agent': self.agent, 'query': self.query, 'depends_on': self.depends_on,
+                'label': self.label, 'phase': self.phase, 'timeout': self.timeout}
+
+class Workflow:
+    """Named steps forming a directed acyclic graph, plus the context their queries are filled from
+
+    Raises ValueError for duplicate step ids, unknown dependencies, cycles and
+    query placeholders missing from the context.
+    """
+
+    def __init__(self, name: str, steps: Iterable[WorkflowStep], context: Optional[Mapping[str, Any]] = None,
+                 description: str = ''):
+        self.name = name
+        self.steps = list(steps)
+        self.context = dict(context or {})
+        self.description = description
+        self.step_map: Dict[str, WorkflowStep] = {}
+        for step in self.steps:
+            if step.id in self.step_map:
+                raise ValueError(f"Duplicate workflow step id: {step.id}")
+            self.step_map[step.id] = step
+        for step in self.steps:
+            unknown = [dependency for dependency in step.depends_on if dependency not in self.step_map]
+            if unknown:
+                raise ValueError(f"Workflow step {step.id} depends on unknown steps: {', '.join(unknown)}")
+            for _, field, _, _ in string.Formatter().parse(step.query):
+                if field is not None and field.split('.')[0].split('[')[0] not in self.context:
+                    raise ValueError(f"Workflow step {step.id} uses {{{field}}}, which the context does not define")
+        self.order = self._topological_order()
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'Workflow':
+        if not isinstance(data, Mapping) or not isinstance(data.get('steps'), list) or not data['steps']:
+            raise ValueError("A workflow needs a non-empty list of steps")
+        return cls(str(data.get('name', 'workflow')), [WorkflowStep.from_dict(step) for step in data['steps']],
+                   data.get('context'), data.get('description', ''))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'name': self.name, 'description': self.description, 'context': self.context,
+                'steps': [step.to_dict() for step in self.steps]}
+
+    def _topological_order(self) -> List[str]:
+        """Step ids with every step after its dependencies, in definition order where free"""
+        remaining = {step.id: len(set(step.depends_on)) for step in self.steps}
+        dependents: Dict[str, List[str]] = {step.id: [] for step in self.steps}
+        for step in self.steps:
+            for dependency in set(step.depends_on):
+                dependents[dependency].append(step.id)
+        ready = [step.id for step in self.steps if not remaining[step.id]]
+        order = []
+        while ready:
+            step_id = ready.pop(0)
+            order.append(step_id)
+            for dependent in dependents[step_id]:
+                remaining[dependent] -= 1
+                if not remaining[dependent]:
+                    ready.append(dependent)
+        if len(order) != len(self.steps):
+            cycle = sorted(step_id for step_id, count in remaining.items() if count)
+            raise ValueError(f"Workflow {self.name} has a dependency cycle through: {', '.join(cycle)}")
+        return order
+
+    def upstream(self, step_ids: Iterable[str]) -> List[str]:
+        """The given steps and every step they depend on, directly or not, in run order"""
+        step_ids = list(step_ids)
+        unknown = [step_id for step_id in step_ids if step_id not in self.step_map]
+        if unknown:
+            raise ValueError(f"Unknown workflow steps: {', '.join(sorted(unknown))}")
+        needed = set()
+        pending = step_ids
+        while pending:
+            step_id = pending.pop()
+            if step_id not in needed:
+                needed.add(step_id)
+                pending.extend(self.step_map[step_id].depends_on)
+        return [step_id for step_id in self.order if step_id in needed]
+
+    def render_query(self, step: WorkflowStep) -> str:
+        return step.query.format_map(self.context)
+
+    def with_context(self, context: Mapping[str, Any], name: Optional[str] = None) -> 'Workflow':
+        """Copy of this workflow with some context values replaced, optionally renamed"""
+        return Workflow(name or self.name, self.steps, {**self.context, **context}, self.description)
+
+def load_workflow(path: str) -> Workflow:
+    """Load a workflow definition from a YAML (or JSON) file"""
+    import yaml
+
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            data = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Invalid workflow file {path}: {e}") from e
+    return Workflow.from_dict(data)
+
+def load_workflow_parameters(path: str) -> List[Dict[str, Any]]:
+    """Load workflow instances from a YAML (or JSON) list or a JSONL file
+
+    Each entry is a mapping with an optional unique 'name' and a 'context'
+    mapping; an entry without 'context' is itself the context. Returns
+    {'name', 'context'} dicts, naming unnamed entries run-<n>.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if str(path).endswith('.jsonl'):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            import yaml
+
+            try:
+                entries = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"Invalid workflow parameter file {path}: {e}") from e
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"Workflow parameter file {path} must hold a non-empty list of contexts")
+
+    instances = []
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, Mapping):
+            raise ValueError(f"Workflow parameter entry {number} is not a mapping")
+        if 'context' in entry:
+            context = entry['context']
+        else:
+            context = {key: value for key, value in entry.items() if key != 'name'}
+        if not isinstance(context, Mapping):
+            raise ValueError(f"Workflow parameter entry {number} has a context that is not a mapping")
+        instances.append({'name': str(entry.get('name') or f"run-{number}"), 'context': dict(context)})
+    names = [instance['name'] for instance in instances]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate workflow parameter names: {', '.join(duplicates)}")
+    return instances
+
+def _execute_step(system: Any, agent_name: str, query: str, context: str, save_output: bool,
+                  timeout: Optional[float]) -> Dict[str, Any]:
+    """Execute one step and time it; start is wall-clock so process workers report comparable times"""
+    started = time.time()
+    start = time.perf_counter()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    result = system.execute_agent(agent_name, query, context, save_output, deadline)
+    return {'result': result, 'started': started, 'seconds': time.perf_counter() - start}
+
+_worker_system: Any = None
+
+def _init_process_worker(agents_dir: str, output_dir: str, backend: Any) -> None:
+    global _worker_system
+    from augment_agent_integration import AugmentAgentSystem
+
+    _worker_system = AugmentAgentSystem(agents_dir, output_dir, lazy_prompts=True, backend=backend)
+
+def _execute_step_in_process(*args: Any) -> Dict[str, Any]:
+    return _execute_step(_worker_system, *args)
+
+def _dependency_context(workflow: Workflow, step: WorkflowStep, steps: Dict[str, Dict[str, Any]]) -> str:
+    """Responses of a step's dependencies, labelled, as its execution context"""
+    parts = []
+    for dependency in dict.fromkeys(step.depends_on):
+        response = (steps.get(dependency, {}).get('result') or {}).get('response')
+        if response:
+            upstream = workflow.step_map[dependency]
+            parts.append(f"{upstream.label} ({upstream.agent}):\n{response}")
+    return '\n\n'.join(parts)
+
+def critical_path(workflow: Workflow, steps: Mapping[str, Mapping[str, Any]]) -> List[str]:
+    """Longest chain of dependent steps executed in this run, by their seconds"""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for step_id in workflow.order:
+        step = steps.get(step_id, {})
+        if step.get('status') in (None, SKIPPED) or step.get('cached'):
+            continue
+        upstream = [dependency for dependency in workflow.step_map[step_id].depends_on if dependency in finish]
+        before = max(upstream, key=finish.__getitem__, default=None)
+        previous[step_id] = before
+        finish[step_id] = (finish[before] if before else 0.0) + steps[step_id]['seconds']
+    if not finish:
+        return []
+    path = [max(finish, key=finish.__getitem__)]
+    while previous[path[-1]] is not None:
+        path.append(previous[path[-1]])
+    return path[::-1]
+
+class _WorkflowRun:
+    """Scheduling state of one workflow while its steps run"""
+
+    def __init__(self, workflow: Workflow, only: Optional[Iterable[str]] = None):
+        selected = set(workflow.step_map if only is None else only)
+        unknown = selected - set(workflow.step_map)
+        if unknown:
+            raise ValueError(f"Unknown workflow steps: {', '.join(sorted(unknown))}")
+        self.workflow = workflow
+        self.order = [step_id for step_id in workflow.order if step_id in selected]
+        self.waiting = {step_id: {dependency for dependency in workflow.step_map[step_id].depends_on
+                                  if dependency in selected}
+                        for step_id in self.order}
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.wall_seconds = 0.0
+
+    def take_ready(self) -> List[WorkflowStep]:
+        """Steps whose dependencies have all succeeded, marked as running"""
+        ready = []
+        for step_id in self.order:
+            if step_id not in self.steps and not self.waiting[step_id]:
+                self.steps[step_id] = {'status': 'running'}
+                ready.append(self.workflow.step_map[step_id])
+        return ready
+
+    def finish(self, step_id: str, outcome: Dict[str, Any], run_started: float, cached: bool = False) -> None:
+        result = outcome['result']
+        status = SUCCEEDED if result.get('success') else FAILED
+        self.steps[step_id] = {'status': status, 'start': max(0.0, outcome['started'] - run_started),
+                               'seconds': outcome['seconds'], 'result': result}
+        if cached:
+            self.steps[step_id]['cached'] = True
+        if status == SUCCEEDED:
+            for waiting in self.waiting.values():
+                waiting.discard(step_id)
+        else:
+            self.steps[step_id]['error'] = result.get('error')
+            self._skip_dependents(step_id)
+
+    def _skip_dependents(self, failed_id: str) -> None:
+        for step_id in self.order:
+            if step_id not in self.steps and failed_id in self.workflow.step_map[step_id].depends_on:
+                self.steps[step_id] = {'status': SKIPPED, 'error': f"Dependency {failed_id} did not succeed"}
+                self._skip_dependents(step_id)
+
+    def report(self, executor: str, max_workers: int) -> Dict[str, Any]:
+        workflow, steps = self.workflow, self.steps
+        path = critical_path(workflow, steps)
+        return {
+            'workflow': workflow.name,
+            'context': workflow.context,
+            'success': all(steps[step_id]['status'] == SUCCEEDED for step_id in self.order),
+            'executor': executor,
+            'max_workers': max_workers,
+            'order': self.order,
+            'steps': {step_id: {'agent': workflow.step_map[step_id].agent, 'label': workflow.step_map[step_id].label,
+                                'phase': workflow.step_map[step_id].phase,
+                                'depends_on': workflow.step_map[step_id].depends_on, **steps[step_id]}
+                      for step_id in self.order},
+            'cached_steps': sum(bool(step.get('cached')) for step in steps.values()),
+            'critical_path': path,
+            'critical_path_seconds': sum(steps[step_id]['seconds'] for step_id in path),
+            'serial_seconds': sum(step.get('seconds', 0.0) for step in steps.values()),
+            'wall_seconds': self.wall_seconds
+        }
+
+def run_workflows(system: Any, workflows: Iterable[Workflow], max_workers: int = 4, executor: str = 'thread',
+                  only: Optional[Iterable[str]] = None, save_output: bool = False,
+                  checkpoint: Optional[Any] = None) -> Dict[str, Any]:
+    """Execute several workflows as dependency graphs sharing one pool, returning their reports and throughput
+
+    Each step is submitted as soon as its dependencies have succeeded, to at
+    most max_workers threads or processes in total; process workers open
+    their own AugmentAgentSystem on the same agents and a copy of its
+    backend. Steps whose dependencies failed are skipped. only restricts
+    every run to the given step ids; their dependencies outside it count as
+    done, without output. Step start times are seconds from the start.
+
+    With an agent_checkpoint.WorkflowCheckpoint, steps whose inputs match a
+    saved result are not executed but reported as 'cached', and successful
+    steps are saved. only then also takes in the dependencies of the given
+    steps, so their responses come from the checkpoint, or from running
+    them again when theirs is missing or stale.
+    """
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+    if executor not in WORKFLOW_EXECUTORS:
+        raise ValueError(f"Unsupported workflow executor: {executor}")
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1: {max_workers}")
+    only = None if only is None else list(only)
+    runs = [_WorkflowRun(workflow, workflow.upstream(only) if checkpoint is not None and only is not None else only)
+            for workflow in workflows]
+
+    if executor == 'process':
+        import multiprocessing
+
+        # Forked workers would share the parent's pooled backend sockets and its
+        # logging queue; spawned ones unpickle a backend with their own connections
+        pool = ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_process_worker,
+                                   initargs=(str(system.agents_dir), str(system.output_dir), system.backend))
+        execute, target = _execute_step_in_process, ()
+    else:
+        pool = ThreadPoolExecutor(max_workers, thread_name_prefix='workflow-step')
+        execute, target = _execute_step, (system,)
+
+    run_started = time.time()
+    start = time.perf_counter()
+    running: Dict[Any, Any] = {}
+
+    def submit_ready(run: _WorkflowRun) -> None:
+        # Reusing a saved step can make its dependents ready at once
+        ready = run.take_ready()
+        while ready:
+            for step in ready:
+                query = run.workflow.render_query(step)
+                context = _dependency_context(run.workflow, step, run.steps)
+                inputs = None
+                if checkpoint is not None:
+                    inputs = checkpoint.step_inputs(system, step.agent, query, context)
+                    entry = checkpoint.load(run.workflow.name, step.id, inputs)
+                    if entry is not None:
+                        run.finish(step.id, {'result': entry['result'], 'started': time.time(), 'seconds': 0.0},
+                                   run_started, cached=True)
+                        continue
+                future = pool.submit(execute, *target, step.agent, query, context, save_output, step.timeout)
+                running[future] = (run, step.id, inputs)
+            ready = run.take_ready()
+
+    with pool:
+        for run in runs:
+            submit_ready(run)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                run, step_id, inputs = running.pop(future)
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    outcome = {'result': {'success': False, 'error': f"{type(e).__name__}: {e}"},
+                               'started': run_started, 'seconds': 0.0}
+                if inputs is not None and outcome['result'].get('success'):
+                    checkpoint.save(run.workflow.name, step_id, inputs, outcome['result'], outcome['seconds'])
+                run.finish(step_id, outcome, run_started)
+                run.wall_seconds = time.perf_counter() - start
+                submit_ready(run)
+    wall_seconds = time.perf_counter() - start
+
+    reports = [run.report(executor, max_workers) for run in runs]
+    step_count = sum(len(report['order']) for report in reports)
+    failed = sum(step['status'] != SUCCEEDED for report in reports for step in report['steps'].values())
+    cached = sum(report['cached_steps'] for report in reports)
+    names = ', '.join(dict.fromkeys(report['workflow'] for report in reports))
+    logging.info(f"Ran {len(reports)} workflow runs ({names}): {step_count} steps in {wall_seconds:.2f}s "
+                 f"({cached} from checkpoint, {failed} failed or skipped)")
+    return {
+        'runs': reports,
+        'success': all(report['success'] for report in reports),
+        'executor': executor,
+        'max_workers': max_workers,
+        'steps': step_count,
+        'failed_steps': failed,
+        'cached_steps': cached,
+        'wall_seconds': wall_seconds,
+        'steps_per_second': step_count / wall_seconds if wall_seconds else 0.0,
+        'runs_per_minute': 60 * len(reports) / wall_seconds if wall_seconds else 0.0
+    }
+
+def run_workflow(system: Any, workflow: Workflow, max_workers: int = 4, executor: str = 'thread',
+                 only: Optional[Iterable[str]] = None, save_output: bool = False,
+                 checkpoint: Optional[Any] = None) -> Dict[str, Any]:
+    """Execute one workflow's steps as a dependency graph and return its run report (see run_workflows)"""
+    return run_workflows(system, [workflow], max_workers, executor, only, save_output, checkpoint)['runs'][0]
+
+def _safe_name(name: str) -> str:
+    return re.sub(r'[^\w\-.]', '_', name).strip('.') or 'run'
+
+def _write_json(path: Path, data: Any) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+        f.write('\n')
+
+def _step_markdown(step_id: str, step: Mapping[str, Any]) -> str:
+    lines = [f"# {step['label']} ({step_id})", "", f"- Agent: {step['agent']}", f"- Status: {step['status']}"]
+    if step.get('cached'):
+        lines.append("- Reused from the workflow checkpoint")
+    elif 'seconds' in step:
+        lines.append(f"- Started {step['start']:.2f}s into the run and took {step['seconds']:.2f}s")
+    if step.get('error'):
+        lines.append(f"- Error: {step['error']}")
+    result = step.get('result') or {}
+    for title, key in [("Query", 'user_query'), ("Context", 'context'), ("Response", 'response'),
+                       ("Prompt for Augment", 'prompt')]:
+        if result.get(key) and not (key == 'prompt' and 'response' in result):
+            lines += ["", f"## {title}", "", str(result[key]).strip()]
+    return '\n'.join(lines) + '\n'
+
+def write_run_directory(batch: Mapping[str, Any], run_dir: str) -> Path:
+    """Write a run_workflows result to run_dir and return its path
+
+    run_dir/summary.json holds the throughput and each run's status. Each run
+    gets a directory named after it with run.json, its report without step
+    results, and for every step steps/NN_<step>.json, the execute_agent
+    result, and steps/NN_<step>.md, its query, context and response or prompt.
+    """
+    run_path = Path(run_dir)
+    run_path.mkdir(parents=True, exist_ok=True)
+    summary = {key: value for key, value in batch.items() if key != 'runs'}
+    summary['runs'] = []
+    used = set()
+    for report in batch['runs']:
+        directory = _safe_name(report['workflow'])
+        while directory in used:
+            directory += '_'
+        used.add(directory)
+        steps_path = run_path / directory / 'steps'
+        steps_path.mkdir(parents=True, exist_ok=True)
+
+        for number, step_id in enumerate(report['order'], 1):
+            step = report['steps'][step_id]
+            stem = f"{number:02d}_{_safe_name(step_id)}"
+            _write_json(steps_path / f"{stem}.json", {'step': step_id, **step})
+            (steps_path / f"{stem}.md").write_text(_step_markdown(step_id, step), encoding='utf-8')
+
+        _write_json(run_path / directory / 'run.json', {
+            **report,
+            'steps': {step_id: {key: value for key, value in step.items() if key != 'result'}
+                      for step_id, step in report['steps'].items()}
+        })
+        summary['runs'].append({
+            'workflow': report['workflow'],
+            'directory': directory,
+            'success': report['success'],
+            'wall_seconds': report['wall_seconds'],
+            'critical_path_seconds': report['critical_path_seconds'],
+            'cached_steps': report['cached_steps'],
+            'statuses': {step_id: step['status'] for step_id, step in report['steps'].items()}
+        })
+    _write_json(run_path / 'summary.json', summary)
+    logging.info(f"Saved {len(batch['runs'])} workflow runs to {run_path}")
+    return run_path
+
+def run_workflow_batch(system: Any, workflow: Workflow, parameters: Optional[str] = None,
+                       run_dir: Optional[str] = None, max_workers: int = 4, executor: str = 'thread',
+                       only: Optional[Iterable[str]] = None, save_output: bool = False,
+                       checkpoint: Optional[Any] = None) -> Dict[str, Any]:
+    """Run workflow without interaction, once per parameter file entry or once as defined
+
+    Every step's result is written to run_dir, by default a new timestamped
+    directory under the system's output_dir/workflow_runs. Returns the
+    run_workflows result with the run directory under 'run_dir'.
+    """
+    from datetime import datetime
+
+    if parameters:
+        workflows = [workflow.with_context(instance['context'], instance['name'])
+                     for instance in load_workflow_parameters(parameters)]
+    else:
+        workflows = [workflow]
+    if run_dir is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        run_dir = str(Path(system.output_dir) / 'workflow_runs' / f"{timestamp}_{_safe_name(workflow.name)}")
+    batch = run_workflows(system, workflows, max_workers, executor, only, save_output, checkpoint)
+    batch['run_dir'] = str(write_run_directory(batch, run_dir))
+    return batch
+
+def format_batch_report(batch: Mapping[str, Any]) -> str:
+    """Render each run's outcome and the aggregate throughput of a run_workflows result"""
+    lines = [f"{'Run':<32}{'Status':<10}{'Steps ok':>10}{'Wall s':>9}{'Critical s':>12}"]
+    for report in batch['runs']:
+        succeeded = sum(step['status'] == SUCCEEDED for step in report['steps'].values())
+        status = 'ok' if report['success'] else 'failed'
+        ratio = f"{succeeded}/{len(report['order'])}"
+        lines.append(f"{report['workflow']:<32}{status:<10}{ratio:>10}"
+                     f"{report['wall_seconds']:9.2f}{report['critical_path_seconds']:12.2f}")
+    cached = f" ({batch['cached_steps']} from checkpoint)" if batch['cached_steps'] else ""
+    lines.append(f"\n{len(batch['runs'])} runs, {batch['steps']} steps{cached} in {batch['wall_seconds']:.2f}s: "
+                 f"{batch['steps_per_second']:.2f} steps/s, {batch['runs_per_minute']:.1f} runs/min "
+                 f"({batch['executor']} pool of {batch['max_workers']})")
+    return '\n'.join(lines)
+
+def format_workflow_report(report: Mapping[str, Any]) -> str:
+    """Render per-step status and timings, marking critical path steps with *"""
+    on_path = set(report['critical_path'])
+    lines = [f"{'Step':<24}{'Agent':<26}{'Status':<11}{'Start s':>9}{'Time s':>9}"]
+    for step_id in report['order']:
+        step = report['steps'][step_id]
+        timing = (f"{step['start']:9.2f}{step['seconds']:9.2f}" if 'seconds' in step else f"{'-':>9}{'-':>9}")
+        marker = '*' if step_id in on_path else ' '
+        status = 'cached' if step.get('cached') else step['status']
+        lines.append(f"{marker}{step_id:<23}{step['agent']:<26}{status:<11}{timing}")
+    lines.append(f"\nWall time {report['wall_seconds']:.2f}s for {report['serial_seconds']:.2f}s of steps "
+                 f"({report['executor']} pool of {report['max_workers']})")
+    if report['cached_steps']:
+        lines.append(f"{report['cached_steps']} steps reused from the checkpoint")
+    if report['critical_path']:
+        lines.append(f"Critical path ({report['critical_path_seconds']:.2f}s): {' → '.join(report['critical_path'])}")
+    return '\n'.join(lines)
@@ -13,23 +13,269 @@ Usage:
 
 import os
 import sys
-import yaml
 import json
 import argparse
 import re
 import logging
+import pickle
+import time
+import threading
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Dict, IO, Iterable, List, Optional, Any, Callable, Tuple
+
+from agent_index import AgentRouter, AgentSearchIndex
+from agent_metrics import StageMetrics
+from agent_record import AgentRecord, ChunkedAgent, LazyAgent, _normalize_newlines
+from agent_name_index import (NAME_INDEX_FILE, build_name_index, load_name_index, name_index_is_current,
+                              save_name_index)
+
+# yaml, hashlib, the worker pools and the queued log handlers are imported where
+# they are first used, so CLI calls served from the name index start quickly
+
+# Bump whenever the cached agent layout or parsing rules change
+REGISTRY_CACHE_VERSION = 4
+
+# Files modified this close to the cache write time are re-hashed on the next
+# start, since a same-size edit within one mtime tick would otherwise go unseen
+CACHE_RACY_WINDOW_NS = 2_000_000_000
+
+# Frontmatter keys the agent system reads
+FRONTMATTER_KEYS = ('name', 'description', 'color', 'tools')
+
+# Executions aexecute_many runs at once unless told otherwise
+EXECUTE_CONCURRENCY = 4
+
+_FRONTMATTER_LINE = re.compile(r'([A-Za-z_][\w-]*): +(\S.*)$')
+_PLAIN_SCALAR_INDICATORS = frozenset('-?:,[]{}#&*!|>\'"%@`')
+
+# Text libyaml accepts but PyYAML's scanner rejects: tabs in plain scalars or
+# before comments, and a comment right after a block scalar header (|#c, >-#c).
+# Such frontmatter goes through the pure-Python loader so that it still falls
+# back to the manual parser, as with yaml.safe_load
+_LIBYAML_DIVERGENT = re.compile(r'\t|[|>][-+0-9]*#')
+
+@lru_cache(maxsize=None)
+def _non_printable() -> 're.Pattern':
+    """Same pattern as yaml.reader.Reader.NON_PRINTABLE, compiled on first use since it is slow to compile"""
+    return re.compile('[^\x09\x0A\x0D\x20-\x7E\x85\xA0-\uD7FF\uE000-\uFFFD\U00010000-\U0010ffff]')
+
+@lru_cache(maxsize=None)
+def _yaml_loader() -> Any:
+    """Prefer libyaml's C loader for frontmatter that needs a real YAML parse"""
+    import yaml
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+@lru_cache(maxsize=None)
+def _yaml_resolver() -> Any:
+    """Resolver YAML uses to tag plain scalars"""
+    import yaml
+    return yaml.resolver.Resolver()
+
+def _scan_frontmatter(frontmatter_text: str) -> Optional[Tuple[Dict[str, Any], bool]]:
+    """Single-pass scan of flat 'key: value' frontmatter
+
+    Returns exactly what yaml.safe_load, or the manual fallback when YAML rejects
+    the text, would return for FRONTMATTER_KEYS, together with whether YAML
+    rejects it; or None when the text uses YAML features the scanner does not
+    model and a real YAML parse is needed.
+    """
+    if _non_printable().search(frontmatter_text):
+        return None
+
+    values = {}
+    yaml_rejects = False
+    for line in frontmatter_text.split('\n'):
+        if not line.strip():
+            continue
+        match = _FRONTMATTER_LINE.match(line)
+        if not match:
+            return None
+        key, value = match.group(1), match.group(2).rstrip()
+        # Only unquoted plain scalars are modelled
+        if value[0] in _PLAIN_SCALAR_INDICATORS or '\t' in value or ' #' in value:
+            return None
+        if ': ' in value or value.endswith(':'):
+            # "mapping values are not allowed here", so YAML fails on the whole text
+            yaml_rejects = True
+        values[key] = value
+
+    if not yaml_rejects:
+        import yaml
+
+        # YAML would turn values like "true" or "3" into non-strings
+        resolver = _yaml_resolver()
+        for value in values.values():
+            if resolver.resolve(yaml.ScalarNode, value, (True, False)) != 'tag:yaml.org,2002:str':
+                return None
+
+    return {key: values[key] for key in FRONTMATTER_KEYS if key in values}, yaml_rejects
+
+def parse_frontmatter(frontmatter_text: str) -> Any:
+    """Parse agent frontmatter, scanning flat files directly and using YAML otherwise"""
+    return _parse_frontmatter(frontmatter_text)[0]
+
+def _parse_frontmatter(frontmatter_text: str) -> Tuple[Any, str]:
+    """Parse agent frontmatter and name the path taken
+
+    The path is 'scan' or 'yaml' for frontmatter YAML accepts, and
+    'scan_fallback' or 'manual' for frontmatter that gets the manual-parse
+    semantics because YAML rejects it.
+    """
+    scanned = _scan_frontmatter(frontmatter_text)
+    if scanned is not None:
+        frontmatter, yaml_rejects = scanned
+        return frontmatter, 'scan_fallback' if yaml_rejects else 'scan'
+
+    import yaml
+
+    loader = yaml.SafeLoader if _LIBYAML_DIVERGENT.search(frontmatter_text) else _yaml_loader()
+    try:
+        return yaml.load(frontmatter_text, Loader=loader), 'yaml'
+    except yaml.YAMLError:
+        # Manual parsing for complex descriptions
+        return AugmentAgentSystem._parse_frontmatter_manually(frontmatter_text), 'manual'
+
+class RegistrySnapshot:
+    """One consistent generation of the agent registry and the indexes built over it
+
+    Published snapshots are never modified: reloads build a new snapshot and
+    swap it in with a single assignment, so a reader holding a snapshot sees
+    one whole registry without taking a lock. The search index, and the router
+    of snapshots built with build_router=False, are built on first use;
+    concurrent first uses may each build them, which is harmless since the
+    results are equal.
+    """
+
+    def __init__(self, agents: Dict[str, AgentRecord], router: Optional[AgentRouter],
+                 search_index: Optional[AgentSearchIndex] = None, category_counts: Optional[Dict[str, int]] = None,
+                 tool_counts: Optional[Dict[str, int]] = None, generation: int = 0,
+                 routing_weights: Optional[Dict[str, Any]] = None):
+        self._agents = agents
+        self.agents = MappingProxyType(agents)
+        self._router = router
+        self._search_index = search_index
+        self.category_counts = category_counts if category_counts is not None else {}
+        self.tool_counts = tool_counts if tool_counts is not None else {}
+        self.generation = generation
+        self.routing_weights = routing_weights or {}
+
+    @classmethod
+    def build(cls, agents: Dict[str, AgentRecord], routing_weights: Dict[str, Any],
+              generation: int = 0, build_router: bool = True) -> 'RegistrySnapshot':
+        """Index agents from scratch, dropping the search index so the first search rebuilds it"""
+        router = AgentRouter.from_agents(agents.values(), **routing_weights) if build_router else None
+        snapshot = cls(agents, router, generation=generation, routing_weights=routing_weights)
+        for agent in agents.values():
+            snapshot._count_agent(agent, 1)
+        return snapshot
+
+    @property
+    def router(self) -> AgentRouter:
+        """BM25 router over the agents"""
+        router = self._router
+        if router is None:
+            router = self._router = AgentRouter.from_agents(self._agents.values(), **self.routing_weights)
+        return router
+
+    @property
+    def search_index(self) -> AgentSearchIndex:
+        """Trigram index for search_agents, built on the first search"""
+        search_index = self._search_index
+        if search_index is None:
+            search_index = self._search_index = AgentSearchIndex.from_agents(self._agents.values())
+        return search_index
+
+    def derive(self) -> 'RegistrySnapshot':
+        """Unpublished copy for the next generation; its indexes share unchanged postings with this one"""
+        router, search_index = self._router, self._search_index
+        return RegistrySnapshot(dict(self._agents), router.copy() if router is not None else None,
+                                search_index.copy() if search_index is not None else None,
+                                dict(self.category_counts), dict(self.tool_counts), self.generation + 1,
+                                self.routing_weights)
+
+    def _put(self, agent: AgentRecord) -> None:
+        """Add or replace an agent in an unpublished snapshot"""
+        previous = self._agents.get(agent['name'])
+        if previous is not None:
+            self._count_agent(previous, -1)
+        self._agents[agent['name']] = agent
+        if self._router is not None:
+            self._router.add(agent)
+        if self._search_index is not None:
+            self._search_index.add(agent)
+        self._count_agent(agent, 1)
+
+    def _discard(self, name: str) -> None:
+        """Remove an agent from an unpublished snapshot"""
+        agent = self._agents.pop(name)
+        if self._router is not None:
+            self._router.remove(name)
+        if self._search_index is not None:
+            self._search_index.remove(name)
+        self._count_agent(agent, -1)
+
+    def _count_agent(self, agent: AgentRecord, delta: int) -> None:
+        """Adjust the category and tool usage counts for an agent"""
+        tools = agent.tools if isinstance(agent.tools, list) else []
+        for counts, keys in ((self.category_counts, [agent.category]), (self.tool_counts, tools)):
+            for key in keys:
+                count = counts.get(key, 0) + delta
+                if count:
+                    counts[key] = count
+                else:
+                    del counts[key]
 
 class AugmentAgentSystem:
-    """Main system for integrating Claude Code agents with Augment"""
+    """Main system for integrating Claude Code agents with Augment
+
+    The registry is published as immutable RegistrySnapshot generations.
+    Readers use whichever snapshot is current when they start, so they never
+    block and never see a partly applied reload; load_agents and refresh are
+    serialized with a lock.
+    """
+
+    def __init__(self, agents_dir: str = ".", output_dir: str = "output", verbose: bool = False,
+                 use_cache: bool = True, load_workers: int = 0, load_executor: str = 'thread',
+                 lazy_prompts: bool = False, routing_weights: Optional[Dict[str, Any]] = None,
+                 autoload: bool = True, dedup_prompts: bool = False, backend: Optional[Any] = None):
+        if load_executor not in ('thread', 'process'):
+            raise ValueError(f"Unsupported load executor: {load_executor}")
 
-    def __init__(self, agents_dir: str = ".", output_dir: str = "output", verbose: bool = False):
         self.agents_dir = Path(agents_dir)
         self.output_dir = Path(output_dir)
-        self.agents: Dict[str, Dict[str, Any]] = {}
         self.verbose = verbose
+        self.use_cache = use_cache
+        self.lazy_prompts = lazy_prompts
+        # Lazy prompts stay on disk, so there is nothing to share between agents
+        self.dedup_prompts = dedup_prompts and not lazy_prompts
+        self.chunk_store = None
+        if self.dedup_prompts:
+            from agent_chunks import ChunkStore
+
+            self.chunk_store = ChunkStore()
+        # Lazy, deduplicated and plain loads cache different records, so they keep separate files
+        cache_name = ('agent_registry_cache.lazy.pickle' if lazy_prompts
+                      else 'agent_registry_cache.dedup.pickle' if self.dedup_prompts
+                      else 'agent_registry_cache.pickle')
+        self.cache_file = self.output_dir / cache_name
+        self.name_index_file = self.output_dir / NAME_INDEX_FILE
+        self.cache_stats = {'hits': 0, 'rehashed': 0, 'parsed': 0}
+        self.load_workers = load_workers
+        self.load_executor = load_executor
+        self.routing_weights = routing_weights or {}
+        self._snapshot = RegistrySnapshot.build({}, self.routing_weights)
+        self._reload_lock = threading.RLock()
+        self._file_entries: Dict[str, Dict[str, Any]] = {}
+        self._file_agents: Dict[str, AgentRecord] = {}
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop: Optional[threading.Event] = None
+        self._config_digest: Optional[str] = None
+        self.metrics = StageMetrics()
+        # LLMBackend that execute_agent sends prompts to; without one it only builds them
+        self.backend = backend
 
         # Create output directory if it doesn't exist
         self.output_dir.mkdir(exist_ok=True)
@@ -37,190 +283,639 @@ class AugmentAgentSystem:
         # Setup logging
         self._setup_logging()
 
-        self.load_agents()
+        if autoload:
+            self.load_agents()
+
+    @classmethod
+    def from_name_index(cls, agents_dir: str = ".", output_dir: str = "output", verbose: bool = False,
+                        **options: Any) -> Optional['AugmentAgentSystem']:
+        """Open the registry from the name index without walking the agents directory
+
+        Returns None when the index is missing or any indexed path changed; a
+        normal start then rebuilds it. System prompts are read from the agent
+        files on first use and the router is built on the first routing call.
+        """
+        system = cls(agents_dir, output_dir, verbose, autoload=False, **options)
+        with system.metrics.stage('load_name_index'):
+            index = load_name_index(system.name_index_file, system.agents_dir)
+        if index is None:
+            return None
+        agents = index['agents']
+        system._snapshot = RegistrySnapshot.build(agents, system.routing_weights, 1, build_router=False)
+        logging.debug(f"Opened {len(agents)} agents from {system.name_index_file}")
+        return system
 
     def _setup_logging(self) -> None:
         """Setup logging configuration"""
-        log_level = logging.DEBUG if self.verbose else logging.INFO
-        logging.basicConfig(
-            level=log_level,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(),
-                logging.FileHandler(self.output_dir / 'agent_system.log')
-            ]
-        )
+        from agent_logging import setup_logging
+
+        setup_logging(self.output_dir, self.verbose)
     
+    @property
+    def snapshot(self) -> RegistrySnapshot:
+        """Current registry generation; hold on to it for several consistent reads"""
+        return self._snapshot
+
+    @property
+    def agents(self) -> MappingProxyType:
+        """Read-only mapping of agent name to agent record in the current snapshot"""
+        return self._snapshot.agents
+
+    @property
+    def router(self) -> AgentRouter:
+        """BM25 router of the current snapshot"""
+        return self._snapshot.router
+
+    @property
+    def search_index(self) -> AgentSearchIndex:
+        """Trigram search index of the current snapshot"""
+        return self._snapshot.search_index
+
     def load_agents(self) -> None:
         """Load all agents from the agents directory"""
+        with self._reload_lock, self.metrics.stage('load_agents'):
+            self._load_agents()
+
+    def _load_agents(self) -> None:
         if not self.agents_dir.exists():
             logging.warning(f"Agents directory {self.agents_dir} not found")
             return
 
+        start = time.perf_counter()
+        if self.use_cache:
+            with self.metrics.stage('load_cache'):
+                cache_entries = self._load_registry_cache()
+        else:
+            cache_entries = {}
+        agent_files, outcomes, new_entries = self._scan_agent_files(cache_entries)
+        scanned = time.perf_counter()
+
+        # Merge in directory walk order so later files win name collisions
         loaded_count = 0
-        for agent_file in self.agents_dir.rglob("*.md"):
+        agents: Dict[str, AgentRecord] = {}
+        self._file_agents = {}
+        for agent_file, outcome in zip(agent_files, outcomes):
+            agent = self._agent_from_outcome(agent_file, outcome)
+            if agent:
+                self._file_agents[str(agent_file)] = agent
+                agents[agent['name']] = agent
+                logging.debug("Loaded agent: %s", agent['name'])
+                loaded_count += 1
+
+        self._file_entries = new_entries
+        self._prune_chunk_store()
+        with self.metrics.stage('build_indexes'):
+            self._snapshot = RegistrySnapshot.build(agents, self.routing_weights, self._snapshot.generation + 1)
+        elapsed = time.perf_counter() - start
+
+        logging.info(f"Successfully loaded {loaded_count} agents from {self.agents_dir} in {elapsed:.3f}s "
+                     f"({self.cache_stats['hits']} cached, {self.cache_stats['parsed']} parsed)",
+                     extra={'event': 'agents_loaded', 'agents': loaded_count, 'files': len(agent_files),
+                            'failed_files': sum(1 for outcome in outcomes
+                                                if 'load_error' in outcome or outcome['errors']),
+                            **self.cache_stats,
+                            'scan_seconds': round(scanned - start, 6), 'total_seconds': round(elapsed, 6)})
+
+        files_changed = (self.cache_stats['rehashed'] or self.cache_stats['parsed']
+                         or new_entries.keys() != cache_entries.keys())
+        if self.use_cache and files_changed:
+            with self.metrics.stage('save_cache'):
+                self._save_registry_cache(new_entries)
+        if self.use_cache:
+            with self.metrics.stage('save_name_index'):
+                self._save_name_index(len(agent_files), files_changed)
+
+        # Save agents configuration to file
+        with self.metrics.stage('save_config'):
+            self._save_agents_config()
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """Pick up added, changed and deleted agent files without a full reload
+
+        Only files whose mtime or size changed are read again, and only agents
+        defined by those files are updated in the registry, the indexes and
+        the statistics. Returns the affected file paths by kind of change.
+        """
+        with self._reload_lock, self.metrics.stage('refresh'):
+            return self._refresh()
+
+    def _refresh(self) -> Dict[str, List[str]]:
+        changes: Dict[str, List[str]] = {'added': [], 'changed': [], 'removed': []}
+        if not self.agents_dir.exists():
+            return changes
+
+        agent_files, outcomes, new_entries = self._scan_agent_files(self._file_entries)
+        affected_names = set()
+
+        for agent_file, outcome in zip(agent_files, outcomes):
+            if not outcome.get('changed'):
+                continue
+            path = str(agent_file)
+            changes['changed' if path in self._file_entries else 'added'].append(path)
+            previous = self._file_agents.pop(path, None)
+            if previous:
+                affected_names.add(previous['name'])
+            agent = self._agent_from_outcome(agent_file, outcome)
+            if agent:
+                self._file_agents[path] = agent
+                affected_names.add(agent['name'])
+
+        walked = {str(agent_file) for agent_file in agent_files}
+        for path in list(self._file_entries):
+            if path not in walked:
+                changes['removed'].append(path)
+                previous = self._file_agents.pop(path, None)
+                if previous:
+                    affected_names.add(previous['name'])
+
+        self._file_entries = new_entries
+        if not any(changes.values()):
+            return changes
+        self._prune_chunk_store()
+
+        # Later files still win name collisions
+        winners = {}
+        for agent_file in agent_files:
+            agent = self._file_agents.get(str(agent_file))
+            if agent and agent['name'] in affected_names:
+                winners[agent['name']] = agent
+
+        current = self._snapshot
+        with self.metrics.stage('reindex'):
+            snapshot = current.derive()
+            for name in affected_names:
+                previous = current.agents.get(name)
+                agent = winners.get(name)
+                if agent is previous:
+                    continue
+                if agent is None:
+                    snapshot._discard(name)
+                else:
+                    snapshot._put(agent)
+        self._snapshot = snapshot
+
+        logging.info(f"Refreshed agents: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+                     f"{len(changes['removed'])} removed",
+                     extra={'event': 'agents_refreshed', **{kind: len(paths) for kind, paths in changes.items()}})
+
+        if self.use_cache:
+            with self.metrics.stage('save_cache'):
+                self._save_registry_cache(new_entries)
+            with self.metrics.stage('save_name_index'):
+                self._save_name_index(len(agent_files), True)
+        with self.metrics.stage('save_config'):
+            self._save_agents_config()
+        return changes
+
+    def watch(self, interval: float = 2.0,
+              on_change: Optional[Callable[[Dict[str, List[str]]], None]] = None) -> None:
+        """Poll the agents directory every interval seconds in a background thread"""
+        self.stop_watching()
+        stop_event = threading.Event()
+
+        def poll() -> None:
+            while not stop_event.wait(interval):
+                try:
+                    changes = self.refresh()
+                    if on_change and any(changes.values()):
+                        on_change(changes)
+                except Exception as e:
+                    logging.error(f"Error refreshing agents: {e}")
+
+        self._watch_stop = stop_event
+        self._watch_thread = threading.Thread(target=poll, name='agent-watcher', daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self) -> None:
+        """Stop a watcher started with watch()"""
+        if self._watch_thread is not None:
+            self._watch_stop.set()
+            self._watch_thread.join()
+            self._watch_thread = None
+
+    def _scan_agent_files(self, previous_entries: Dict[str, Dict[str, Any]]) -> tuple:
+        """Walk the agents directory, reusing previous entries for unchanged files
+
+        Returns the files in walk order, one outcome per file and the new file
+        entries. Outcomes of files that were parsed again are marked changed.
+        """
+        new_entries: Dict[str, Dict[str, Any]] = {}
+        self.cache_stats = {'hits': 0, 'rehashed': 0, 'parsed': 0}
+        scan_started_ns = time.time_ns()
+
+        metrics = self.metrics
+        with metrics.stage('walk'):
+            agent_files = list(self.agents_dir.rglob("*.md"))
+
+        # Serve unchanged files from previous entries and queue the rest for parsing
+        stat_started_ns = time.perf_counter_ns()
+        outcomes: List[Optional[Dict[str, Any]]] = [None] * len(agent_files)
+        pending = []
+        for index, agent_file in enumerate(agent_files):
             try:
-                agent = self._parse_agent_file(agent_file)
-                if agent:
-                    self.agents[agent['name']] = agent
-                    logging.info(f"Loaded agent: {agent['name']}")
-                    loaded_count += 1
+                stat = agent_file.stat()
             except Exception as e:
-                logging.error(f"Error loading agent {agent_file}: {e}")
+                outcomes[index] = {'load_error': str(e), 'changed': True}
+                continue
 
-        logging.info(f"Successfully loaded {loaded_count} agents from {self.agents_dir}")
+            entry = previous_entries.get(str(agent_file))
+            # Fast path: mtime and size match and the file was not written racily
+            if (entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size
+                    and not entry['racy']):
+                if self.chunk_store is not None:
+                    entry['agent'] = self._share_prompt(entry['agent'])
+                new_entries[str(agent_file)] = entry
+                self.cache_stats['hits'] += 1
+                outcomes[index] = {'agent': entry['agent'], 'body_offset': entry.get('body_offset'),
+                                   'errors': []}
+            else:
+                pending.append((index, agent_file, stat, entry))
+        metrics.add_time('stat', time.perf_counter_ns() - stat_started_ns)
+
+        with metrics.stage('load_files'):
+            parsed = self._run_file_loaders(
+                [(agent_file, entry['sha256'] if entry else None) for _, agent_file, _, entry in pending])
+
+        # Per-file read and parse times are measured in the loaders, possibly in worker processes
+        read_times = [outcome['read_ns'] for outcome in parsed if 'read_ns' in outcome]
+        parse_times = [outcome['parse_ns'] for outcome in parsed if 'parse_ns' in outcome]
+        if read_times:
+            metrics.add_time('read', sum(read_times), len(read_times), max(read_times))
+        if parse_times:
+            metrics.add_time('parse', sum(parse_times), len(parse_times), max(parse_times))
+        parse_paths: Dict[str, int] = {}
+        for outcome in parsed:
+            parse_path = outcome.get('frontmatter_path')
+            if parse_path:
+                parse_paths[parse_path] = parse_paths.get(parse_path, 0) + 1
+        for parse_path, count in parse_paths.items():
+            metrics.count(f'frontmatter_{parse_path}', count)
+        manual_fallbacks = parse_paths.get('scan_fallback', 0) + parse_paths.get('manual', 0)
+        if manual_fallbacks:
+            metrics.count('manual_fallbacks', manual_fallbacks)
+
+        for (index, agent_file, stat, entry), outcome in zip(pending, parsed):
+            outcomes[index] = outcome
+            if 'load_error' in outcome:
+                outcome['changed'] = True
+                continue
+            if outcome['reused']:
+                # Touched but not modified, keep the parsed result
+                outcome['agent'] = entry['agent']
+                outcome['body_offset'] = entry.get('body_offset')
+                outcome['cacheable'] = entry.get('cacheable', True)
+                self.cache_stats['rehashed'] += 1
+            else:
+                outcome['changed'] = True
+                self.cache_stats['parsed'] += 1
+            if self.chunk_store is not None:
+                outcome['agent'] = self._share_prompt(outcome['agent'])
+            new_entries[str(agent_file)] = {
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha256': outcome['sha256'],
+                'racy': stat.st_mtime_ns >= scan_started_ns - CACHE_RACY_WINDOW_NS,
+                'cacheable': outcome['cacheable'],
+                'agent': outcome['agent'],
+                'body_offset': outcome.get('body_offset')
+            }
 
-        # Save agents configuration to file
-        self._save_agents_config()
-    
-    def _parse_agent_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+        metrics.count('files_scanned', len(agent_files))
+        for name, count in self.cache_stats.items():
+            metrics.count(f'cache_{name}', count)
+        return agent_files, outcomes, new_entries
+
+    def _share_prompt(self, agent: Optional[AgentRecord]) -> Optional[AgentRecord]:
+        """Return agent with its prompt sections and description held in the chunk store"""
+        store = self.chunk_store
+        if agent is None:
+            return None
+        if not isinstance(agent, ChunkedAgent):
+            return ChunkedAgent.from_record(agent, store)
+        # Cached records share sections within one cache file only; join them with the store
+        agent.prompt_chunks = tuple(store.share(chunk) for chunk in agent.prompt_chunks)
+        if isinstance(agent.description, str):
+            agent.description = store.share(agent.description)
+        return agent
+
+    def _prune_chunk_store(self) -> None:
+        """Forget sections no longer used by any loaded file after a reload"""
+        if self.chunk_store is not None:
+            self.chunk_store.retain(chunk for entry in self._file_entries.values()
+                                    if isinstance(entry['agent'], ChunkedAgent)
+                                    for chunk in (entry['agent'].description, *entry['agent'].prompt_chunks))
+
+    def _agent_from_outcome(self, agent_file: Path, outcome: Dict[str, Any]) -> Optional[AgentRecord]:
+        """Report a file's load errors and return its agent record, if any"""
+        if 'load_error' in outcome:
+            logging.error(f"Error loading agent {agent_file}: {outcome['load_error']}")
+            return None
+        for error in outcome['errors']:
+            logging.error(error)
+        agent = outcome['agent']
+        if agent and self.lazy_prompts:
+            agent = LazyAgent.from_record(agent, outcome['body_offset'])
+        return agent
+
+    def _run_file_loaders(self, jobs: List[tuple]) -> List[Dict[str, Any]]:
+        """Read and parse (file_path, cached_sha256) jobs, in a worker pool when configured"""
+        if self.load_workers <= 1 or len(jobs) <= 1:
+            return [_load_agent_file(file_path, cached_sha256, self.lazy_prompts)
+                    for file_path, cached_sha256 in jobs]
+
+        file_paths = [file_path for file_path, _ in jobs]
+        cached_hashes = [cached_sha256 for _, cached_sha256 in jobs]
+        lazy_flags = [self.lazy_prompts] * len(jobs)
+        if self.load_executor == 'process':
+            chunksize = max(1, len(jobs) // (self.load_workers * 4))
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=self.load_workers) as executor:
+                return list(executor.map(_load_agent_file, file_paths, cached_hashes, lazy_flags,
+                                         chunksize=chunksize))
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.load_workers) as executor:
+            return list(executor.map(_load_agent_file, file_paths, cached_hashes, lazy_flags))
+
+    def _load_registry_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Load the compiled agent registry cache, returning an empty cache when unusable"""
+        try:
+            with open(self.cache_file, 'rb') as f:
+                cache = pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable registry cache {self.cache_file}: {e}")
+            return {}
+
+        if (not isinstance(cache, dict) or cache.get('version') != REGISTRY_CACHE_VERSION
+                or cache.get('agents_directory') != str(self.agents_dir.resolve())):
+            return {}
+
+        entries = cache.get('entries', {})
+        written_at_ns = cache.get('written_at_ns', 0)
+        for entry in entries.values():
+            entry['racy'] = entry['mtime_ns'] >= written_at_ns - CACHE_RACY_WINDOW_NS
+        return entries
+
+    def _save_registry_cache(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Atomically write the compiled agent registry cache"""
+        # Files with parse errors stay out so their errors are reported on the next start
+        cache = {
+            'version': REGISTRY_CACHE_VERSION,
+            'agents_directory': str(self.agents_dir.resolve()),
+            'written_at_ns': time.time_ns(),
+            'entries': {path: entry for path, entry in entries.items() if entry['cacheable']}
+        }
+
+        try:
+            import tempfile
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, prefix='.agent_registry_cache.')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self.cache_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            logging.debug(f"Saved registry cache to {self.cache_file}")
+        except Exception as e:
+            logging.error(f"Failed to save registry cache: {e}")
+
+    def _save_name_index(self, file_count: int, files_changed: bool) -> None:
+        """Write the name index for the current snapshot unless the one on disk still matches"""
+        entries = self._file_entries
+        # Like the registry cache, leave out trees with unreadable or broken files so
+        # their errors are reported on the next start instead of being skipped
+        if len(entries) != file_count or not all(entry['cacheable'] for entry in entries.values()):
+            return
+        if not files_changed and name_index_is_current(self.name_index_file, self.agents_dir):
+            return
+        save_name_index(build_name_index(self.agents_dir, self.output_dir, entries, self._snapshot.agents),
+                        self.name_index_file)
+
+    def _parse_agent_file(self, file_path: Path) -> Optional[AgentRecord]:
         """Parse a Claude Code agent file"""
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
 
+        return self._parse_agent_content(content, file_path)
+
+    @classmethod
+    def _parse_agent_content(cls, content: str, file_path: Path, errors: Optional[List[str]] = None,
+                             parse_info: Optional[Dict[str, Any]] = None) -> Optional[AgentRecord]:
+        """Parse the text of a Claude Code agent file, collecting errors if a list is given"""
         # Split frontmatter and content
         if content.startswith('---'):
             parts = content.split('---', 2)
             if len(parts) >= 3:
-                try:
-                    # Handle complex YAML with multiline descriptions
-                    frontmatter_text = parts[1].strip()
-
-                    # Try to parse YAML, if it fails, parse manually
-                    try:
-                        frontmatter = yaml.safe_load(frontmatter_text)
-                    except yaml.YAMLError:
-                        # Manual parsing for complex descriptions
-                        frontmatter = self._parse_frontmatter_manually(frontmatter_text)
-
-                    system_prompt = parts[2].strip()
-
-                    # Parse tools if they're comma-separated
-                    tools = frontmatter.get('tools', [])
-                    if isinstance(tools, str):
-                        tools = [tool.strip() for tool in tools.split(',')]
-
-                    return {
-                        'name': frontmatter.get('name'),
-                        'description': frontmatter.get('description', ''),
-                        'color': frontmatter.get('color', 'blue'),
-                        'tools': tools,
-                        'system_prompt': system_prompt,
-                        'file_path': str(file_path),
-                        'category': self._get_category_from_path(file_path)
-                    }
-                except Exception as e:
-                    logging.error(f"Error parsing {file_path}: {e}")
+                return cls._build_agent(parts[1], parts[2].strip(), file_path, errors, parse_info)
+        return None
+
+    @classmethod
+    def _build_agent(cls, frontmatter_part: str, system_prompt: Optional[str], file_path: Path,
+                     errors: Optional[List[str]] = None,
+                     parse_info: Optional[Dict[str, Any]] = None) -> Optional[AgentRecord]:
+        """Build an agent record from its frontmatter, leaving out the prompt when it is None
+
+        When parse_info is given, the frontmatter parse path is stored in it.
+        """
+        try:
+            # Handle complex YAML with multiline descriptions
+            frontmatter_text = frontmatter_part.strip()
+
+            frontmatter, parse_path = _parse_frontmatter(frontmatter_text)
+            if parse_info is not None:
+                parse_info['frontmatter_path'] = parse_path
+
+            # Parse tools if they're comma-separated; an empty tools: key means none
+            tools = frontmatter.get('tools')
+            if tools is None:
+                tools = []
+            elif isinstance(tools, str):
+                tools = [tool.strip() for tool in tools.split(',') if tool.strip()]
+            elif isinstance(tools, list):
+                tools = [str(tool) for tool in tools if tool is not None]
+            else:
+                logging.warning(f"Ignoring tools of {file_path}: expected a list or comma-separated string, "
+                                f"got {type(tools).__name__}")
+                tools = []
+
+            return AgentRecord(
+                name=frontmatter.get('name'),
+                description=frontmatter.get('description', ''),
+                color=frontmatter.get('color', 'blue'),
+                tools=tools,
+                system_prompt=system_prompt,
+                file_path=str(file_path),
+                category=cls._get_category_from_path(file_path)
+            )
+        except Exception as e:
+            if errors is None:
+                logging.error(f"Error parsing {file_path}: {e}")
+            else:
+                errors.append(f"Error parsing {file_path}: {e}")
         return None
 
     def _save_agents_config(self) -> None:
-        """Save agents configuration to JSON file"""
+        """Save agents configuration to JSON file when its content changed"""
+        import hashlib
+
         config_file = self.output_dir / 'agents_config.json'
+        agents = self.agents
 
         # Create a simplified version for JSON serialization
+        agents_data = {}
+        for name, agent in agents.items():
+            agents_data[name] = {
+                'name': agent.name,
+                'description': agent.description,
+                'category': agent.category,
+                'color': agent.color,
+                'tools': agent.tools,
+                'file_path': agent.file_path
+            }
+
+        # generated_at is left out of the digest so an unchanged registry is not rewritten; frontmatter
+        # values YAML parses to non-JSON types, such as dates, are written as strings
+        content = json.dumps([str(self.agents_dir), agents_data], ensure_ascii=False, default=str)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        if self._config_digest is None:
+            self._config_digest = self._read_config_digest(config_file)
+        if digest == self._config_digest and config_file.exists():
+            logging.debug(f"Agents configuration unchanged, keeping {config_file}")
+            return
+
         agents_config = {
             'metadata': {
                 'generated_at': datetime.now().isoformat(),
                 'agents_directory': str(self.agents_dir),
-                'total_agents': len(self.agents)
+                'total_agents': len(agents),
+                'content_digest': digest
             },
-            'agents': {}
+            'agents': agents_data
         }
 
-        for name, agent in self.agents.items():
-            agents_config['agents'][name] = {
-                'name': agent['name'],
-                'description': agent['description'],
-                'category': agent['category'],
-                'color': agent['color'],
-                'tools': agent['tools'],
-                'file_path': agent['file_path']
-            }
-
         try:
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(agents_config, f, indent=2, ensure_ascii=False)
+            import tempfile
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, prefix='.agents_config.', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(agents_config, f, indent=2, ensure_ascii=False, default=str)
+                # mkstemp creates owner-only files; the config is meant to be shared
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, config_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._config_digest = digest
             logging.info(f"Saved agents configuration to {config_file}")
         except Exception as e:
             logging.error(f"Failed to save agents configuration: {e}")
 
-    def export_agents_data(self, format_type: str = 'json') -> str:
-        """Export agents data in various formats"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    @staticmethod
+    def _read_config_digest(config_file: Path) -> Optional[str]:
+        """Content digest recorded in an existing agents configuration file"""
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)['metadata'].get('content_digest')
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
 
-        if format_type.lower() == 'json':
-            return self._export_json(timestamp)
-        elif format_type.lower() == 'yaml':
-            return self._export_yaml(timestamp)
-        elif format_type.lower() == 'csv':
-            return self._export_csv(timestamp)
-        else:
+    def export_agents_data(self, format_type: str = 'json', dedup: bool = False,
+                           fields: Optional[List[str]] = None, compression: Optional[str] = None) -> str:
+        """Export agents data in various formats
+
+        json and yaml write one document holding every agent; jsonl, csv and
+        yaml-stream (one YAML document per agent) are written agent by agent.
+        fields limits the agent fields written, and compression ('gzip' or
+        'lzma') compresses any format. With dedup, JSON and YAML exports store
+        each distinct description and prompt section once under its sha256
+        digest; agent_chunks.expand_agents rebuilds the full agents. Streamed
+        formats ignore dedup.
+        """
+        from agent_export import COMPRESSIONS, EXPORT_FORMATS, parse_fields
+
+        format_type = format_type.lower()
+        if format_type not in EXPORT_FORMATS:
             raise ValueError(f"Unsupported export format: {format_type}")
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unsupported export compression: {compression}")
+        fields = parse_fields(fields)
 
-    def _export_json(self, timestamp: str) -> str:
-        """Export agents data as JSON"""
-        output_file = self.output_dir / f'agents_export_{timestamp}.json'
-
-        export_data = {
-            'export_info': {
-                'timestamp': datetime.now().isoformat(),
-                'format': 'json',
-                'total_agents': len(self.agents)
-            },
-            'agents': self.agents
-        }
-
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        with self.metrics.stage('export'):
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            dedup = dedup and format_type in ('json', 'yaml')
+            suffix = '_dedup' if dedup else '_stream' if format_type == 'yaml-stream' else ''
+            extension = 'yaml' if format_type == 'yaml-stream' else format_type
+            output_file = self.output_dir / (f'agents_export_{timestamp}{suffix}.{extension}'
+                                             f'{COMPRESSIONS.get(compression, "")}')
+
+            if format_type == 'json':
+                self._export_json(output_file, dedup, fields, compression)
+            elif format_type == 'yaml':
+                self._export_yaml(output_file, dedup, fields, compression)
+            else:
+                self._export_stream(format_type, output_file, fields, compression)
 
-        logging.info(f"Exported agents data to {output_file}")
-        return str(output_file)
+            logging.info(f"Exported agents data to {output_file}")
+            return str(output_file)
 
-    def _export_yaml(self, timestamp: str) -> str:
-        """Export agents data as YAML"""
-        output_file = self.output_dir / f'agents_export_{timestamp}.yaml'
+    def _export_payload(self, format_type: str, dedup: bool, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build the document written by the JSON and YAML exports"""
+        from agent_export import project
 
-        export_data = {
-            'export_info': {
-                'timestamp': datetime.now().isoformat(),
-                'format': 'yaml',
-                'total_agents': len(self.agents)
-            },
-            'agents': self.agents
+        agents = self.agents
+        export_info = {
+            'timestamp': datetime.now().isoformat(),
+            'format': format_type,
+            'total_agents': len(agents)
         }
+        agents_data = {name: project(agent, fields) for name, agent in agents.items()}
+        if not dedup:
+            return {'export_info': export_info, 'agents': agents_data}
 
-        with open(output_file, 'w', encoding='utf-8') as f:
-            yaml.dump(export_data, f, default_flow_style=False, allow_unicode=True)
+        from agent_chunks import deduplicate_agents
 
-        logging.info(f"Exported agents data to {output_file}")
-        return str(output_file)
+        agents_data, chunks = deduplicate_agents(agents_data)
+        export_info['deduplicated'] = True
+        export_info['total_chunks'] = len(chunks)
+        return {'export_info': export_info, 'chunks': chunks, 'agents': agents_data}
 
-    def _export_csv(self, timestamp: str) -> str:
-        """Export agents data as CSV"""
-        import csv
+    def _export_json(self, output_file: Path, dedup: bool = False, fields: Optional[List[str]] = None,
+                     compression: Optional[str] = None) -> None:
+        """Export agents data as JSON"""
+        from agent_export import open_export
 
-        output_file = self.output_dir / f'agents_export_{timestamp}.csv'
+        export_data = self._export_payload('json', dedup, fields)
+        with open_export(str(output_file), compression) as f:
+            json.dump(export_data, f, indent=2, ensure_ascii=False)
 
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
+    def _export_yaml(self, output_file: Path, dedup: bool = False, fields: Optional[List[str]] = None,
+                     compression: Optional[str] = None) -> None:
+        """Export agents data as YAML"""
+        import yaml
+        from agent_export import open_export
 
-            # Write header
-            writer.writerow(['Name', 'Category', 'Description', 'Tools', 'File Path'])
+        export_data = self._export_payload('yaml', dedup, fields)
+        with open_export(str(output_file), compression) as f:
+            yaml.dump(export_data, f, default_flow_style=False, allow_unicode=True)
 
-            # Write agent data
-            for agent in self.agents.values():
-                writer.writerow([
-                    agent['name'],
-                    agent['category'],
-                    agent['description'].replace('\n', ' ').strip(),
-                    ', '.join(agent['tools']) if agent['tools'] else '',
-                    agent['file_path']
-                ])
+    def _export_stream(self, format_type: str, output_file: Path, fields: Optional[List[str]] = None,
+                       compression: Optional[str] = None) -> None:
+        """Export agents one at a time as JSON Lines, CSV or YAML documents"""
+        from agent_export import STREAM_WRITERS, open_export
 
-        logging.info(f"Exported agents data to {output_file}")
-        return str(output_file)
+        # Written from one snapshot, so a concurrent reload cannot mix generations
+        agents = self._snapshot.agents
+        with open_export(str(output_file), compression) as f:
+            STREAM_WRITERS[format_type](agents.values(), f, fields)
 
-    def _parse_frontmatter_manually(self, frontmatter_text: str) -> Dict[str, Any]:
+    @staticmethod
+    def _parse_frontmatter_manually(frontmatter_text: str) -> Dict[str, Any]:
         """Manually parse frontmatter when YAML fails"""
         result = {}
         lines = frontmatter_text.split('\n')
@@ -253,7 +948,8 @@ class AugmentAgentSystem:
 
         return result
     
-    def _get_category_from_path(self, file_path: Path) -> str:
+    @staticmethod
+    def _get_category_from_path(file_path: Path) -> str:
         """Extract category from file path"""
         parts = file_path.parts
         for part in parts:
@@ -264,14 +960,29 @@ class AugmentAgentSystem:
     
     def list_agents(self, save_to_file: bool = False) -> Optional[str]:
         """List all available agents organized by category"""
-        if not self.agents:
+        output_text = self.format_agents_list()
+        if output_text is None:
             message = "No agents loaded"
             print(message)
             return None
 
+        print(output_text)
+
+        # Save to file if requested
+        if save_to_file:
+            return self.save_agents_list(output_text)
+
+        return None
+
+    def format_agents_list(self) -> Optional[str]:
+        """Build the agent listing text, or None when no agents are loaded"""
+        agents = self.agents
+        if not agents:
+            return None
+
         # Group by category
         categories = {}
-        for agent in self.agents.values():
+        for agent in agents.values():
             category = agent['category']
             if category not in categories:
                 categories[category] = []
@@ -293,68 +1004,84 @@ class AugmentAgentSystem:
                     if first_line:
                         output_lines.append(f"    {first_line[:80]}...")
 
-        output_text = '\n'.join(output_lines)
-        print(output_text)
+        return '\n'.join(output_lines)
 
-        # Save to file if requested
-        if save_to_file:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = self.output_dir / f'agents_list_{timestamp}.txt'
-
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(output_text)
-                f.write(f"\n\nGenerated at: {datetime.now().isoformat()}")
+    def save_agents_list(self, output_text: str) -> str:
+        """Save an agent listing to a timestamped file"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = self.output_dir / f'agents_list_{timestamp}.txt'
 
-            logging.info(f"Saved agents list to {output_file}")
-            return str(output_file)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(output_text)
+            f.write(f"\n\nGenerated at: {datetime.now().isoformat()}")
 
-        return None
+        logging.info(f"Saved agents list to {output_file}")
+        return str(output_file)
     
-    def get_agent(self, name: str) -> Optional[Dict[str, Any]]:
+    def get_agent(self, name: str) -> Optional[AgentRecord]:
         """Get a specific agent by name"""
         return self.agents.get(name)
     
     def find_relevant_agents(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
         """Find the most relevant agents for a query"""
-        query_lower = query.lower()
-        scored_agents = []
-        
-        for agent in self.agents.values():
-            score = 0
-            description_lower = agent['description'].lower()
-            
-            # Score based on keyword matches
-            query_words = query_lower.split()
-            for word in query_words:
-                if word in description_lower:
-                    score += 1
-                if word in agent['name'].lower():
-                    score += 2
-            
-            # Boost score for specific research terms
-            research_terms = {
-                'literature': ['literature-synthesizer', 'paper-finder', 'citation-analyzer'],
-                'statistical': ['statistical-analyst', 'statistical-consultant'],
-                'analysis': ['statistical-analyst', 'data-visualizer', 'results-interpreter'],
-                'writing': ['academic-writer', 'research-documenter'],
-                'ideas': ['research-ideator', 'hypothesis-generator'],
-                'experiment': ['experiment-planner', 'methodology-designer'],
-                'data': ['data-visualizer', 'statistical-analyst', 'ml-researcher']
-            }
-            
-            for term, relevant_agents in research_terms.items():
-                if term in query_lower and agent['name'] in relevant_agents:
-                    score += 5
-            
-            if score > 0:
-                scored_agents.append((score, agent))
-        
-        # Sort by score and return top results
-        scored_agents.sort(key=lambda x: x[0], reverse=True)
-        return [agent for score, agent in scored_agents[:limit]]
-    
-    def execute_agent(self, agent_name: str, user_query: str, context: str = "", save_output: bool = False) -> Dict[str, Any]:
-        """Execute a specific agent with user query"""
+        with self.metrics.stage('route'):
+            snapshot = self._snapshot
+            return [snapshot.agents[name] for score, name in snapshot.router.search(query, limit)]
+
+    def batch_route(self, input_path: str, output_path: Optional[str] = None, top_k: int = 3,
+                    chunk_size: int = 1024) -> Dict[str, Any]:
+        """Route a JSONL file of requests ('-' for stdin) and stream top-k agents as JSONL"""
+        if output_path is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = str(self.output_dir / f'batch_routes_{timestamp}.jsonl')
+
+        input_file = sys.stdin if input_path == '-' else open(input_path, 'r', encoding='utf-8')
+        output_file = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8')
+        try:
+            stats = self.route_requests(input_file, output_file, top_k, chunk_size)
+        finally:
+            if input_file is not sys.stdin:
+                input_file.close()
+            if output_file is not sys.stdout:
+                output_file.close()
+
+        stats['output_file'] = output_path
+        return stats
+
+    def route_requests(self, lines: Iterable[str], output: IO[str], top_k: int = 3,
+                       chunk_size: int = 1024) -> Dict[str, Any]:
+        """Route JSONL request lines and write their top-k agents to output as JSONL"""
+        from agent_batch_router import BatchRouter
+
+        batch_router = BatchRouter(self.router, top_k=top_k, chunk_size=chunk_size)
+        with self.metrics.stage('batch_route'):
+            stats = batch_router.route_stream(lines, output)
+        logging.info(f"Routed {stats['requests']} requests in {stats['seconds']:.3f}s "
+                     f"({stats['queries_per_second']:.0f} queries/sec, {stats['engine']} engine)")
+        return stats
+
+    def save_mapped_registry(self, path: Optional[str] = None) -> str:
+        """Write the registry and its routing index as a snapshot file that worker processes mmap
+
+        Workers open it with agent_mapped_registry.MappedRegistry instead of
+        constructing their own system. Defaults to agent_registry.snapshot in
+        the output directory.
+        """
+        from agent_mapped_registry import MAPPED_REGISTRY_FILE, write_mapped_registry
+
+        with self.metrics.stage('export'):
+            snapshot = self._snapshot
+            metadata = {'agents_directory': str(self.agents_dir.resolve()), 'generation': snapshot.generation,
+                        'timestamp': datetime.now().isoformat()}
+            return write_mapped_registry(snapshot.agents, snapshot.router,
+                                         path or str(self.output_dir / MAPPED_REGISTRY_FILE), metadata)
+
+    def execute_agent(self, agent_name: str, user_query: str, context: str = "", save_output: bool = False,
+                      deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Execute a specific agent with user query
+
+        deadline is a time.monotonic() value the backend gives up after.
+        """
         agent = self.get_agent(agent_name)
         if not agent:
             return {
@@ -364,8 +1091,9 @@ class AugmentAgentSystem:
             }
 
         # Construct the full prompt for Augment
-        augment_prompt = self._build_augment_prompt(agent, user_query, context)
-        instructions = self._get_execution_instructions(agent)
+        with self.metrics.stage('build_prompt'):
+            augment_prompt = self._build_augment_prompt(agent, user_query, context)
+            instructions = self._get_execution_instructions(agent)
 
         result = {
             'success': True,
@@ -379,6 +1107,20 @@ class AugmentAgentSystem:
             'context': context
         }
 
+        if self.backend is not None:
+            from agent_backend import BackendError
+
+            try:
+                with self.metrics.stage('backend_complete'):
+                    response = self.backend.complete(augment_prompt, agent, deadline=deadline)
+            except BackendError as e:
+                logging.error(f"Backend failed for agent {agent['name']}: {e}")
+                self.metrics.count('backend_errors')
+                result.update(success=False, error=str(e))
+                return result
+            result['response'] = response['text']
+            result['backend'] = {key: value for key, value in response.items() if key != 'text'}
+
         # Save output if requested
         if save_output:
             output_file = self._save_execution_output(result)
@@ -386,6 +1128,65 @@ class AugmentAgentSystem:
 
         return result
 
+    async def aexecute_agent(self, agent_name: str, user_query: str, context: str = "", save_output: bool = False,
+                             timeout: Optional[float] = None, executor: Optional[Any] = None) -> Dict[str, Any]:
+        """Execute an agent in a worker thread without blocking the event loop
+
+        After timeout seconds an error result with 'timed_out' comes back and
+        the backend gives up. Cancelling the awaiting task drops the result;
+        a backend request already sent finishes in its thread.
+        """
+        import asyncio
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        call = asyncio.get_running_loop().run_in_executor(
+            executor, lambda: self.execute_agent(agent_name, user_query, context, save_output, deadline))
+        try:
+            result = await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            result = {'success': False, 'agent': agent_name, 'user_query': user_query, 'context': context}
+        else:
+            # The backend also gives up at the deadline, which may beat wait_for
+            if result['success'] or deadline is None or time.monotonic() < deadline:
+                return result
+        logging.warning(f"Agent {agent_name} timed out after {timeout}s")
+        self.metrics.count('execute_timeouts')
+        result.update(error=f"Agent '{agent_name}' timed out after {timeout}s", timed_out=True)
+        return result
+
+    async def aexecute_many(self, requests: Iterable[Dict[str, Any]], concurrency: int = EXECUTE_CONCURRENCY,
+                            timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Execute agents concurrently and return their results in request order
+
+        Each request holds aexecute_agent arguments: agent_name, user_query and
+        optionally context, save_output and a timeout overriding this one. At
+        most concurrency executions run at once, each limited to its timeout
+        from when it starts. Cancelling this call cancels every unfinished one.
+        """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1: {concurrency}")
+        requests = list(requests)
+        for request in requests:
+            if 'agent_name' not in request or 'user_query' not in request:
+                raise ValueError(f"Execution request needs agent_name and user_query: {request}")
+
+        semaphore = asyncio.Semaphore(concurrency)
+        # The default executor has too few threads for a high limit on a small machine
+        executor = ThreadPoolExecutor(concurrency, thread_name_prefix='agent-execute')
+
+        async def execute(request: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.aexecute_agent(**{'timeout': timeout, **request}, executor=executor)
+
+        try:
+            return list(await asyncio.gather(*(execute(request) for request in requests)))
+        finally:
+            # Threads of timed-out or cancelled calls finish in the background
+            executor.shutdown(wait=False)
+
     def _save_execution_output(self, result: Dict[str, Any]) -> str:
         """Save execution output to file"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -412,6 +1213,13 @@ Context:
 PROMPT FOR AUGMENT:
 {'=' * 60}
 {result['prompt']}
+"""
+        if 'response' in result:
+            output_content += f"""
+{'=' * 60}
+RESPONSE ({result['backend'].get('model', 'backend')}):
+{'=' * 60}
+{result['response']}
 """
 
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -421,52 +1229,49 @@ PROMPT FOR AUGMENT:
         return str(output_file)
 
     def get_agent_statistics(self) -> Dict[str, Any]:
-        """Get statistics about loaded agents"""
-        if not self.agents:
-            return {'total_agents': 0, 'categories': {}}
-
-        categories = {}
-        tools_usage = {}
-
-        for agent in self.agents.values():
-            # Count by category
-            category = agent['category']
-            categories[category] = categories.get(category, 0) + 1
-
-            # Count tool usage
-            for tool in agent['tools']:
-                tools_usage[tool] = tools_usage.get(tool, 0) + 1
-
+        """Get statistics about loaded agents; with none, the usage keys are empty or None"""
+        total_agents, categories, tools_usage = self._usage_counts()
         return {
-            'total_agents': len(self.agents),
+            'total_agents': total_agents,
             'categories': categories,
             'tools_usage': tools_usage,
-            'most_common_category': max(categories.items(), key=lambda x: x[1])[0] if categories else None,
-            'most_used_tool': max(tools_usage.items(), key=lambda x: x[1])[0] if tools_usage else None
+            # Ties go to the alphabetically first key so incremental and full loads agree
+            'most_common_category': min(categories.items(), key=lambda x: (-x[1], x[0]))[0] if categories else None,
+            'most_used_tool': min(tools_usage.items(), key=lambda x: (-x[1], x[0]))[0] if tools_usage else None,
+            **({'prompt_chunks': {'distinct': len(self.chunk_store),
+                                  'characters': self.chunk_store.stored_characters()}}
+               if self.chunk_store is not None else {}),
+            'performance': self.metrics.snapshot()
         }
 
+    def _usage_counts(self) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+        """Agent count, agents per category and uses of each tool"""
+        snapshot = self._snapshot
+        return len(snapshot.agents), dict(snapshot.category_counts), dict(snapshot.tool_counts)
+
     def search_agents(self, search_term: str, search_in: List[str] = None) -> List[Dict[str, Any]]:
         """Search agents by term in specified fields"""
-        if search_in is None:
-            search_in = ['name', 'description', 'category']
-
-        search_term_lower = search_term.lower()
-        matching_agents = []
-
-        for agent in self.agents.values():
-            match_found = False
-
-            for field in search_in:
-                if field in agent:
-                    field_value = str(agent[field]).lower()
-                    if search_term_lower in field_value:
-                        match_found = True
-                        break
-
-            if match_found:
-                matching_agents.append(agent)
-
-        return matching_agents
+        with self.metrics.stage('search'):
+            if search_in is None:
+                search_in = ['name', 'description', 'category']
+
+            indexed_fields = [field for field in search_in if field in AgentSearchIndex.FIELDS]
+            other_fields = [field for field in search_in if field not in AgentSearchIndex.FIELDS]
+            snapshot = self._snapshot
+            matching_names = snapshot.search_index.search(search_term, indexed_fields)
+            if not other_fields:
+                return [snapshot.agents[name] for name in matching_names]
+
+            # Fields outside the trigram index are scanned directly
+            search_term_lower = search_term.lower()
+            matching = set(matching_names)
+            matching_agents = []
+            for name, agent in snapshot.agents.items():
+                if name in matching or any(field in agent and search_term_lower in str(agent[field]).lower()
+                                           for field in other_fields):
+                    matching_agents.append(agent)
+
+            return matching_agents
 
     def validate_agents(self) -> Dict[str, List[str]]:
         """Validate all loaded agents and return issues"""
@@ -477,24 +1282,61 @@ PROMPT FOR AUGMENT:
             'missing_files': []
         }
 
-        required_fields = ['name', 'description', 'system_prompt', 'file_path']
-
         for agent_name, agent in self.agents.items():
-            # Check required fields
-            for field in required_fields:
-                if field not in agent or not agent[field]:
-                    issues['missing_fields'].append(f"{agent_name}: missing {field}")
+            self._validate_agent(agent_name, agent, issues)
+
+        return issues
+
+    @classmethod
+    def validate_agent_file(cls, file_path: str) -> Dict[str, List[str]]:
+        """Validate one agent file without loading the registry"""
+        issues = {
+            'parse_errors': [],
+            'missing_fields': [],
+            'invalid_tools': [],
+            'empty_descriptions': [],
+            'missing_files': []
+        }
+
+        path = Path(file_path)
+        if not path.exists():
+            issues['missing_files'].append(str(path))
+            return issues
 
-            # Check if description is meaningful
-            if agent.get('description', '').strip() == '':
-                issues['empty_descriptions'].append(agent_name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception as e:
+            issues['parse_errors'].append(f"Error reading {path}: {e}")
+            return issues
 
-            # Check if file still exists
-            file_path = Path(agent.get('file_path', ''))
-            if not file_path.exists():
-                issues['missing_files'].append(f"{agent_name}: {file_path}")
+        agent = cls._parse_agent_content(content, path, issues['parse_errors'])
+        if agent is None:
+            if not issues['parse_errors']:
+                issues['parse_errors'].append(f"{path}: no frontmatter block")
+            return issues
 
+        cls._validate_agent(agent['name'] or path.stem, agent, issues)
         return issues
+
+    @staticmethod
+    def _validate_agent(agent_name: str, agent: Dict[str, Any], issues: Dict[str, List[str]]) -> None:
+        """Append the issues of one agent record to issues"""
+        required_fields = ['name', 'description', 'system_prompt', 'file_path']
+
+        # Check required fields
+        for field in required_fields:
+            if field not in agent or not agent[field]:
+                issues['missing_fields'].append(f"{agent_name}: missing {field}")
+
+        # Check if description is meaningful
+        if (agent.get('description') or '').strip() == '':
+            issues['empty_descriptions'].append(agent_name)
+
+        # Check if file still exists
+        file_path = Path(agent.get('file_path', ''))
+        if not file_path.exists():
+            issues['missing_files'].append(f"{agent_name}: {file_path}")
     
     def _build_augment_prompt(self, agent: Dict[str, Any], user_query: str, context: str) -> str:
         """Build the complete prompt for Augment"""
@@ -524,6 +1366,74 @@ To use this agent effectively:
 4. Chain with other agents for complex workflows
 """
 
+def _read_agent_head(f) -> bytes:
+    """Read an agent file up to the end of its frontmatter, or all of it if unterminated"""
+    head = f.read(3)
+    if head != b'---':
+        return head
+    search_from = 3
+    while True:
+        end = head.find(b'---', search_from)
+        if end != -1:
+            return head[:end + 3]
+        chunk = f.read(8192)
+        if not chunk:
+            return head
+        # A closing marker may straddle the chunk boundary
+        search_from = max(3, len(head) - 2)
+        head += chunk
+
+def _load_agent_file(file_path: Path, cached_sha256: Optional[str] = None,
+                     lazy: bool = False) -> Dict[str, Any]:
+    """Read, hash and parse one agent file; runs inline or in a loader pool worker
+
+    In lazy mode only the frontmatter is read and hashed, and the result records
+    the byte offset where the system prompt starts instead of the prompt itself.
+    """
+    import hashlib
+
+    try:
+        start = time.perf_counter_ns()
+        with open(file_path, 'rb') as f:
+            raw = _read_agent_head(f) if lazy else f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        read_ns = time.perf_counter_ns() - start
+        if digest == cached_sha256:
+            return {'sha256': digest, 'agent': None, 'reused': True, 'cacheable': True, 'errors': [],
+                    'read_ns': read_ns}
+
+        errors: List[str] = []
+        parse_info: Dict[str, Any] = {}
+        if lazy:
+            agent = None
+            if raw.startswith(b'---') and raw.endswith(b'---') and len(raw) >= 6:
+                agent = AugmentAgentSystem._build_agent(_normalize_newlines(raw[3:-3]), None,
+                                                        file_path, errors, parse_info)
+            result = {'sha256': digest, 'agent': agent, 'body_offset': len(raw)}
+            is_agent_file = raw.startswith(b'---')
+        else:
+            content = _normalize_newlines(raw)
+            agent = AugmentAgentSystem._parse_agent_content(content, file_path, errors, parse_info)
+            # CRLF line endings hold no '-', so the byte offset matches the text split
+            result = {'sha256': digest, 'agent': agent, 'body_offset': raw.find(b'---', 3) + 3}
+            is_agent_file = content.startswith('---')
+
+        result.update({
+            'reused': False,
+            'cacheable': agent is not None or not is_agent_file,
+            'errors': errors,
+            'read_ns': read_ns,
+            'parse_ns': time.perf_counter_ns() - start - read_ns,
+            'frontmatter_path': parse_info.get('frontmatter_path')
+        })
+        return result
+    except Exception as e:
+        return {'load_error': str(e)}
+
+def _agent_to_dict(agent: Any) -> Dict[str, Any]:
+    """Return a plain dict for serialization, loading a lazy system prompt if needed"""
+    return agent.to_dict() if isinstance(agent, AgentRecord) else agent
+
 def main():
     parser = argparse.ArgumentParser(description='Augment Agent Integration System')
     parser.add_argument('--list-agents', action='store_true', help='List all available agents')
@@ -534,27 +1444,202 @@ def main():
     parser.add_argument('--agents-dir', type=str, default='.', help='Path to agents directory')
     parser.add_argument('--output-dir', type=str, default='output', help='Output directory for files')
     parser.add_argument('--save-output', action='store_true', help='Save output to files')
-    parser.add_argument('--export-format', type=str, choices=['json', 'yaml', 'csv'],
-                       help='Export agents data in specified format')
+    parser.add_argument('--export-format', type=str, choices=['json', 'yaml', 'csv', 'jsonl', 'yaml-stream'],
+                       help='Export agents data in specified format (jsonl, csv and yaml-stream are '
+                            'written agent by agent)')
+    parser.add_argument('--export-fields', type=str, metavar='FIELDS',
+                       help='Comma-separated agent fields to export, e.g. name,description,tools')
+    parser.add_argument('--export-compression', type=str, choices=['gzip', 'lzma'],
+                       help='Compress the export file')
     parser.add_argument('--search', type=str, help='Search agents by term')
     parser.add_argument('--stats', action='store_true', help='Show agent statistics')
-    parser.add_argument('--validate', action='store_true', help='Validate all agents')
+    parser.add_argument('--validate', nargs='?', const=True, metavar='FILE',
+                       help='Validate all agents, or only the agent file FILE')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose logging')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore the compiled agent registry cache')
+    parser.add_argument('--load-workers', type=int, default=0,
+                       help='Parse agent files in parallel with this many workers')
+    parser.add_argument('--load-executor', type=str, choices=['thread', 'process'], default='thread',
+                       help='Worker pool type used with --load-workers')
+    parser.add_argument('--lazy-prompts', action='store_true',
+                       help='Load agent system prompts from disk only when an agent is executed')
+    parser.add_argument('--dedup-prompts', action='store_true',
+                       help='Keep identical prompt sections and descriptions once in memory')
+    parser.add_argument('--export-dedup', action='store_true',
+                       help='Store identical prompt sections once in JSON and YAML exports')
+    parser.add_argument('--sqlite-db', type=str, metavar='FILE',
+                       help='Keep the registry in this SQLite database, syncing only changed agent files')
+    parser.add_argument('--save-mapped-registry', nargs='?', const=True, metavar='FILE',
+                       help='Write a registry snapshot for worker processes to mmap '
+                            '(default: <output-dir>/agent_registry.snapshot)')
+    parser.add_argument('--batch-route', type=str,
+                       help="Route every request in a JSONL file ('-' for stdin) to its top agents")
+    parser.add_argument('--batch-output', type=str,
+                       help="JSONL file for --batch-route results ('-' for stdout)")
+    parser.add_argument('--top-k', type=int, default=3, help='Agents returned per request by --batch-route')
+    parser.add_argument('--batch-chunk-size', type=int, default=1024,
+                       help='Requests scored together per chunk by --batch-route')
+
+    parser.add_argument('--serve', action='store_true',
+                       help='Run a daemon that keeps the agents loaded and answers CLI requests')
+    parser.add_argument('--socket', type=str,
+                       help="Daemon address: a Unix socket path or tcp://host:port "
+                            "(default: <output-dir>/agent_daemon.sock)")
+    parser.add_argument('--no-daemon', action='store_true', help='Do not forward requests to a running daemon')
+    parser.add_argument('--watch-interval', type=float, default=2.0,
+                       help='Seconds between agent file checks while serving (0 disables)')
+    parser.add_argument('--backend', type=str, metavar='URL',
+                       help='Send executed prompts to this chat completions endpoint, or "mock" for a local '
+                            'stand-in (bearer token from $AGENT_BACKEND_API_KEY)')
+    parser.add_argument('--backend-model', type=str, help='Model name sent to the backend')
+    parser.add_argument('--backend-timeout', type=float,
+                       help='Seconds to wait for a backend response (default: 60)')
+    parser.add_argument('--backend-retries', type=int, help='Retries of failed backend requests (default: 3)')
+    parser.add_argument('--run-workflow', type=str, metavar='FILE',
+                       help='Run a YAML workflow definition, independent steps in parallel')
+    parser.add_argument('--workflow-params', type=str, metavar='FILE',
+                       help='Run the workflow once per context in this YAML list or JSONL file')
+    parser.add_argument('--run-dir', type=str,
+                       help='Directory for workflow step results (default: a new one under output/workflow_runs)')
+    parser.add_argument('--workflow-workers', type=int, default=EXECUTE_CONCURRENCY,
+                       help='Workflow steps run at once, across all runs')
+    parser.add_argument('--workflow-executor', type=str, choices=['thread', 'process'], default='thread',
+                       help='Run workflow steps on threads or in worker processes')
+    parser.add_argument('--resume', action='store_true',
+                       help='Reuse workflow steps saved with unchanged inputs in output/workflow_checkpoints, '
+                            'and save the steps that run')
+    parser.add_argument('--profile', action='store_true',
+                       help='Print a per-stage timing breakdown after the command')
+    parser.add_argument('--profile-output', type=str,
+                       help='Also save the timing breakdown as JSON to this file (implies --profile)')
 
     args = parser.parse_args()
+    daemon_address = args.socket or str(Path(args.output_dir) / 'agent_daemon.sock')
 
-    # Initialize the system
-    system = AugmentAgentSystem(args.agents_dir, args.output_dir, args.verbose)
-    
+    if isinstance(args.validate, str):
+        # One file is parsed on its own, without the registry
+        _print_validation_report(AugmentAgentSystem.validate_agent_file(args.validate), args.save_output,
+                                 Path(args.output_dir))
+        return
+
+    # Lookups, searches and listings are served from the name index while it
+    # matches the agent files, skipping the directory walk and the parsing
+    system = None
+    if args.sqlite_db:
+        from agent_sqlite_registry import SQLiteAgentSystem
+
+        system = SQLiteAgentSystem(args.sqlite_db, args.agents_dir, args.output_dir, args.verbose)
+
+    index_command = ((args.use_agent or args.search or args.auto_select or args.list_agents)
+                     and not (args.export_format or args.batch_route or args.stats or args.validate
+                              or args.save_mapped_registry))
+    if system is None and index_command and not (args.serve or args.no_cache):
+        system = AugmentAgentSystem.from_name_index(args.agents_dir, args.output_dir, args.verbose)
+
+    # Forward to a running daemon when one serves the same agents directory;
+    # executions through a backend given here run here
+    streams_locally = args.batch_route and '-' in (args.batch_route, args.batch_output)
+    if system is None and not (args.serve or args.no_daemon or streams_locally or args.backend
+                               or args.run_workflow):
+        from agent_daemon import connect
+        system = connect(daemon_address, args.agents_dir, args.output_dir)
+
+    if system is None:
+        # Initialize the system
+        system = AugmentAgentSystem(args.agents_dir, args.output_dir, args.verbose,
+                                    use_cache=not args.no_cache, load_workers=args.load_workers,
+                                    load_executor=args.load_executor, lazy_prompts=args.lazy_prompts,
+                                    dedup_prompts=args.dedup_prompts)
+
+    if args.backend:
+        from agent_backend import create_backend
+
+        options = {'model': args.backend_model, 'timeout': args.backend_timeout, 'max_retries': args.backend_retries}
+        system.backend = create_backend(args.backend, **{key: value for key, value in options.items()
+                                                         if value is not None})
+
+    try:
+        if args.serve:
+            from agent_daemon import serve
+            serve(system, daemon_address, args.watch_interval)
+            return
+
+        _run_command(args, system, parser)
+    finally:
+        # Forwarded systems have no backend of their own
+        backend = getattr(system, 'backend', None)
+        if backend is not None:
+            backend.close()
+
+    if args.profile or args.profile_output:
+        from agent_metrics import format_profile, save_profile
+
+        # A forwarded command reports the daemon's cumulative timings
+        profile = system.get_agent_statistics()['performance']
+        # Keep stdout clean for JSONL when batch results are streamed there
+        report = sys.stderr if args.batch_output == '-' else sys.stdout
+        print('\n' + format_profile(profile), file=report)
+        if args.profile_output:
+            save_profile(profile, args.profile_output)
+            print(f"✅ Profile saved to: {args.profile_output}", file=report)
+
+def _run_command(args: argparse.Namespace, system: Any, parser: argparse.ArgumentParser) -> None:
+    """Run the command selected by the CLI arguments"""
     # Handle various commands
     if args.export_format:
         try:
-            output_file = system.export_agents_data(args.export_format)
+            output_file = system.export_agents_data(args.export_format, args.export_dedup, args.export_fields,
+                                                    args.export_compression)
             print(f"✅ Exported agents data to: {output_file}")
         except Exception as e:
             print(f"❌ Export failed: {e}")
         return
 
+    if args.run_workflow:
+        from agent_workflow import format_batch_report, format_workflow_report, load_workflow, run_workflow_batch
+
+        checkpoint = None
+        if args.resume:
+            from agent_checkpoint import CHECKPOINT_DIR, WorkflowCheckpoint
+
+            checkpoint = WorkflowCheckpoint(system.output_dir / CHECKPOINT_DIR)
+        try:
+            workflow = load_workflow(args.run_workflow)
+            batch = run_workflow_batch(system, workflow, args.workflow_params, args.run_dir, args.workflow_workers,
+                                       args.workflow_executor, save_output=args.save_output, checkpoint=checkpoint)
+        except (OSError, ValueError) as e:
+            print(f"❌ Invalid workflow: {e}")
+            sys.exit(1)
+        print(f"🔬 Workflow {workflow.name}")
+        print(format_workflow_report(batch['runs'][0]) if len(batch['runs']) == 1 else format_batch_report(batch))
+        for report in batch['runs']:
+            for step_id, step in report['steps'].items():
+                if step['status'] == 'failed':
+                    print(f"❌ {report['workflow']} {step_id}: {step['error']}")
+        print(f"✅ Run saved to: {batch['run_dir']}")
+        if not batch['success']:
+            sys.exit(1)
+        return
+
+    if args.save_mapped_registry:
+        path = args.save_mapped_registry if isinstance(args.save_mapped_registry, str) else None
+        try:
+            output_file = system.save_mapped_registry(path)
+            print(f"✅ Mapped registry saved to: {output_file}")
+        except Exception as e:
+            print(f"❌ Mapped registry failed: {e}")
+        return
+
+    if args.batch_route:
+        stats = system.batch_route(args.batch_route, args.batch_output, args.top_k, args.batch_chunk_size)
+        # Keep stdout clean for JSONL when results are streamed there
+        report = sys.stderr if stats['output_file'] == '-' else sys.stdout
+        print(f"✅ Routed {stats['requests']} requests in {stats['seconds']:.3f}s "
+              f"({stats['queries_per_second']:.0f} queries/sec, {stats['engine']} engine)", file=report)
+        if stats['output_file'] != '-':
+            print(f"✅ Routes saved to: {stats['output_file']}")
+        return
+
     if args.stats:
         stats = system.get_agent_statistics()
         print("📊 Agent Statistics:")
@@ -567,9 +1652,9 @@ def main():
             for category, count in sorted(stats['categories'].items()):
                 print(f"  • {category}: {count}")
 
-        if stats['tools_usage']:
-            print(f"\nMost Used Tool: {stats['most_used_tool']}")
-            print(f"Most Common Category: {stats['most_common_category']}")
+        if stats.get('tools_usage'):
+            print(f"\nMost Used Tool: {stats.get('most_used_tool')}")
+            print(f"Most Common Category: {stats.get('most_common_category')}")
 
         if args.save_output:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -580,28 +1665,7 @@ def main():
         return
 
     if args.validate:
-        issues = system.validate_agents()
-        print("🔍 Agent Validation Results:")
-        print("=" * 35)
-
-        total_issues = sum(len(issue_list) for issue_list in issues.values())
-        if total_issues == 0:
-            print("✅ All agents are valid!")
-        else:
-            print(f"❌ Found {total_issues} issues:")
-
-            for issue_type, issue_list in issues.items():
-                if issue_list:
-                    print(f"\n{issue_type.replace('_', ' ').title()}:")
-                    for issue in issue_list:
-                        print(f"  • {issue}")
-
-        if args.save_output:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            validation_file = system.output_dir / f'validation_report_{timestamp}.json'
-            with open(validation_file, 'w') as f:
-                json.dump(issues, f, indent=2)
-            print(f"✅ Validation report saved to: {validation_file}")
+        _print_validation_report(system.validate_agents(), args.save_output, system.output_dir)
         return
 
     if args.search:
@@ -626,7 +1690,7 @@ def main():
                 json.dump({
                     'search_term': args.search,
                     'results_count': len(matching_agents),
-                    'agents': matching_agents
+                    'agents': [_agent_to_dict(agent) for agent in matching_agents]
                 }, f, indent=2)
             print(f"✅ Search results saved to: {search_file}")
         return
@@ -645,14 +1709,7 @@ def main():
         result = system.execute_agent(args.use_agent, args.query, args.context, args.save_output)
 
         if result['success']:
-            print(result['instructions'])
-            print("\n" + "="*60)
-            print("PROMPT FOR AUGMENT:")
-            print("="*60)
-            print(result['prompt'])
-
-            if 'output_file' in result:
-                print(f"\n✅ Execution output saved to: {result['output_file']}")
+            _print_execution(result)
         else:
             print(f"❌ Error: {result['error']}")
             if 'available_agents' in result:
@@ -682,18 +1739,54 @@ def main():
             
             result = system.execute_agent(top_agent['name'], args.auto_select, args.context, args.save_output)
             if result['success']:
-                print(result['instructions'])
-                print("\n" + "="*60)
-                print("PROMPT FOR AUGMENT:")
-                print("="*60)
-                print(result['prompt'])
-
-                if 'output_file' in result:
-                    print(f"\n✅ Execution output saved to: {result['output_file']}")
+                _print_execution(result)
+            else:
+                print(f"❌ Error: {result['error']}")
         return
     
     # If no specific action, show help
     parser.print_help()
 
+def _print_execution(result: Dict[str, Any]) -> None:
+    """Print an execution's response, or its prompt for Augment when no backend ran it"""
+    if 'response' in result:
+        print(f"🤖 {result['agent']} ({result['backend'].get('model', 'backend')}):")
+        print("=" * 60)
+        print(result['response'])
+    else:
+        print(result['instructions'])
+        print("\n" + "="*60)
+        print("PROMPT FOR AUGMENT:")
+        print("="*60)
+        print(result['prompt'])
+
+    if 'output_file' in result:
+        print(f"\n✅ Execution output saved to: {result['output_file']}")
+
+def _print_validation_report(issues: Dict[str, List[str]], save_output: bool, output_dir: Path) -> None:
+    """Print validation issues and optionally save them as JSON"""
+    print("🔍 Agent Validation Results:")
+    print("=" * 35)
+
+    total_issues = sum(len(issue_list) for issue_list in issues.values())
+    if total_issues == 0:
+        print("✅ All agents are valid!")
+    else:
+        print(f"❌ Found {total_issues} issues:")
+
+        for issue_type, issue_list in issues.items():
+            if issue_list:
+                print(f"\n{issue_type.replace('_', ' ').title()}:")
+                for issue in issue_list:
+                    print(f"  • {issue}")
+
+    if save_output:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir.mkdir(exist_ok=True)
+        validation_file = output_dir / f'validation_report_{timestamp}.json'
+        with open(validation_file, 'w') as f:
+            json.dump(issues, f, indent=2)
+        print(f"✅ Validation report saved to: {validation_file}")
+
 if __name__ == "__main__":
     main()
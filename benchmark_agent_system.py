@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Agent system benchmark suite
+
+Generates synthetic agent trees, times the main AugmentAgentSystem operations
+on each and compares the results against a stored baseline. The run fails when
+a metric is slower than its baseline by more than the tolerance, or when a
+measured metric has no entry in the baseline of its corpus size. Sizes
+without any baseline, such as a one-off 100000 agent run, are reported as
+not compared rather than failing.
+
+Baselines are machine-specific: refresh benchmark_baseline.json with
+--update-baseline after changing hardware or on purpose after a change that
+trades speed for something else.
+
+Usage:
+    python benchmark_agent_system.py
+    python benchmark_agent_system.py --sizes 100,10000,100000 --repeat 1
+    python benchmark_agent_system.py --update-baseline
+    python benchmark_agent_system.py --memory --sizes 10000
+"""
+
+import argparse
+import gc
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from agent_backend import HTTPBackend, MockLLMServer
+from augment_agent_integration import AugmentAgentSystem
+from benchmark_frontmatter import synthetic_frontmatters
+
+DEFAULT_SIZES = [100, 10000]
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+# Metrics may be this much slower than the baseline (a fraction) before the run fails
+DEFAULT_TOLERANCE = 0.25
+
+# Differences below this many seconds are timer noise, never regressions
+MIN_REGRESSION_SECONDS = 0.002
+
+# Operations slower than this are timed once; their noise is small relative to their length
+REPEAT_LIMIT_SECONDS = 1.0
+
+# Timed exports: metric name, format and compression
+EXPORTS = [('export_json', 'json', None), ('export_yaml', 'yaml', None), ('export_csv', 'csv', None),
+           ('export_jsonl', 'jsonl', None), ('export_yaml_stream', 'yaml-stream', None),
+           ('export_jsonl_gzip', 'jsonl', 'gzip')]
+
+# Concurrent executions, and pooled connections, in the mock backend benchmark
+BACKEND_THREADS = 8
+
+CATEGORY_DIRS = ['research-planning', 'literature-review', 'experimental-design', 'research-development',
+                 'data-analysis', 'paper-writing', 'research-operations']
+
+QUERIES = ['statistical analysis of experiment results', 'literature review on sparse forecasting',
+           'generate research ideas', 'academic writing for a journal paper', 'data visualization',
+           'design an experiment methodology', 'citation analysis', 'area 42 research tasks']
+
+SEARCH_TERMS = ['research', 'agent-7', 'Data Analysis', 'example', 'zz-no-match']
+
+BODY_WORDS = ['analysis', 'research', 'data', 'model', 'experiment', 'hypothesis', 'results', 'method',
+              'forecasting', 'sparse', 'statistical', 'evidence', 'review', 'paper', 'citation', 'design',
+              'baseline', 'evaluation', 'metric', 'variance', 'sample', 'literature', 'theory', 'signal']
+
+def synthetic_body(rng: random.Random, target_bytes: int = 10 * 1024) -> str:
+    """A system prompt of about target_bytes made of headed paragraphs"""
+    sections = []
+    size = 0
+    while size < target_bytes:
+        heading = f"## {rng.choice(BODY_WORDS).title()} {rng.choice(BODY_WORDS).title()}"
+        sentences = []
+        for _ in range(rng.randint(4, 8)):
+            words = rng.choices(BODY_WORDS, k=rng.randint(8, 16))
+            sentences.append(' '.join(words).capitalize() + '.')
+        section = f"{heading}\n\n{' '.join(sentences)}\n"
+        sections.append(section)
+        size += len(section)
+    return '\n'.join(sections)
+
+def generate_agent_tree(root: Path, count: int, seed: int = 0) -> Path:
+    """Write count agent files spread over the research category directories"""
+    rng = random.Random(seed)
+    for directory in CATEGORY_DIRS:
+        (root / directory).mkdir(parents=True, exist_ok=True)
+    for i, frontmatter in enumerate(synthetic_frontmatters(count, seed)):
+        agent_file = root / CATEGORY_DIRS[i % len(CATEGORY_DIRS)] / f"agent-{i}.md"
+        agent_file.write_text(f"---\n{frontmatter}\n---\n\n{synthetic_body(rng)}", encoding='utf-8')
+    return root
+
+def best_time(operation: Callable[[], Any], repeat: int) -> float:
+    """Best wall time of operation over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        best = min(best, time.perf_counter() - start)
+        if best > REPEAT_LIMIT_SECONDS:
+            break
+    return best
+
+def backend_time(system: AugmentAgentSystem, names: List[str], repeat: int) -> float:
+    """Seconds per execute_agent call sent through HTTPBackend to a local MockLLMServer, BACKEND_THREADS at a time"""
+    calls = names * BACKEND_THREADS
+    with MockLLMServer() as server, HTTPBackend(server.url, pool_size=BACKEND_THREADS) as backend, \
+            ThreadPoolExecutor(BACKEND_THREADS) as pool:
+        system.backend = backend
+        try:
+            return best_time(lambda: list(pool.map(lambda name: system.execute_agent(name, QUERIES[0]), calls)),
+                             repeat) / len(calls)
+        finally:
+            system.backend = None
+
+def benchmark_corpus(agents_dir: Path, work_dir: Path, repeat: int) -> Dict[str, float]:
+    """Time each AugmentAgentSystem operation on one agent tree, in seconds"""
+    results: Dict[str, float] = {}
+    cold_runs = iter(range(repeat))
+
+    def load_cold() -> None:
+        AugmentAgentSystem(str(agents_dir), str(work_dir / f"cold-{next(cold_runs)}"), use_cache=False)
+
+    results['load_agents_cold'] = best_time(load_cold, repeat)
+
+    output_dir = work_dir / "warm"
+    AugmentAgentSystem(str(agents_dir), str(output_dir))
+    results['load_agents_warm'] = best_time(lambda: AugmentAgentSystem(str(agents_dir), str(output_dir)),
+                                            repeat)
+
+    system = AugmentAgentSystem(str(agents_dir), str(output_dir))
+    names = list(system.agents)[:20]
+    # The first search builds the trigram index; time it apart from steady-state searches
+    results['search_index_build'] = best_time(lambda: system.search_agents(SEARCH_TERMS[0]), 1)
+
+    results['find_relevant_agents'] = best_time(
+        lambda: [system.find_relevant_agents(query) for query in QUERIES], repeat) / len(QUERIES)
+    results['search_agents'] = best_time(
+        lambda: [system.search_agents(term) for term in SEARCH_TERMS], repeat) / len(SEARCH_TERMS)
+    results['execute_agent'] = best_time(
+        lambda: [system.execute_agent(name, QUERIES[0]) for name in names], repeat) / len(names)
+    results['execute_agent_backend'] = backend_time(system, names, repeat)
+    for metric, format_type, compression in EXPORTS:
+        results[metric] = best_time(lambda: system.export_agents_data(format_type, compression=compression), repeat)
+    results['validate_agents'] = best_time(system.validate_agents, repeat)
+    return results
+
+def run_benchmarks(sizes: List[int], repeat: int, work_root: Optional[Path] = None) -> Dict[str, Dict[str, float]]:
+    """Benchmark a synthetic tree of each size, keyed by size"""
+    results = {}
+    with tempfile.TemporaryDirectory(dir=work_root) as temp_dir:
+        for size in sizes:
+            corpus_dir = Path(temp_dir) / f"corpus-{size}"
+            start = time.perf_counter()
+            generate_agent_tree(corpus_dir / "agents", size)
+            print(f"Generated {size} agents in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+            results[str(size)] = benchmark_corpus(corpus_dir / "agents", corpus_dir, repeat)
+    return results
+
+def registry_memory(agents_dir: Path, output_dir: Path, lazy_prompts: bool = False) -> int:
+    """Bytes a warm-cache AugmentAgentSystem keeps allocated after loading, measured with tracemalloc"""
+    AugmentAgentSystem(str(agents_dir), str(output_dir), lazy_prompts=lazy_prompts)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        system = AugmentAgentSystem(str(agents_dir), str(output_dir), lazy_prompts=lazy_prompts)
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del system
+    return retained
+
+def run_memory_report(sizes: List[int], work_root: Optional[Path] = None) -> Dict[str, Dict[str, int]]:
+    """Retained registry memory for a synthetic tree of each size, with eager and lazy prompts"""
+    results = {}
+    with tempfile.TemporaryDirectory(dir=work_root) as temp_dir:
+        for size in sizes:
+            corpus_dir = Path(temp_dir) / f"corpus-{size}"
+            generate_agent_tree(corpus_dir / "agents", size)
+            results[str(size)] = {
+                'eager_bytes': registry_memory(corpus_dir / "agents", corpus_dir / "eager"),
+                'lazy_bytes': registry_memory(corpus_dir / "agents", corpus_dir / "lazy", lazy_prompts=True)
+            }
+    return results
+
+def format_memory_report(results: Dict[str, Dict[str, int]]) -> str:
+    """Render retained memory per corpus size in MB and bytes per agent"""
+    lines = [f"{'Agents':>8}  {'Prompts':<8}{'Retained MB':>13}{'Bytes/agent':>13}"]
+    for size, measured in results.items():
+        for mode in ('eager', 'lazy'):
+            retained = measured[f'{mode}_bytes']
+            lines.append(f"{size:>8}  {mode:<8}{retained / 1e6:13.2f}{retained / int(size):13.0f}")
+    return '\n'.join(lines)
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+                        tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Describe every metric that regressed past the tolerance or is missing from its size's baseline
+
+    Sizes with no baseline at all are skipped; see uncompared_sizes.
+    """
+    regressions = []
+    for size, metrics in results.items():
+        if size not in baseline:
+            continue
+        for metric, seconds in metrics.items():
+            expected = baseline.get(size, {}).get(metric)
+            if expected is None:
+                # An unchecked metric would never catch a regression
+                regressions.append(f"{size} agents {metric}: no baseline entry (run with --update-baseline)")
+                continue
+            if seconds > expected * (1 + tolerance) and seconds - expected > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{size} agents {metric}: {seconds * 1000:.2f} ms vs baseline "
+                                   f"{expected * 1000:.2f} ms ({seconds / expected:.2f}x)")
+    return regressions
+
+def uncompared_sizes(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> List[str]:
+    """Measured corpus sizes that have no baseline to compare against"""
+    return [size for size in results if size not in baseline]
+
+def format_results(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]]) -> str:
+    """Render results next to their baseline as a table"""
+    lines = [f"{'Agents':>8}  {'Metric':<22}{'Time ms':>12}{'Baseline ms':>13}{'Ratio':>8}"]
+    for size, metrics in results.items():
+        for metric, seconds in metrics.items():
+            expected = baseline.get(size, {}).get(metric)
+            baseline_text = f"{expected * 1000:13.2f}{seconds / expected:8.2f}" if expected else f"{'-':>13}{'-':>8}"
+            lines.append(f"{size:>8}  {metric:<22}{seconds * 1000:12.2f}{baseline_text}")
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='Agent system benchmark suite')
+    parser.add_argument('--sizes', type=str, default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Comma-separated synthetic corpus sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (best is kept)')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help='Baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed slowdown over the baseline as a fraction')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store these results as the baseline instead of checking them')
+    parser.add_argument('--output', type=str, help='Also save the results as JSON to this file')
+    parser.add_argument('--work-dir', type=str, help='Directory for the generated corpora (default: system temp)')
+    parser.add_argument('--memory', action='store_true',
+                        help='Report retained registry memory (tracemalloc) instead of timings')
+    args = parser.parse_args()
+
+    # Per-run log lines would dominate the output
+    logging.disable(logging.INFO)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    if args.memory:
+        memory = run_memory_report(sizes, Path(args.work_dir) if args.work_dir else None)
+        print(format_memory_report(memory))
+        if args.output:
+            Path(args.output).write_text(json.dumps(memory, indent=2))
+        return
+
+    results = run_benchmarks(sizes, args.repeat, Path(args.work_dir) if args.work_dir else None)
+
+    baseline_file = Path(args.baseline)
+    baseline = json.loads(baseline_file.read_text()) if baseline_file.exists() else {}
+    print(format_results(results, baseline))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        baseline.update({size: {metric: round(seconds, 6) for metric, seconds in metrics.items()}
+                         for size, metrics in results.items()})
+        baseline_file.write_text(json.dumps(baseline, indent=2) + '\n')
+        print(f"✅ Baseline saved to: {baseline_file}")
+        return
+
+    uncompared = uncompared_sizes(results, baseline)
+    if uncompared:
+        print(f"\nℹ️  Not compared, no baseline for {', '.join(uncompared)} agents "
+              f"(record one with --update-baseline --sizes {','.join(uncompared)})")
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} metrics regressed more than {args.tolerance:.0%} or have no baseline:")
+        for regression in regressions:
+            print(f"  • {regression}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Frontmatter parsing benchmark
+
+Compares the original frontmatter path (yaml.safe_load with the manual fallback)
+against parse_frontmatter on the shipped agents and on a synthetic corpus.
+
+Usage:
+    python benchmark_frontmatter.py
+    python benchmark_frontmatter.py --synthetic 10000 --repeat 3
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import yaml
+
+from augment_agent_integration import AugmentAgentSystem, FRONTMATTER_KEYS, parse_frontmatter
+
+TOOLS = ['Read', 'Write', 'MultiEdit', 'Bash', 'WebSearch', 'WebFetch', 'Grep']
+COLORS = ['blue', 'green', 'purple', 'orange', 'red', 'yellow']
+
+def legacy_parse(frontmatter_text: str) -> Any:
+    """The frontmatter path used before parse_frontmatter"""
+    try:
+        return yaml.safe_load(frontmatter_text)
+    except yaml.YAMLError:
+        return AugmentAgentSystem._parse_frontmatter_manually(frontmatter_text)
+
+def shipped_frontmatters(agents_dir: Path) -> List[str]:
+    """Frontmatter text of every agent file under agents_dir"""
+    texts = []
+    for agent_file in sorted(agents_dir.rglob("*.md")):
+        content = agent_file.read_text(encoding='utf-8')
+        if content.startswith('---'):
+            parts = content.split('---', 2)
+            if len(parts) >= 3:
+                texts.append(parts[1].strip())
+    return texts
+
+def synthetic_frontmatters(count: int, seed: int = 0) -> List[str]:
+    """Generate frontmatter in the three styles seen in agent trees
+
+    Most entries copy the shipped style (an escaped multi-KB description with
+    <example> blocks that YAML rejects), the rest are plain YAML or use a
+    block scalar description that needs a real YAML parse.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for i in range(count):
+        name = f"agent-{i}"
+        tools = ', '.join(rng.sample(TOOLS, rng.randint(2, 5)))
+        color = rng.choice(COLORS)
+        style = rng.random()
+        if style < 0.7:
+            examples = ''.join(
+                f"\\n\\n<example>\\nContext: Scenario {j} for {name}\\nuser: \"Please help with task {j}\"\\n"
+                f"assistant: \"I'll use the {name} agent for this.\"\\n<commentary>\\nTask {j} needs "
+                f"specialist support.\\n</commentary>\\n</example>" for j in range(rng.randint(3, 6)))
+            description = f"Use this agent when working on area {i}. Examples:{examples}"
+            texts.append(f"name: {name}\ndescription: {description}\ncolor: {color}\ntools: {tools}")
+        elif style < 0.9:
+            texts.append(f"name: {name}\ndescription: Use this agent for area {i} research tasks\n"
+                         f"color: {color}\ntools: {tools}")
+        else:
+            texts.append(f"name: {name}\ndescription: |\n  Use this agent for area {i}.\n"
+                         f"  It covers several research tasks.\ncolor: {color}\ntools: {tools}")
+    return texts
+
+def _used_keys(frontmatter: Any) -> Dict[str, Any]:
+    return {key: frontmatter.get(key) for key in FRONTMATTER_KEYS}
+
+def time_parser(parser: Callable[[str], Any], texts: List[str], repeat: int) -> float:
+    """Best wall time over repeat runs of parser across all texts"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            parser(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_benchmark(label: str, texts: List[str], repeat: int) -> Dict[str, Any]:
+    """Time both parsers on texts after checking they agree"""
+    for text in texts:
+        if _used_keys(legacy_parse(text)) != _used_keys(parse_frontmatter(text)):
+            raise AssertionError(f"Parsers disagree on:\n{text[:200]}")
+
+    legacy_time = time_parser(legacy_parse, texts, repeat)
+    fast_time = time_parser(parse_frontmatter, texts, repeat)
+    result = {
+        'corpus': label,
+        'frontmatters': len(texts),
+        'legacy_seconds': legacy_time,
+        'fast_seconds': fast_time,
+        'speedup': legacy_time / fast_time if fast_time else float('inf')
+    }
+    print(f"{label:<12} {len(texts):>7} files  legacy {legacy_time * 1000:9.1f} ms  "
+          f"fast {fast_time * 1000:8.1f} ms  speedup {result['speedup']:6.1f}x")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Frontmatter parsing benchmark')
+    parser.add_argument('--agents-dir', type=str, default='.', help='Path to agents directory')
+    parser.add_argument('--synthetic', type=int, default=10000, help='Synthetic corpus size')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions (best is kept)')
+    args = parser.parse_args()
+
+    print(f"YAML loader: {'libyaml C loader' if hasattr(yaml, 'CSafeLoader') else 'pure Python'}")
+    run_benchmark('shipped', shipped_frontmatters(Path(args.agents_dir)), args.repeat)
+    run_benchmark('synthetic', synthetic_frontmatters(args.synthetic), args.repeat)
+
+if __name__ == "__main__":
+    main()
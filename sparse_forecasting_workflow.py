@@ -5,191 +5,101 @@ Automated research pipeline using Augment agents
 
 This script demonstrates how to use the research agents for your
 sparse time series forecasting project targeting TKDE publication.
+The steps and their dependencies are defined in
+workflows/sparse_forecasting.yaml and run by agent_workflow.
+
+The batch command runs without any interaction, for cron or a job runner:
+every step's result goes to a run directory, and the exit status is 1 when
+a step fails. With --params it runs one workflow instance per research
+context in the file, all sharing one pool of workers.
+
+Every command saves finished steps to output/workflow_checkpoints. A re-run
+reuses each step whose agent file, query and upstream responses are
+unchanged, so after a failure in phase 4 it resumes there, and a single
+phase starts from the saved results of the phases before it.
+--no-checkpoint runs every step again without saving:
+
+    python sparse_forecasting_workflow.py batch --phases 1,2 --backend mock
+    python sparse_forecasting_workflow.py batch --params contexts.yaml --workers 8 --run-dir runs/nightly
 """
 
+import argparse
 import sys
 from pathlib import Path
-from augment_agent_integration import AugmentAgentSystem
+from typing import Any, Dict, List, Optional
+
+from agent_checkpoint import CHECKPOINT_DIR, WorkflowCheckpoint
+from agent_workflow import (format_batch_report, format_workflow_report, load_workflow, run_workflow,
+                            run_workflow_batch)
+from augment_agent_integration import EXECUTE_CONCURRENCY, AugmentAgentSystem
+
+WORKFLOW_FILE = Path(__file__).resolve().parent / 'workflows' / 'sparse_forecasting.yaml'
 
 class SparseForecasting_ResearchWorkflow:
     """Automated workflow for sparse time series forecasting research"""
     
-    def __init__(self):
-        self.agent_system = AugmentAgentSystem()
-        self.research_context = {
-            'topic': 'sparse time series forecasting',
-            'target_venue': 'TKDE (IEEE Transactions on Knowledge and Data Engineering)',
-            'approach': 'information-theoretic foundations',
-            'current_phase': 'literature review and theoretical development'
-        }
+    def __init__(self, backend: Optional[Any] = None, concurrency: int = EXECUTE_CONCURRENCY,
+                 executor: str = 'thread', workflow_file: str = str(WORKFLOW_FILE),
+                 agents_dir: str = ".", output_dir: str = "output", checkpoint: bool = True):
+        self.agent_system = AugmentAgentSystem(agents_dir, output_dir, backend=backend)
+        self.workflow = load_workflow(workflow_file)
+        # Steps are resumed from and saved to here unless checkpoint is False
+        self.checkpoint = WorkflowCheckpoint(Path(output_dir) / CHECKPOINT_DIR) if checkpoint else None
+        # Steps whose dependencies are done run in parallel, up to concurrency at a time
+        self.concurrency = concurrency
+        self.executor = executor
+        self.research_context = self.workflow.context
     
-    def run_complete_workflow(self):
+    def run_complete_workflow(self) -> Dict[str, Any]:
         """Execute the complete research workflow"""
         print("🔬 Starting Sparse Time Series Forecasting Research Workflow")
         print("=" * 60)
-        
-        workflows = [
-            self.phase1_ideation_and_planning,
-            self.phase2_literature_review,
-            self.phase3_methodology_design,
-            self.phase4_implementation_planning,
-            self.phase5_writing_preparation
-        ]
-        
-        for i, workflow_phase in enumerate(workflows, 1):
-            print(f"\n📋 Phase {i}: {workflow_phase.__name__.replace('_', ' ').title()}")
-            print("-" * 40)
-            workflow_phase()
-            
-            input("\nPress Enter to continue to next phase...")
-    
-    def phase1_ideation_and_planning(self):
-        """Phase 1: Research ideation and gap analysis"""
-        
-        # Step 1: Generate research ideas
-        print("🧠 Step 1: Generating research ideas...")
-        ideation_query = """
-        I'm researching sparse time series forecasting for TKDE publication. 
-        I want to focus on information-theoretic foundations - establishing theoretical 
-        bounds and optimal sampling strategies. Generate innovative research directions 
-        that could lead to high-impact theoretical contributions.
-        """
-        
-        result = self.agent_system.execute_agent('research-ideator', ideation_query)
-        self._display_agent_result(result)
-        
-        # Step 2: Analyze research gaps
-        print("\n🔍 Step 2: Analyzing research gaps...")
-        gap_analysis_query = """
-        Based on the research ideas for information-theoretic sparse forecasting, 
-        identify specific gaps in current literature. Focus on theoretical foundations, 
-        optimal sampling strategies, and fundamental bounds that haven't been established.
-        """
-        
-        result = self.agent_system.execute_agent('gap-analyzer', gap_analysis_query)
-        self._display_agent_result(result)
-        
-        # Step 3: Generate hypotheses
-        print("\n💡 Step 3: Generating testable hypotheses...")
-        hypothesis_query = """
-        Create testable hypotheses for information-theoretic bounds in sparse time series 
-        forecasting. Focus on relationships between sparsity patterns, information content, 
-        and forecasting accuracy that can be proven theoretically and validated empirically.
-        """
-        
-        result = self.agent_system.execute_agent('hypothesis-generator', hypothesis_query)
-        self._display_agent_result(result)
-    
-    def phase2_literature_review(self):
-        """Phase 2: Comprehensive literature review"""
-        
-        # Step 1: Find relevant papers
-        print("📚 Step 1: Finding relevant literature...")
-        paper_search_query = """
-        Find key papers on: 1) Information theory in time series, 2) Sparse time series 
-        forecasting, 3) Optimal sampling theory, 4) Theoretical bounds for prediction.
-        Focus on recent TKDE papers and foundational information theory work.
-        """
-        
-        result = self.agent_system.execute_agent('paper-finder', paper_search_query)
-        self._display_agent_result(result)
-        
-        # Step 2: Synthesize literature
-        print("\n📖 Step 2: Synthesizing literature findings...")
-        synthesis_query = """
-        Synthesize the literature on information-theoretic approaches to time series 
-        forecasting. Identify theoretical frameworks, key results, and gaps that our 
-        information-theoretic bounds for sparse forecasting could fill.
-        """
-        
-        result = self.agent_system.execute_agent('literature-synthesizer', synthesis_query)
-        self._display_agent_result(result)
-        
-        # Step 3: Citation analysis
-        print("\n🔗 Step 3: Analyzing citation patterns...")
-        citation_query = """
-        Analyze citation patterns in sparse time series forecasting and information 
-        theory papers. Identify key authors, influential papers, and emerging trends 
-        that could inform our theoretical approach.
-        """
-        
-        result = self.agent_system.execute_agent('citation-analyzer', citation_query)
-        self._display_agent_result(result)
-    
-    def phase3_methodology_design(self):
-        """Phase 3: Methodology and experimental design"""
-        
-        # Step 1: Design methodology
-        print("🔬 Step 1: Designing research methodology...")
-        methodology_query = """
-        Design a comprehensive methodology for establishing information-theoretic bounds 
-        for sparse time series forecasting. Include theoretical development, algorithm 
-        design, and empirical validation across multiple domains (healthcare, IoT, finance).
-        """
-        
-        result = self.agent_system.execute_agent('methodology-designer', methodology_query)
-        self._display_agent_result(result)
-        
-        # Step 2: Plan experiments
-        print("\n🧪 Step 2: Planning experimental validation...")
-        experiment_query = """
-        Create detailed experimental plans to validate information-theoretic bounds for 
-        sparse forecasting. Include synthetic data experiments, real-world datasets, 
-        and comparison with existing methods. Ensure TKDE-level rigor.
-        """
-        
-        result = self.agent_system.execute_agent('experiment-planner', experiment_query)
-        self._display_agent_result(result)
-        
-        # Step 3: Statistical consultation
-        print("\n📊 Step 3: Statistical analysis planning...")
-        stats_query = """
-        Plan statistical analysis for validating information-theoretic bounds in sparse 
-        forecasting. Include significance testing, confidence intervals, effect sizes, 
-        and methods for comparing theoretical predictions with empirical results.
-        """
-        
-        result = self.agent_system.execute_agent('statistical-consultant', stats_query)
-        self._display_agent_result(result)
-    
-    def phase4_implementation_planning(self):
-        """Phase 4: Implementation and coding strategy"""
-        
-        print("💻 Planning implementation strategy...")
-        coding_query = """
-        Plan the implementation of information-theoretic sparse forecasting algorithms. 
-        Include: 1) KSG mutual information estimators, 2) Optimal sampling algorithms, 
-        3) Theoretical bound computations, 4) Experimental validation framework. 
-        Focus on reproducible research code.
-        """
-        
-        result = self.agent_system.execute_agent('research-coder', coding_query)
-        self._display_agent_result(result)
-    
-    def phase5_writing_preparation(self):
-        """Phase 5: Academic writing preparation"""
-        
-        # Step 1: Plan manuscript structure
-        print("✍️ Step 1: Planning manuscript structure...")
-        writing_query = """
-        Plan the structure for a TKDE paper on information-theoretic bounds for sparse 
-        time series forecasting. Include: abstract, introduction, theoretical framework, 
-        algorithms, experiments, and discussion. Ensure it meets TKDE standards.
-        """
-        
-        result = self.agent_system.execute_agent('academic-writer', writing_query)
-        self._display_agent_result(result)
-        
-        # Step 2: Plan figures and visualizations
-        print("\n📊 Step 2: Planning figures and visualizations...")
-        figure_query = """
-        Design publication-quality figures for the sparse forecasting paper: 
-        1) Theoretical bounds visualization, 2) Algorithm performance comparisons, 
-        3) Cross-domain validation results, 4) Information-theoretic analysis plots.
+        return self._run()
+
+    def _run(self, only: Optional[List[str]] = None) -> Dict[str, Any]:
+        # Pick up agent files edited since the last run
+        self.agent_system.refresh()
+        report = run_workflow(self.agent_system, self.workflow, self.concurrency, self.executor, only,
+                              checkpoint=self.checkpoint)
+
+        phase = None
+        for step_id in report['order']:
+            step = report['steps'][step_id]
+            if step['phase'] != phase:
+                phase = step['phase']
+                print(f"\n📋 Phase {phase}")
+                print("-" * 40)
+            print(f"\n▶️  {step['label']} [{step_id}]")
+            if step['status'] == 'skipped':
+                print(f"⏭️  Skipped: {step['error']}")
+            else:
+                if step.get('cached'):
+                    print("♻️  From checkpoint")
+                self._display_agent_result(step['result'])
+
+        print("\n" + format_workflow_report(report))
+        return report
+
+    def phase_steps(self, phases: List[int]) -> List[str]:
+        """Ids of the steps in the given phases; ValueError for a phase without steps"""
+        known = {step.phase for step in self.workflow.steps}
+        unknown = [phase for phase in phases if phase not in known]
+        if unknown:
+            raise ValueError(f"Unknown phases: {', '.join(map(str, unknown))}")
+        return [step.id for step in self.workflow.steps if step.phase in phases]
+
+    def run_batch(self, phases: Optional[List[int]] = None, parameters: Optional[str] = None,
+                  run_dir: Optional[str] = None) -> Dict[str, Any]:
+        """Run all phases or the given ones without interaction, saving every step to a run directory
+
+        parameters names a file of research contexts to run one workflow
+        instance each for, in parallel; see agent_workflow.load_workflow_parameters.
+        With the checkpoint, the given phases' upstream steps are included too.
         """
-        
-        result = self.agent_system.execute_agent('figure-creator', figure_query)
-        self._display_agent_result(result)
+        only = self.phase_steps(phases) if phases else None
+        self.agent_system.refresh()
+        return run_workflow_batch(self.agent_system, self.workflow, parameters, run_dir, self.concurrency,
+                                  self.executor, only, checkpoint=self.checkpoint)
     
     def _display_agent_result(self, result):
         """Display the result from an agent execution"""
@@ -197,28 +107,30 @@ class SparseForecasting_ResearchWorkflow:
             print(f"\n🤖 Agent: {result['agent']} ({result['category']})")
             print(f"🛠️  Tools: {', '.join(result['tools']) if result['tools'] else 'All tools'}")
             print("\n" + "="*50)
-            print("PROMPT FOR AUGMENT:")
-            print("="*50)
-            print(result['prompt'])
+            if 'response' in result:
+                print("RESPONSE:")
+                print("="*50)
+                print(result['response'])
+            else:
+                print("PROMPT FOR AUGMENT:")
+                print("="*50)
+                print(result['prompt'])
             print("="*50)
         else:
             print(f"❌ Error: {result['error']}")
     
     def run_specific_phase(self, phase_number):
-        """Run a specific phase of the workflow"""
-        phases = {
-            1: self.phase1_ideation_and_planning,
-            2: self.phase2_literature_review,
-            3: self.phase3_methodology_design,
-            4: self.phase4_implementation_planning,
-            5: self.phase5_writing_preparation
-        }
-        
-        if phase_number in phases:
+        """Run the steps of one phase of the workflow
+
+        With the checkpoint the phase's upstream steps are included, reused
+        from it where their inputs are unchanged, so the phase sees their responses.
+        """
+        steps = [step.id for step in self.workflow.steps if step.phase == phase_number]
+        if steps:
             print(f"🔬 Running Phase {phase_number}")
-            phases[phase_number]()
-        else:
-            print(f"Invalid phase number. Choose from 1-5.")
+            return self._run(steps)
+        phases = sorted({step.phase for step in self.workflow.steps if step.phase is not None})
+        print(f"Invalid phase number. Choose from {', '.join(map(str, phases))}.")
     
     def quick_agent_query(self, agent_name, query):
         """Quick query to a specific agent"""
@@ -229,31 +141,82 @@ class SparseForecasting_ResearchWorkflow:
         self._display_agent_result(result)
 
 def main():
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(
+        description='Sparse time series forecasting research workflow',
+        usage='%(prog)s {full | phase <1-5> | quick <agent> <query> | batch} [options]')
+    parser.add_argument('command', nargs='?', choices=['full', 'phase', 'quick', 'batch'])
+    parser.add_argument('arguments', nargs='*', help=argparse.SUPPRESS)
+    parser.add_argument('--phases', type=str, help='batch: comma-separated phases to run (default: all)')
+    parser.add_argument('--params', type=str, metavar='FILE',
+                        help='batch: run once per research context in this YAML list or JSONL file')
+    parser.add_argument('--run-dir', type=str,
+                        help='batch: directory for step results (default: a new one under output/workflow_runs)')
+    parser.add_argument('--workers', type=int, default=EXECUTE_CONCURRENCY, help='Steps run at once')
+    parser.add_argument('--executor', type=str, choices=['thread', 'process'], default='thread',
+                        help='Run steps on threads or in worker processes')
+    parser.add_argument('--backend', type=str, metavar='URL',
+                        help='Chat completions endpoint to execute the steps with, or "mock"')
+    parser.add_argument('--backend-model', type=str, help='Model name sent to the backend')
+    parser.add_argument('--no-checkpoint', action='store_true',
+                        help='Run every step again instead of resuming from output/workflow_checkpoints, '
+                             'and save nothing there')
+    parser.add_argument('--agents-dir', type=str, default='.', help='Path to agents directory')
+    parser.add_argument('--output-dir', type=str, default='output', help='Output directory for files')
+    args = parser.parse_args()
+
+    if args.command is None:
         print("Usage:")
         print("  python sparse_forecasting_workflow.py full          # Run complete workflow")
         print("  python sparse_forecasting_workflow.py phase <1-5>   # Run specific phase")
         print("  python sparse_forecasting_workflow.py quick <agent> <query>  # Quick agent query")
+        print("  python sparse_forecasting_workflow.py batch [--phases 1,2] [--params FILE] [--run-dir DIR]"
+              "  # Headless run")
         return
-    
-    workflow = SparseForecasting_ResearchWorkflow()
-    
-    command = sys.argv[1]
-    
+
+    backend = None
+    if args.backend:
+        from agent_backend import create_backend
+
+        backend = create_backend(args.backend, **({'model': args.backend_model} if args.backend_model else {}))
+
+    try:
+        workflow = SparseForecasting_ResearchWorkflow(backend, args.workers, args.executor,
+                                                      agents_dir=args.agents_dir, output_dir=args.output_dir,
+                                                      checkpoint=not args.no_checkpoint)
+        _run_command(workflow, args)
+    finally:
+        if backend is not None:
+            backend.close()
+
+def _run_command(workflow: SparseForecasting_ResearchWorkflow, args: argparse.Namespace) -> None:
+    command = args.command
+
     if command == "full":
         workflow.run_complete_workflow()
-    elif command == "phase" and len(sys.argv) > 2:
+    elif command == "phase" and args.arguments:
         try:
-            phase_num = int(sys.argv[2])
-            workflow.run_specific_phase(phase_num)
+            phase_num = int(args.arguments[0])
         except ValueError:
             print("Phase number must be an integer (1-5)")
-    elif command == "quick" and len(sys.argv) > 3:
-        agent_name = sys.argv[2]
-        query = " ".join(sys.argv[3:])
+            return
+        workflow.run_specific_phase(phase_num)
+    elif command == "quick" and len(args.arguments) > 1:
+        agent_name = args.arguments[0]
+        query = " ".join(args.arguments[1:])
         workflow.quick_agent_query(agent_name, query)
+    elif command == "batch":
+        try:
+            phases = [int(phase) for phase in args.phases.split(',')] if args.phases else None
+            batch = workflow.run_batch(phases, args.params, args.run_dir)
+        except (OSError, ValueError) as e:
+            print(f"❌ Batch run failed: {e}")
+            sys.exit(1)
+        print(format_batch_report(batch))
+        print(f"✅ Run saved to: {batch['run_dir']}")
+        if not batch['success']:
+            sys.exit(1)
     else:
-        print("Invalid command. Use 'full', 'phase <1-5>', or 'quick <agent> <query>'")
+        print("Invalid command. Use 'full', 'phase <1-5>', 'quick <agent> <query>' or 'batch'")
 
 if __name__ == "__main__":
     main()
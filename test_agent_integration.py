@@ -7,12 +7,38 @@ import os
 import sys
 import tempfile
 import shutil
+import socket
+import stat
+import logging
+import io
+import json
+import asyncio
+import pickle
+import threading
+import time
 from pathlib import Path
 
 # Add the current directory to Python path
 sys.path.insert(0, '.')
 
-from augment_agent_integration import AugmentAgentSystem
+import yaml
+
+from agent_backend import HTTPBackend, LLMBackend, MockLLMServer
+from agent_checkpoint import WorkflowCheckpoint
+from agent_workflow import (Workflow, WorkflowStep, format_batch_report, format_workflow_report, load_workflow,
+                            load_workflow_parameters, run_workflow, run_workflow_batch)
+from augment_agent_integration import AugmentAgentSystem, FRONTMATTER_KEYS, parse_frontmatter
+from agent_index import AgentRouter
+from agent_record import AgentRecord, LazyAgent
+from agent_chunks import expand_agents
+from agent_logging import start_queue_logging
+from agent_metrics import format_profile, save_profile
+import agent_batch_router
+import benchmark_agent_system
+from agent_batch_router import BatchRouter
+from agent_daemon import AgentDaemonError, connect, create_server
+from agent_mapped_registry import MappedRegistry
+from agent_sqlite_registry import SQLiteAgentSystem
 
 def create_test_agent_file(temp_dir: Path, name: str, category: str) -> Path:
     """Create a test agent file"""
@@ -132,5 +158,1517 @@ def test_basic_functionality():
         
         print("\n🎉 All tests completed successfully!")
 
+def test_registry_cache():
+    """Test that a warm start reuses the compiled registry cache"""
+    print("🧪 Testing compiled agent registry cache")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        output_path = temp_path / "output"
+
+        for name, category in [("Research Ideator", "research-planning"),
+                               ("Statistical Analyst", "data-analysis")]:
+            create_test_agent_file(temp_path, name, category)
+
+        cold = AugmentAgentSystem(str(temp_path), str(output_path))
+        print(f"Cold start: {cold.cache_stats}")
+        assert cold.cache_stats['parsed'] == 2
+        assert (output_path / 'agent_registry_cache.pickle').exists()
+
+        # Age the cache so entries are no longer considered racily written
+        cache_file = output_path / 'agent_registry_cache.pickle'
+        old = cache_file.stat().st_mtime - 10
+        for agent_file in temp_path.glob("*.md"):
+            os.utime(agent_file, (old, old))
+        AugmentAgentSystem(str(temp_path), str(output_path))
+
+        warm = AugmentAgentSystem(str(temp_path), str(output_path))
+        print(f"Warm start: {warm.cache_stats}")
+        assert warm.cache_stats == {'hits': 2, 'rehashed': 0, 'parsed': 0}
+        assert warm.agents == cold.agents
+
+        # Only the edited file is parsed again
+        create_test_agent_file(temp_path, "Research Ideator", "paper-writing")
+        edited = AugmentAgentSystem(str(temp_path), str(output_path))
+        print(f"After edit: {edited.cache_stats}")
+        assert edited.cache_stats['parsed'] == 1
+        assert 'paper-writing' in edited.agents['Research Ideator']['system_prompt']
+
+        print("\n🎉 Registry cache tests completed successfully!")
+
+def test_parallel_loading():
+    """Test that thread and process pools load the same registry as a sequential load"""
+    print("🧪 Testing parallel agent loading")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        for i in range(12):
+            category = ["research-planning", "data-analysis", "paper-writing"][i % 3]
+            category_dir = temp_path / category
+            category_dir.mkdir(exist_ok=True)
+            create_test_agent_file(category_dir, f"Agent {i}", category)
+        # Same name in two files exercises the name-collision rule
+        create_test_agent_file(temp_path / "paper-writing", "Agent 1", "paper-writing")
+        # Frontmatter that is not a mapping is reported as a parse error
+        (temp_path / "broken.md").write_text("---\njust text\n---\nbody\n")
+
+        def load(**kwargs):
+            records = []
+            handler = logging.Handler()
+            handler.emit = lambda record: records.append(record.getMessage())
+            logging.getLogger().addHandler(handler)
+            try:
+                system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"),
+                                            use_cache=False, **kwargs)
+            finally:
+                logging.getLogger().removeHandler(handler)
+            return system, [message for message in records if message.startswith("Error")]
+
+        sequential, sequential_errors = load()
+        threaded, threaded_errors = load(load_workers=4, load_executor='thread')
+        processed, processed_errors = load(load_workers=2, load_executor='process')
+
+        print(f"Loaded {len(sequential.agents)} agents, errors: {sequential_errors}")
+        assert len(sequential.agents) == 12
+        assert list(threaded.agents.items()) == list(sequential.agents.items())
+        assert list(processed.agents.items()) == list(sequential.agents.items())
+        assert len(sequential_errors) == 1 and "broken.md" in sequential_errors[0]
+        assert threaded_errors == sequential_errors == processed_errors
+
+        print("\n🎉 Parallel loading tests completed successfully!")
+
+def test_lazy_prompts():
+    """Test that lazy mode defers system prompts and reads them back exactly"""
+    print("🧪 Testing lazy system-prompt loading")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        output_path = temp_path / "output"
+
+        create_test_agent_file(temp_path, "Research Ideator", "research-planning")
+        # Windows line endings and multi-byte characters must not shift the body offset
+        (temp_path / "crlf_agent.md").write_bytes(
+            "---\r\nname: crlf-agent\r\ndescription: Ünïcödé — agent\r\n---\r\n\r\nBody ✓ text\r\n".encode('utf-8'))
+
+        eager = AugmentAgentSystem(str(temp_path), str(output_path), use_cache=False)
+        lazy = AugmentAgentSystem(str(temp_path), str(output_path), lazy_prompts=True)
+
+        for name, agent in lazy.agents.items():
+            assert 'system_prompt' not in dict(agent)
+        print(f"Loaded {len(lazy.agents)} agents without system prompts")
+
+        result = lazy.execute_agent("crlf-agent", "Test query")
+        assert result['prompt'] == eager.execute_agent("crlf-agent", "Test query")['prompt']
+        assert lazy.agents["crlf-agent"]['system_prompt'] == "Body ✓ text"
+
+        warm = AugmentAgentSystem(str(temp_path), str(output_path), lazy_prompts=True)
+        for name, agent in eager.agents.items():
+            assert warm.agents[name].to_dict() == agent
+
+        print("\n🎉 Lazy prompt tests completed successfully!")
+
+def test_frontmatter_parser():
+    """Test that parse_frontmatter matches the YAML-then-manual path on the keys used"""
+    print("🧪 Testing frontmatter parser")
+    print("=" * 50)
+
+    cases = [
+        "name: a\ndescription: Plain words\ncolor: red\ntools: Read, Write",
+        "name: a\ndescription: Examples:\\n\\n<example>user: \"hi\"</example>\ntools: Read",
+        "name: a\ndescription: |\n  Block scalar\n  text\ncolor: blue",
+        "name: a\ncolor: true\ntools: 3",
+        "name: a\ndescription: \"quoted: value\"",
+        "name: a # comment\ndescription: x: y",
+        "name: a\n\ndescription: ends with colon:",
+        # libyaml accepts these but PyYAML rejects them, so they keep the manual-parse values
+        "name: a\tb\ndescription: x",
+        "name: a\ndescription: yes\tno\ncolor: true\tfalse",
+        "name: a\ndescription: 2020-01-01\tx",
+        "name: a\tb # comment\ndescription: [x,\ty]",
+        "name: a\ndescription: |#c\n  Block text\ncolor: red",
+        "name: a\ndescription: >-#c\n  Folded\n  text",
+        "name: a\ndescription: |2#c\n   Indented",
+        "name: a\ndescription:\t|\n  text",
+    ]
+    for text in cases:
+        try:
+            expected = yaml.load(text, Loader=yaml.SafeLoader)
+        except yaml.YAMLError:
+            expected = AugmentAgentSystem._parse_frontmatter_manually(text)
+        actual = parse_frontmatter(text)
+        for key in FRONTMATTER_KEYS:
+            assert actual.get(key) == expected.get(key), (text, key)
+    print(f"Checked {len(cases)} frontmatter variants")
+
+    print("\n🎉 Frontmatter parser tests completed successfully!")
+
+def test_empty_tools_field():
+    """Test that empty or oddly typed frontmatter values do not break loading the registry"""
+    print("🧪 Testing empty tools field")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agents_dir = temp_path / "agents"
+        agents_dir.mkdir()
+        create_test_agent_file(agents_dir, "paper-finder", "research")
+        (agents_dir / "no-tools.md").write_text("---\nname: no-tools\ndescription: Has no tools\ntools:\n---\n\nPrompt\n")
+        (agents_dir / "odd-tools.md").write_text("---\nname: odd-tools\ndescription: Odd tools\ntools: 3\n---\n\nPrompt\n")
+
+        for use_cache in (True, True, False):
+            system = AugmentAgentSystem(str(agents_dir), str(temp_path / "output"), use_cache=use_cache)
+            assert set(system.agents) == {"paper-finder", "no-tools", "odd-tools"}
+            assert system.agents["no-tools"]['tools'] == [] and system.agents["odd-tools"]['tools'] == []
+            system.list_agents()
+            stats = system.get_agent_statistics()
+            assert stats['total_agents'] == 3 and stats['tools_usage'] == {'web-search': 1, 'codebase-retrieval': 1}
+        print(f"Loaded {len(system.agents)} agents, {stats['tools_usage']}")
+
+        # Agents without a string description are still routed, and the others stay usable
+        (agents_dir / "no-description.md").write_text("---\nname: no-description\ndescription:\n---\n\nPrompt\n")
+        (agents_dir / "numeric-description.md").write_text("---\nname: 42\ndescription: 42\n---\n\nPrompt\n")
+        system = AugmentAgentSystem(str(agents_dir), str(temp_path / "output"), use_cache=False)
+        assert {"no-description", 42} <= set(system.agents)
+        assert system.execute_agent("paper-finder", "Find papers")['success']
+        assert [agent['name'] for agent in system.find_relevant_agents("42")] == [42]
+        assert system.find_relevant_agents("test agent")[0]['name'] == "paper-finder"
+        router = AgentRouter.from_agents([{'name': "a", 'description': None}, {'name': "b", 'description': 7}])
+        assert [name for _, name in router.search("7")] == ["b"]
+
+        # Frontmatter values YAML parses to non-JSON types do not stop the load or the config save
+        (agents_dir / "dated.md").write_text("---\nname: dated\ndescription: Dated\ncolor: 2020-01-01\n---\n\nPrompt\n")
+        system = AugmentAgentSystem(str(agents_dir), str(temp_path / "dated_output"))
+        assert "dated" in system.agents and system.execute_agent("paper-finder", "query")['success']
+        config = json.loads((temp_path / "dated_output" / "agents_config.json").read_text())
+        assert config['agents']['dated']['color'] == "2020-01-01"
+
+        print("\n🎉 Empty tools field tests completed successfully!")
+
+def test_empty_registry_stats():
+    """Test statistics and the --stats command on an empty agents directory"""
+    print("🧪 Testing statistics of an empty registry")
+    print("=" * 50)
+
+    import contextlib
+    from unittest import mock
+    import augment_agent_integration
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        (temp_path / "agents").mkdir()
+        system = AugmentAgentSystem(str(temp_path / "agents"), str(temp_path / "output"))
+        stats = system.get_agent_statistics()
+        assert stats['total_agents'] == 0 and stats['categories'] == {} and stats['tools_usage'] == {}
+        assert stats['most_used_tool'] is None and stats['most_common_category'] is None
+
+        argv = ["augment_agent_integration.py", "--agents-dir", str(temp_path / "agents"),
+                "--output-dir", str(temp_path / "output"), "--stats", "--no-daemon"]
+        output = io.StringIO()
+        with mock.patch.object(sys, 'argv', argv), contextlib.redirect_stdout(output):
+            augment_agent_integration.main()
+        print(output.getvalue())
+        assert "Total Agents: 0" in output.getvalue()
+
+        print("\n🎉 Empty registry statistics tests completed successfully!")
+
+def test_bm25_router():
+    """Test token-based BM25 routing with configurable boosts"""
+    print("🧪 Testing BM25 agent router")
+    print("=" * 50)
+
+    agents = [
+        {'name': 'database-admin', 'description': 'Tune database indexes and queries'},
+        {'name': 'data-visualizer', 'description': 'Plot charts of experimental data'},
+        {'name': 'statistical-analyst', 'description': 'Statistical analysis of data with regression'},
+        {'name': 'academic-writer', 'description': 'Draft manuscripts and papers'},
+    ]
+    router = AgentRouter.from_agents(agents)
+
+    # "data" is a whole token, so it no longer matches "database"
+    results = router.search("data", limit=5)
+    print(f"Results for 'data': {results}")
+    assert [name for _, name in results] == ['data-visualizer', 'statistical-analyst']
+
+    assert router.search("regression analysis", limit=1)[0][1] == 'statistical-analyst'
+    assert router.search("quantum chromodynamics") == []
+
+    unboosted = AgentRouter.from_agents(agents, research_terms={}, name_weight=0.0)
+    assert unboosted.search("writing") == []
+    assert router.search("writing")[0][1] == 'academic-writer'
+
+    router.remove('statistical-analyst')
+    assert [name for _, name in router.search("data", limit=5)] == ['data-visualizer']
+
+    print("\n🎉 BM25 router tests completed successfully!")
+
+def test_batch_routing():
+    """Test that batch routing matches single-query routing"""
+    print("🧪 Testing batch request routing")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for name, category in [("Research Ideator", "research-planning"),
+                               ("Statistical Analyst", "data-analysis"),
+                               ("Literature Synthesizer", "literature-review")]:
+            create_test_agent_file(temp_path, name, category)
+        system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"))
+
+        queries = ["statistical analysis of data", "literature review", "new research ideas",
+                   "nothing relevant here", "data-analysis agent for research"]
+        requests_file = temp_path / "requests.jsonl"
+        with open(requests_file, 'w') as f:
+            for i, query in enumerate(queries):
+                f.write(json.dumps({'request_id': f"req-{i}", 'query': query}) + '\n')
+            f.write(json.dumps({'id': 'titled', 'title': 'Statistical', 'body': 'analysis'}) + '\n')
+
+        engines = [False, True] if agent_batch_router.np is not None else [False]
+        for use_numpy in engines:
+            output = io.StringIO()
+            with open(requests_file) as lines:
+                stats = BatchRouter(system.router, top_k=2, chunk_size=2, use_numpy=use_numpy).route_stream(
+                    lines, output)
+            print(f"{stats['engine']} engine: {stats['queries_per_second']:.0f} queries/sec")
+            assert stats['requests'] == len(queries) + 1
+
+            results = [json.loads(line) for line in output.getvalue().splitlines()]
+            for query, result in zip(queries + ["Statistical\nanalysis"], results):
+                expected = [name for _, name in system.router.search(query, 2)]
+                assert [agent['name'] for agent in result['agents']] == expected, (query, result)
+            assert results[-1]['request_id'] == 'titled'
+
+        stats = system.batch_route(str(requests_file))
+        assert Path(stats['output_file']).exists()
+
+        # Malformed lines are reported with their file and line number
+        for bad_line, message in [('{"query": ', 'invalid JSON'), ('["a list"]', 'expected a JSON object')]:
+            bad_file = temp_path / "bad_requests.jsonl"
+            bad_file.write_text(json.dumps({'query': 'fine'}) + '\n\n' + bad_line + '\n')
+            try:
+                system.batch_route(str(bad_file), str(temp_path / "bad_routes.jsonl"))
+                assert False, "Expected ValueError"
+            except ValueError as e:
+                assert str(e).startswith(f"{bad_file}:3: {message}"), e
+
+        print("\n🎉 Batch routing tests completed successfully!")
+
+def test_search_index():
+    """Test that indexed search returns exactly what a linear substring scan does"""
+    print("🧪 Testing trigram search index")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for name, category in [("Research Ideator", "research-planning"),
+                               ("Statistical Analyst", "data-analysis"),
+                               ("Literature Synthesizer", "literature-review")]:
+            category_dir = temp_path / category
+            category_dir.mkdir()
+            create_test_agent_file(category_dir, name, category)
+        system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"))
+
+        def linear_search(term, search_in):
+            return [agent for agent in system.agents.values()
+                    if any(field in agent and term.lower() in str(agent[field]).lower() for field in search_in)]
+
+        terms = ["research", "RESEARCH", "an", "", "data analysis", "xyz", "web-search", "ator", "agent spec"]
+        field_sets = [['name', 'description', 'category'], ['name'], ['category'], ['tools'],
+                      ['name', 'system_prompt'], ['missing_field']]
+        for term in terms:
+            for search_in in field_sets:
+                assert system.search_agents(term, search_in) == linear_search(term, search_in), (term, search_in)
+        assert system.search_agents("research") == linear_search("research", ['name', 'description', 'category'])
+        print(f"Checked {len(terms) * len(field_sets)} searches against a linear scan")
+
+        print("\n🎉 Search index tests completed successfully!")
+
+def test_registry_daemon():
+    """Test that a daemon client answers like the local system"""
+    print("🧪 Testing registry daemon")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for name, category in [("Research Ideator", "research-planning"),
+                               ("Statistical Analyst", "data-analysis")]:
+            create_test_agent_file(temp_path, name, category)
+        system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"))
+
+        address = str(temp_path / "output" / "agent_daemon.sock")
+        server = create_server(system, address)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            # A client for another agents directory is not forwarded
+            assert connect(address, str(temp_path / "elsewhere")) is None
+
+            remote = connect(address, str(temp_path), str(temp_path / "output"))
+            assert remote is not None
+            assert remote.get_agent_statistics() == system.get_agent_statistics()
+            assert remote.search_agents("statistical") == system.search_agents("statistical")
+            assert ([agent['name'] for agent in remote.find_relevant_agents("statistical analysis")] ==
+                    [agent['name'] for agent in system.find_relevant_agents("statistical analysis")])
+
+            result = remote.execute_agent("Research Ideator", "Generate ideas")
+            assert result['success'] and result['prompt'] == system.execute_agent(
+                "Research Ideator", "Generate ideas")['prompt']
+            assert not remote.execute_agent("missing-agent", "query")['success']
+
+            try:
+                remote.request('unknown')
+                assert False, "unknown operations must fail"
+            except AgentDaemonError as e:
+                print(f"Rejected unknown operation: {e}")
+
+            # Only the owner can use the socket, and the daemon writes nothing outside its output_dir
+            assert stat.S_IMODE(os.stat(address).st_mode) == 0o600
+            try:
+                remote.save_mapped_registry(str(temp_path / "registry.snapshot"))
+                assert False, "paths outside the output directory must be refused"
+            except AgentDaemonError as e:
+                print(f"Refused path: {e}")
+            assert not (temp_path / "registry.snapshot").exists()
+            assert Path(remote.save_mapped_registry(str(temp_path / "output" / "registry.snapshot"))).exists()
+
+            # Batch routing reads and writes its files on the client side
+            requests_file = temp_path / "requests.jsonl"
+            requests_file.write_text(json.dumps({'id': 1, 'query': 'statistical analysis'}) + '\n')
+            stats = remote.batch_route(str(requests_file), str(temp_path / "routes.jsonl"))
+            assert stats['requests'] == 1 and stats['output_file'] == str(temp_path / "routes.jsonl")
+            routes = [json.loads(line) for line in (temp_path / "routes.jsonl").read_text().splitlines()]
+            assert routes[0]['agents'][0]['name'] == "Statistical Analyst"
+            remote.close()
+
+            # The first line that is not a JSON object ends the connection
+            for bad_line in (b'not json\n', b'[1, 2]\n'):
+                with socket.socket(socket.AF_UNIX) as raw:
+                    raw.connect(address)
+                    raw.sendall(bad_line + b'{"op": "ping"}\n')
+                    replies = raw.makefile('rb').read().splitlines()
+                assert len(replies) == 1 and not json.loads(replies[0])['ok'], replies
+
+            # The connect timeout bounds only the probe, not operations slower than it
+            with MockLLMServer(latency=0.6) as slow_server, HTTPBackend(slow_server.url) as backend:
+                system.backend = backend
+                remote = connect(address, str(temp_path), str(temp_path / "output"), timeout=0.2)
+                assert remote is not None
+                result = remote.execute_agent("Research Ideator", "Generate ideas")
+                assert result['success'] and result['response'].startswith("Mock response")
+                remote.close()
+
+                remote = connect(address, str(temp_path), str(temp_path / "output"), timeout=0.2,
+                                 request_timeout=0.2)
+                try:
+                    remote.execute_agent("Research Ideator", "Generate ideas")
+                    assert False, "Expected AgentDaemonError"
+                except AgentDaemonError as e:
+                    print(f"Request timed out: {e}")
+                remote.close()
+                system.backend = None
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # A TCP daemon requires the shared token it writes to its output directory
+        saved_token = os.environ.pop('AGENT_DAEMON_TOKEN', None)
+        server = create_server(system, 'tcp://127.0.0.1:0')
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            address = f"tcp://127.0.0.1:{server.server_address[1]}"
+            token_file = temp_path / "output" / "agent_daemon.token"
+            assert stat.S_IMODE(os.stat(token_file).st_mode) == 0o600
+            remote = connect(address, str(temp_path), str(temp_path / "output"))
+            assert remote is not None and remote.get_agent_statistics()['total_agents'] == 2
+            remote.close()
+            assert connect(address, str(temp_path), str(temp_path / "elsewhere")) is None
+            assert connect(address, str(temp_path), str(temp_path / "output"), token="wrong") is None
+        finally:
+            server.shutdown()
+            server.server_close()
+            if saved_token is not None:
+                os.environ['AGENT_DAEMON_TOKEN'] = saved_token
+
+        print("\n🎉 Registry daemon tests completed successfully!")
+
+def test_hot_reload():
+    """Test that refresh applies added, changed and deleted agent files incrementally"""
+    print("🧪 Testing hot reload of agent files")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        (temp_path / "data-analysis").mkdir()
+        create_test_agent_file(temp_path, "Research Ideator", "research-planning")
+        analyst_file = create_test_agent_file(temp_path / "data-analysis", "Statistical Analyst", "data-analysis")
+        system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"))
+        system.search_agents("warm up the search index")
+
+        assert system.refresh() == {'added': [], 'changed': [], 'removed': []}
+
+        # Add, change and delete one file each
+        create_test_agent_file(temp_path, "Literature Synthesizer", "literature-review")
+        analyst_file.write_text(analyst_file.read_text().replace("web-search, codebase-retrieval", "Read"))
+        (temp_path / "research_ideator.md").unlink()
+
+        changes = system.refresh()
+        print(f"Changes: {changes}")
+        assert len(changes['added']) == 1 and len(changes['changed']) == 1 and len(changes['removed']) == 1
+        assert system.cache_stats['parsed'] == 2
+        assert set(system.agents) == {"Statistical Analyst", "Literature Synthesizer"}
+        assert system.agents["Statistical Analyst"]['tools'] == ['Read']
+
+        # Indexes and statistics match a full load of the same tree
+        fresh = AugmentAgentSystem(str(temp_path), str(temp_path / "output"), use_cache=False)
+        statistics, fresh_statistics = system.get_agent_statistics(), fresh.get_agent_statistics()
+        del statistics['performance'], fresh_statistics['performance']
+        assert statistics == fresh_statistics
+        for query in ["research ideas", "literature", "statistical analysis"]:
+            assert system.router.search(query, 5) == fresh.router.search(query, 5)
+            assert system.search_agents(query.split()[0]) == fresh.search_agents(query.split()[0])
+
+        # A background watcher picks up a new agent
+        seen = []
+        system.watch(interval=0.05, on_change=seen.append)
+        try:
+            create_test_agent_file(temp_path, "Academic Writer", "paper-writing")
+            for _ in range(100):
+                if seen:
+                    break
+                time.sleep(0.05)
+        finally:
+            system.stop_watching()
+        assert "Academic Writer" in system.agents
+
+        print("\n🎉 Hot reload tests completed successfully!")
+
+def test_concurrent_reload():
+    """Test that readers see whole registry snapshots while reloads run continuously"""
+    print("🧪 Testing concurrent reads during reloads")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agent_files = [create_test_agent_file(temp_path, f"Research Agent {i}", "research-planning")
+                       for i in range(20)]
+        system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"))
+        total = len(agent_files)
+
+        # An old snapshot keeps answering from its own generation after a refresh
+        before = system.snapshot
+        for agent_file in agent_files:
+            agent_file.write_text(agent_file.read_text().replace("web-search, codebase-retrieval", "Read"))
+        system.refresh()
+        assert system.snapshot.generation == before.generation + 1
+        assert before.agents["Research Agent 0"]['tools'] == ['web-search', 'codebase-retrieval']
+        assert system.get_agent("Research Agent 0")['tools'] == ['Read']
+        assert [name for _, name in before.router.search("research agent", 3)] == \
+            [name for _, name in system.router.search("research agent", 3)]
+
+        stop = threading.Event()
+        failures = []
+        reads = []
+        reloads = [0]
+
+        def reader() -> None:
+            count = 0
+            try:
+                while not stop.is_set():
+                    # Every call must see all agents from a single generation
+                    routed = system.find_relevant_agents("research agent", total)
+                    found = system.search_agents("research agent")
+                    stats = system.get_agent_statistics()
+                    for agents in (routed, found):
+                        assert len(agents) == total, len(agents)
+                        assert len({tuple(agent['tools']) for agent in agents}) == 1
+                    assert len(stats['tools_usage']) == 1 and stats['total_agents'] == total
+                    assert system.get_agent("Research Agent 7") is not None
+                    count += 4
+                    # Yield like a request handler doing I/O between reads
+                    time.sleep(0)
+            except Exception as e:
+                failures.append(repr(e))
+            reads.append(count)
+
+        def writer() -> None:
+            tools = ["Read", "Write"]
+            try:
+                while not stop.is_set():
+                    old, new = tools[reloads[0] % 2], tools[(reloads[0] + 1) % 2]
+                    for agent_file in agent_files:
+                        agent_file.write_text(agent_file.read_text().replace(f"tools: {old}", f"tools: {new}"))
+                    assert len(system.refresh()['changed']) == total
+                    reloads[0] += 1
+            except Exception as e:
+                failures.append(repr(e))
+
+        threads = [threading.Thread(target=reader) for _ in range(4)] + [threading.Thread(target=writer)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        print(f"Reads: {sum(reads)} ({sum(reads) / elapsed:.0f}/sec across {len(reads)} threads), "
+              f"reloads: {reloads[0]}")
+        assert not failures, failures
+        assert reloads[0] > 0 and sum(reads) > 0
+
+        print("\n🎉 Concurrent reload tests completed successfully!")
+
+def test_config_write_skipped():
+    """Test that agents_config.json is only rewritten when the registry changes"""
+    print("🧪 Testing agents config write skipping")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        output_dir = temp_path / "output"
+        agent_file = create_test_agent_file(temp_path, "Research Ideator", "research-planning")
+        AugmentAgentSystem(str(temp_path), str(output_dir))
+        config_file = output_dir / 'agents_config.json'
+        first = config_file.read_text()
+        assert json.loads(first)['metadata']['content_digest']
+
+        # An unchanged registry leaves the file untouched
+        written_ns = config_file.stat().st_mtime_ns
+        time.sleep(0.01)
+        AugmentAgentSystem(str(temp_path), str(output_dir))
+        assert config_file.stat().st_mtime_ns == written_ns and config_file.read_text() == first
+
+        # A changed agent rewrites it, without leaving temporary files behind
+        agent_file.write_text(agent_file.read_text().replace("color: blue", "color: green"))
+        AugmentAgentSystem(str(temp_path), str(output_dir))
+        config = json.loads(config_file.read_text())
+        assert config['agents']['Research Ideator']['color'] == 'green'
+        assert config['metadata']['content_digest'] != json.loads(first)['metadata']['content_digest']
+        assert not list(output_dir.glob('.agents_config.*'))
+
+        # A deleted config is written again even when the digest is known
+        system = AugmentAgentSystem(str(temp_path), str(output_dir))
+        config_file.unlink()
+        system._save_agents_config()
+        assert config_file.exists()
+
+        print("\n🎉 Config write tests completed successfully!")
+
+def test_structured_logging():
+    """Test the queued JSON-lines log writer, its rotation and summary-level load logging"""
+    print("🧪 Testing structured logging")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        log_file = temp_path / "agent_system.log"
+        logger = logging.getLogger("agent-logging-test")
+        logger.propagate = False
+        listener = start_queue_logging(log_file, logger=logger, max_bytes=4096, backup_count=2, console=False)
+        try:
+            for i in range(200):
+                logger.info(f"Record {i}", extra={'event': 'test', 'index': i})
+        finally:
+            listener.stop()
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            for handler in listener.handlers:
+                handler.close()
+
+        log_files = sorted(temp_path.glob("agent_system.log*"))
+        print(f"Log files: {[path.name for path in log_files]}")
+        assert len(log_files) == 3
+        assert all(path.stat().st_size <= 4096 for path in log_files)
+        entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+        assert entries[-1]['message'] == "Record 199" and entries[-1]['index'] == 199
+        assert entries[-1]['level'] == "INFO" and entries[-1]['event'] == "test"
+
+        # Loading logs one summary line at INFO and per-agent lines only at DEBUG
+        for i in range(5):
+            create_test_agent_file(temp_path, f"Research Agent {i}", "research-planning")
+        records = []
+        handler = logging.Handler(logging.DEBUG)
+        handler.emit = records.append
+        root = logging.getLogger()
+        root.addHandler(handler)
+        previous_level = root.level
+        try:
+            root.setLevel(logging.INFO)
+            AugmentAgentSystem(str(temp_path), str(temp_path / "output"))
+            info_records = list(records)
+            root.setLevel(logging.DEBUG)
+            AugmentAgentSystem(str(temp_path), str(temp_path / "output"))
+        finally:
+            root.removeHandler(handler)
+            root.setLevel(previous_level)
+
+        summaries = [record for record in info_records if getattr(record, 'event', None) == 'agents_loaded']
+        assert len(summaries) == 1 and summaries[0].agents == 5 and summaries[0].total_seconds >= 0
+        assert not any(record.getMessage().startswith("Loaded agent:") for record in info_records)
+        assert sum(record.getMessage().startswith("Loaded agent:") for record in records) == 5
+
+        # Threads logging their first records at once start a single listener
+        import atexit
+        from unittest import mock
+        import agent_logging
+
+        saved_handlers, saved_level, saved_listener = list(root.handlers), root.level, agent_logging._listener
+        real_start = agent_logging.start_queue_logging
+
+        def slow_start(*args, **kwargs):
+            time.sleep(0.05)
+            return real_start(*args, **kwargs)
+
+        for handler in saved_handlers:
+            root.removeHandler(handler)
+        agent_logging._listener = None
+        concurrent_log = temp_path / "concurrent.log"
+        root.setLevel(logging.INFO)
+        root.addHandler(agent_logging._SetupOnFirstRecord(concurrent_log))
+        barrier = threading.Barrier(8)
+
+        def log_first_record(i):
+            barrier.wait()
+            logging.info(f"First record {i}")
+
+        try:
+            with mock.patch.object(agent_logging, 'start_queue_logging', slow_start):
+                threads = [threading.Thread(target=log_first_record, args=(i,)) for i in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            queue_handlers = [handler for handler in root.handlers if isinstance(handler, logging.handlers.QueueHandler)]
+            assert len(queue_handlers) == 1
+        finally:
+            listener = agent_logging._listener
+            if listener is not None:
+                listener.stop()
+                atexit.unregister(listener.stop)
+                for handler in listener.handlers:
+                    handler.close()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+            agent_logging._listener = saved_listener
+        messages = sorted(json.loads(line)['message'] for line in concurrent_log.read_text().splitlines())
+        print(f"Concurrent first records logged: {len(messages)}")
+        assert messages == sorted(f"First record {i}" for i in range(8))
+
+        print("\n🎉 Structured logging tests completed successfully!")
+
+def test_stage_profile():
+    """Test the stage timers and counters exposed through get_agent_statistics"""
+    print("🧪 Testing stage profiling")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        create_test_agent_file(temp_path, "Research Ideator", "research-planning")
+        # YAML rejects this description, so it gets the manual-parse semantics
+        (temp_path / "fallback.md").write_text(
+            "---\nname: fallback-agent\ndescription: Use this agent when: data needs cleaning\n"
+            "tools: Read\n---\n\nBody\n")
+        system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"), use_cache=False)
+        system.find_relevant_agents("research ideas")
+        system.search_agents("research")
+        system.execute_agent("Research Ideator", "Generate ideas")
+
+        profile = system.get_agent_statistics()['performance']
+        print(format_profile(profile))
+        for stage in ['load_agents', 'walk', 'stat', 'read', 'parse', 'build_indexes', 'save_config',
+                      'route', 'search', 'build_prompt']:
+            assert profile['stages'][stage]['calls'] >= 1, stage
+        assert profile['stages']['read']['calls'] == 2
+        assert profile['counters']['files_scanned'] == 2
+        assert profile['counters']['manual_fallbacks'] == 1
+        assert profile['counters']['frontmatter_scan_fallback'] == 1
+
+        profile_file = temp_path / "profile.json"
+        save_profile(profile, str(profile_file))
+        assert json.loads(profile_file.read_text()) == json.loads(json.dumps(profile))
+
+        print("\n🎉 Stage profiling tests completed successfully!")
+
+def test_benchmark_suite():
+    """Test the synthetic corpus generator and the baseline regression check"""
+    print("🧪 Testing the benchmark suite")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agents_dir = benchmark_agent_system.generate_agent_tree(temp_path / "agents", 12)
+        agent_files = list(agents_dir.rglob("*.md"))
+        assert len(agent_files) == 12
+        assert all(agent_file.stat().st_size > 10 * 1024 for agent_file in agent_files)
+
+        results = benchmark_agent_system.benchmark_corpus(agents_dir, temp_path, repeat=1)
+        print(benchmark_agent_system.format_results({'12': results}, {}))
+        for metric in ['load_agents_cold', 'load_agents_warm', 'find_relevant_agents', 'search_agents',
+                       'execute_agent', 'export_json', 'export_yaml', 'export_csv', 'export_jsonl',
+                       'export_yaml_stream', 'export_jsonl_gzip', 'validate_agents']:
+            assert results[metric] > 0, metric
+
+        # Only slowdowns past both the tolerance and the noise floor fail, and metrics without a baseline
+        baseline = {'12': {'fast': 0.010, 'slow': 0.010, 'noisy': 0.0001}}
+        current = {'12': {'fast': 0.0125, 'slow': 0.020, 'noisy': 0.0009, 'new': 1.0}}
+        regressions = benchmark_agent_system.compare_to_baseline(current, baseline, tolerance=0.25)
+        print(f"Regressions: {regressions}")
+        assert len(regressions) == 2 and regressions[0].startswith("12 agents slow")
+        assert regressions[1] == "12 agents new: no baseline entry (run with --update-baseline)"
+        # A size without any baseline is not compared rather than failing
+        assert benchmark_agent_system.compare_to_baseline(current, {}, tolerance=0.25) == []
+        assert benchmark_agent_system.uncompared_sizes({**current, '100000': {'fast': 1.0}}, baseline) == ['100000']
+
+        # The stored baseline covers every metric the suite measures
+        stored = json.loads(Path("benchmark_baseline.json").read_text())
+        for size in map(str, benchmark_agent_system.DEFAULT_SIZES):
+            missing = sorted(set(results) - set(stored[size]))
+            assert not missing, f"benchmark_baseline.json lacks {size} agents: {missing}"
+
+        print("\n🎉 Benchmark suite tests completed successfully!")
+
+def test_name_index():
+    """Test that one-shot lookups from the name index match a full load and notice file changes"""
+    print("🧪 Testing the agent name index fast path")
+    print("=" * 50)
+
+    def backdate(root: Path) -> None:
+        # Paths written within the racy window are not trusted by the index
+        past = time.time() - 60
+        for path in [root, *root.rglob('*')]:
+            os.utime(path, (past, past))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agents_path = temp_path / "agents"
+        output_dir = temp_path / "output"
+        (agents_path / "research-planning").mkdir(parents=True)
+        create_test_agent_file(agents_path / "research-planning", "Research Ideator", "research-planning")
+        create_test_agent_file(agents_path, "Data Analyst", "data-analysis")
+        (agents_path / "crlf_agent.md").write_bytes(
+            "---\r\nname: crlf-agent\r\ndescription: Ünïcödé — agent\r\n---\r\n\r\nBody ✓ text\r\n".encode('utf-8'))
+        backdate(agents_path)
+
+        assert AugmentAgentSystem.from_name_index(str(agents_path), str(output_dir)) is None
+        full = AugmentAgentSystem(str(agents_path), str(output_dir))
+        fast = AugmentAgentSystem.from_name_index(str(agents_path), str(output_dir))
+        assert fast is not None and list(fast.agents) == list(full.agents)
+        for name, agent in full.agents.items():
+            assert fast.agents[name].to_dict() == agent
+            assert fast.execute_agent(name, "Test query")['prompt'] == full.execute_agent(name, "Test query")['prompt']
+        assert fast.search_agents("research") == full.search_agents("research")
+        assert fast.find_relevant_agents("data analysis") == full.find_relevant_agents("data analysis")
+        print(f"Served {len(fast.agents)} agents from the name index")
+
+        # Added and edited files make the index unusable until the next full load
+        create_test_agent_file(agents_path / "research-planning", "Literature Reviewer", "research-planning")
+        assert AugmentAgentSystem.from_name_index(str(agents_path), str(output_dir)) is None
+        backdate(agents_path)
+        AugmentAgentSystem(str(agents_path), str(output_dir))
+        fast = AugmentAgentSystem.from_name_index(str(agents_path), str(output_dir))
+        assert "Literature Reviewer" in fast.agents
+
+        agent_file = agents_path / "data_analyst.md"
+        agent_file.write_text(agent_file.read_text().replace("color: blue", "color: teal"))
+        assert AugmentAgentSystem.from_name_index(str(agents_path), str(output_dir)) is None
+
+        # Single files are validated without loading the registry
+        assert not any(AugmentAgentSystem.validate_agent_file(str(agent_file)).values())
+        broken_file = temp_path / "broken.md"
+        broken_file.write_text("---\n- not\n- a mapping\n---\n\nBody\n")
+        assert AugmentAgentSystem.validate_agent_file(str(broken_file))['parse_errors']
+        (temp_path / "no_prompt.md").write_text("---\nname: empty\ndescription: ''\n---\n")
+        issues = AugmentAgentSystem.validate_agent_file(str(temp_path / "no_prompt.md"))
+        assert issues['missing_fields'] == ["empty: missing description", "empty: missing system_prompt"]
+        assert issues['empty_descriptions'] == ["empty"]
+
+        print("\n🎉 Name index tests completed successfully!")
+
+def test_agent_records():
+    """Test that slotted agent records read like dicts and share interned strings"""
+    print("🧪 Testing compact agent records")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        output_dir = temp_path / "output"
+        create_test_agent_file(temp_path, "Research Ideator", "research-planning")
+        create_test_agent_file(temp_path, "Data Analyst", "data-analysis")
+        system = AugmentAgentSystem(str(temp_path), str(output_dir))
+        ideator = system.agents["Research Ideator"]
+        analyst = system.agents["Data Analyst"]
+
+        assert isinstance(ideator, AgentRecord) and not hasattr(ideator, '__dict__')
+        assert list(ideator) == ['name', 'description', 'color', 'tools', 'system_prompt', 'file_path', 'category']
+        assert ideator['tools'] == ['web-search', 'codebase-retrieval'] and ideator.get('missing', 'x') == 'x'
+        assert dict(ideator) == ideator.to_dict() == ideator and 'system_prompt' in ideator
+        assert ideator['tools'][0] is analyst['tools'][0] and ideator['color'] is analyst['color']
+
+        # Records loaded from the registry cache share the same interned strings
+        warm = AugmentAgentSystem(str(temp_path), str(output_dir))
+        assert warm.cache_stats['parsed'] == 0 and warm.agents["Research Ideator"] == ideator
+        assert warm.agents["Data Analyst"]['tools'][1] is ideator['tools'][1]
+        assert pickle.loads(pickle.dumps(ideator)) == ideator
+
+        lazy = LazyAgent.from_record(ideator, 0)
+        assert 'system_prompt' in lazy and 'system_prompt' not in dict(lazy)
+        assert pickle.loads(pickle.dumps(lazy)).body_offset == 0
+
+        print("\n🎉 Agent record tests completed successfully!")
+
+def test_prompt_dedup():
+    """Test that shared prompt sections are stored once in memory and in exports"""
+    print("🧪 Testing content-addressed prompt deduplication")
+    print("=" * 50)
+
+    shared = "## Methodology\n\nFollow the shared research methodology.\n\n## Output Format\n\nUse Markdown.\n"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        output_dir = temp_path / "output"
+        for i in range(4):
+            (temp_path / f"variant_{i}.md").write_text(
+                f"---\nname: variant-{i}\ndescription: Shared research assistant\n---\n\n"
+                f"You are variant {i}.\n\n{shared}\n## Variant Notes\n\nNotes for variant {i}.\n")
+
+        plain = AugmentAgentSystem(str(temp_path), str(output_dir), use_cache=False)
+        dedup = AugmentAgentSystem(str(temp_path), str(output_dir), dedup_prompts=True)
+        for name, agent in plain.agents.items():
+            assert dedup.agents[name]['system_prompt'] == agent['system_prompt']
+            assert dedup.agents[name] == agent
+        first, second = dedup.agents["variant-0"], dedup.agents["variant-1"]
+        assert first.prompt_chunks[1] is second.prompt_chunks[1] and first['description'] is second['description']
+        stats = dedup.get_agent_statistics()['prompt_chunks']
+        print(f"Chunk store: {stats}")
+        # 4 intros, 2 shared sections, 4 variant notes and 1 shared description
+        assert stats['distinct'] == 11
+
+        # Records from the deduplicated cache join the same store
+        warm = AugmentAgentSystem(str(temp_path), str(output_dir), dedup_prompts=True)
+        assert warm.cache_stats['parsed'] == 0
+        assert warm.agents["variant-2"].prompt_chunks[1] is warm.agents["variant-3"].prompt_chunks[1]
+
+        # Deduplicated exports store each section once and expand back exactly
+        for format_type in ('json', 'yaml'):
+            plain_file = plain.export_agents_data(format_type)
+            dedup_file = plain.export_agents_data(format_type, dedup=True)
+            load = json.loads if format_type == 'json' else yaml.safe_load
+            plain_data = load(Path(plain_file).read_text(encoding='utf-8'))
+            dedup_data = load(Path(dedup_file).read_text(encoding='utf-8'))
+            assert dedup_data['export_info']['total_chunks'] == len(dedup_data['chunks']) == 11
+            assert expand_agents(dedup_data) == plain_data['agents'] == expand_agents(plain_data)
+            print(f"{format_type}: {os.path.getsize(plain_file)} bytes -> {os.path.getsize(dedup_file)} bytes")
+
+        print("\n🎉 Prompt deduplication tests completed successfully!")
+
+def _route_in_worker(path: str, query: str) -> list:
+    """Route a query from a mapped registry in a worker process"""
+    with MappedRegistry(path) as registry:
+        return [agent['name'] for agent in registry.find_relevant_agents(query)]
+
+def test_mapped_registry():
+    """Test that a mapped registry snapshot answers like the system it was written from"""
+    print("🧪 Testing mapped registry snapshots")
+    print("=" * 50)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for name, category in [("statistical-analyst", "data analysis"), ("academic-writer", "paper writing"),
+                               ("paper-finder", "literature search"), ("data-visualizer", "data plots")]:
+            create_test_agent_file(temp_path, name, category)
+        # Non-string frontmatter values survive the snapshot
+        (temp_path / "odd.md").write_text(
+            "---\nname: odd-agent\ndescription: Odd agent\ncolor: 42\ntools: [Read, 7]\n---\n\nÜnïcode prompt\n",
+            encoding='utf-8')
+
+        system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"))
+        path = system.save_mapped_registry()
+        print(f"Snapshot: {os.path.getsize(path)} bytes")
+
+        with MappedRegistry(path) as registry:
+            assert len(registry) == len(system.agents)
+            assert registry.agent_names() == system.router.agent_names()
+            for name, agent in system.agents.items():
+                assert registry.get_agent(name) == agent and name in registry
+            assert registry.get_agent("missing-agent") is None and "missing-agent" not in registry
+            assert registry.get_agent("odd-agent")["color"] == 42
+            for query in ["data analysis", "statistical writing", "literature papers", "odd", "nothing-matches", ""]:
+                for limit in (1, 3, 10):
+                    assert registry.route(query, limit) == system.router.search(query, limit)
+                assert registry.find_relevant_agents(query) == system.find_relevant_agents(query)
+            assert registry.metadata['agents_directory'] == str(temp_path.resolve())
+
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            routed = list(pool.map(_route_in_worker, [path, path], ["data analysis", "paper writing"]))
+        print(f"Routed in workers: {routed}")
+        assert routed == [[agent['name'] for agent in system.find_relevant_agents(query)]
+                          for query in ["data analysis", "paper writing"]]
+
+        Path(path).write_bytes(b"not a snapshot")
+        try:
+            MappedRegistry(path)
+            assert False, "Expected ValueError for a file that is not a snapshot"
+        except ValueError:
+            pass
+
+        print("\n🎉 Mapped registry tests completed successfully!")
+
+def test_sqlite_registry():
+    """Test the SQLite registry against the in-memory one and its incremental sync"""
+    print("🧪 Testing SQLite agent registry")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agents_dir = temp_path / "agents"
+        (agents_dir / "analysis").mkdir(parents=True)
+        for name, category in [("statistical-analyst", "data analysis"), ("academic-writer", "paper writing"),
+                               ("paper-finder", "literature search")]:
+            create_test_agent_file(agents_dir, name, category)
+        create_test_agent_file(agents_dir / "analysis", "data-visualizer", "data plots")
+        db_path = temp_path / "agents.db"
+
+        memory = AugmentAgentSystem(str(agents_dir), str(temp_path / "output"), use_cache=False)
+        system = SQLiteAgentSystem(str(db_path), str(agents_dir), str(temp_path / "output"))
+        assert system.get_agent("data-visualizer") == memory.get_agent("data-visualizer")
+        assert system.get_agent("missing-agent") is None
+        assert dict(system.agents) == dict(memory.agents)
+        for term in ["data", "WRITER", "an", "test agent", "nothing"]:
+            for fields in [None, ['name'], ['category', 'system_prompt']]:
+                assert system.search_agents(term, fields) == memory.search_agents(term, fields)
+        for query in ["statistical data analysis", "writing papers", "literature"]:
+            routed = [agent['name'] for agent in system.find_relevant_agents(query)]
+            print(f"Routed '{query}': {routed}")
+            assert routed[0] == memory.find_relevant_agents(query)[0]['name']
+        stats, expected = system.get_agent_statistics(), memory.get_agent_statistics()
+        assert (stats['categories'], stats['tools_usage']) == (expected['categories'], expected['tools_usage'])
+
+        # A second system reuses the database without parsing anything
+        assert SQLiteAgentSystem(str(db_path), str(agents_dir), str(temp_path / "output")).refresh() == {
+            'added': [], 'changed': [], 'removed': []}
+
+        # Only changed files are synced, and a same-named file walked later wins
+        time.sleep(0.01)
+        (agents_dir / "paper-finder.md").unlink()
+        writer_file = agents_dir / "academic-writer.md"
+        writer_file.write_text(writer_file.read_text().replace("paper writing", "grant writing"))
+        create_test_agent_file(agents_dir, "ethics-advisor", "research ethics")
+        changes = system.refresh()
+        print(f"Changes: {changes}")
+        assert [len(changes[kind]) for kind in ('added', 'changed', 'removed')] == [1, 1, 1]
+        memory.refresh()
+        assert dict(system.agents) == dict(memory.agents)
+        assert "grant writing" in system.get_agent("academic-writer")['system_prompt']
+        assert system.search_agents("paper-finder") == []
+        assert [agent['name'] for agent in system.search_agents("ethics")] == ["ethics-advisor"]
+
+        duplicate = create_test_agent_file(agents_dir / "analysis", "ethics-advisor", "duplicated ethics")
+        system.refresh()
+        memory.refresh()
+        assert system.get_agent("ethics-advisor") == memory.get_agent("ethics-advisor")
+        assert len(system.search_agents("ethics-advisor")) == 1
+        duplicate.unlink()
+        system.refresh()
+        assert "research ethics" in system.get_agent("ethics-advisor")['system_prompt']
+        assert system.get_agent_statistics()['total_agents'] == 4
+
+        print("\n🎉 SQLite registry tests completed successfully!")
+
+def test_streaming_exports():
+    """Test streamed, projected and compressed exports"""
+    print("🧪 Testing streaming exports")
+    print("=" * 50)
+
+    import csv
+    import gzip
+    import lzma
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        for name, category in [("statistical-analyst", "data analysis"), ("academic-writer", "paper writing")]:
+            create_test_agent_file(temp_path, name, category)
+        system = AugmentAgentSystem(str(temp_path), str(temp_path / "output"), lazy_prompts=True)
+        agents = [agent.to_dict() for agent in system.agents.values()]
+
+        jsonl_file = system.export_agents_data('jsonl')
+        assert jsonl_file.endswith('.jsonl')
+        lines = Path(jsonl_file).read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line) for line in lines] == agents
+
+        yaml_file = system.export_agents_data('yaml-stream')
+        assert list(yaml.safe_load_all(Path(yaml_file).read_text(encoding='utf-8'))) == agents
+
+        # A projection without prompts leaves lazily loaded prompts on disk
+        fresh = AugmentAgentSystem(str(temp_path), str(temp_path / "output"), lazy_prompts=True)
+        csv_file = fresh.export_agents_data('csv', fields='name,tools')
+        with open(csv_file, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ['name', 'tools'] and len(rows) == 3
+        assert rows[1][1] == 'web-search, codebase-retrieval'
+        assert not any(agent._has_prompt() for agent in fresh.agents.values())
+
+        for compression, opener, suffix in [('gzip', gzip.open, '.jsonl.gz'), ('lzma', lzma.open, '.jsonl.xz')]:
+            compressed = system.export_agents_data('jsonl', fields=['name', 'system_prompt'], compression=compression)
+            assert compressed.endswith(suffix)
+            with opener(compressed, 'rt', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+            assert records == [{'name': agent['name'], 'system_prompt': agent['system_prompt']} for agent in agents]
+
+        # Whole-document formats take projections and compression too
+        with gzip.open(system.export_agents_data('json', fields=['name'], compression='gzip'), 'rt') as f:
+            assert json.load(f)['agents'] == {agent['name']: {'name': agent['name']} for agent in agents}
+
+        for bad in [lambda: system.export_agents_data('jsonl', fields='name,secret'),
+                    lambda: system.export_agents_data('jsonl', compression='zip'),
+                    lambda: system.export_agents_data('xml')]:
+            try:
+                bad()
+                assert False, "Expected ValueError"
+            except ValueError as e:
+                print(f"Rejected: {e}")
+
+        print("\n🎉 Streaming export tests completed successfully!")
+
+def test_llm_backend():
+    """Test executing agents through an HTTP backend against the mock server"""
+    print("🧪 Testing LLM execution backend")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agents_dir = temp_path / "agents"
+        agents_dir.mkdir()
+        create_test_agent_file(agents_dir, "statistical-analyst", "data analysis")
+        system = AugmentAgentSystem(str(agents_dir), str(temp_path / "output"))
+
+        # The first request is refused with 503 and retried on the same connection
+        with MockLLMServer(fail_first=1) as server, HTTPBackend(server.url, model='test-model', backoff=0) as backend:
+            system.backend = backend
+            result = system.execute_agent("statistical-analyst", "Analyze this data", save_output=True)
+            print(f"Response: {result['response']}")
+            assert result['success']
+            assert result['response'].startswith("Mock response to: You are now acting as the statistical-analyst")
+            assert result['backend']['model'] == 'test-model'
+            assert result['backend']['attempts'] == 2
+            assert result['backend']['usage']['total_tokens'] > 0
+            assert result['response'] in Path(result['output_file']).read_text()
+
+            # Executions from several threads share the pooled keep-alive connections
+            threads = [threading.Thread(target=lambda: [system.execute_agent("statistical-analyst", "Again")
+                                                        for _ in range(10)]) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            print(f"Server counters: {server.counters}, backend stats: {backend.stats}")
+            assert server.counters['requests'] == 42
+            assert server.counters['connections'] == backend.pool.opened <= 4
+            assert backend.stats == {'requests': 42, 'retries': 1, 'failures': 0}
+            assert system.get_agent_statistics()['performance']['stages']['backend_complete']['calls'] == 41
+
+        # Failures past the retry budget come back as an error result
+        with MockLLMServer(fail_first=5) as server, HTTPBackend(server.url, max_retries=2, backoff=0) as backend:
+            system.backend = backend
+            result = system.execute_agent("statistical-analyst", "Analyze this data")
+            print(f"Error: {result['error']}")
+            assert not result['success'] and "after 3 attempts" in result['error'] and 'prompt' in result
+            assert server.counters['requests'] == 3
+
+        system.backend = None
+        assert 'response' not in system.execute_agent("statistical-analyst", "Analyze this data")
+
+        print("\n🎉 LLM backend tests completed successfully!")
+
+def test_async_execution():
+    """Test concurrent agent execution with a concurrency limit, deadlines and cancellation"""
+    print("🧪 Testing async agent execution")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agents_dir = temp_path / "agents"
+        agents_dir.mkdir()
+        names = ["paper-finder", "literature-synthesizer", "citation-analyzer", "gap-analyzer"]
+        for name in names:
+            create_test_agent_file(agents_dir, name, "literature review")
+        system = AugmentAgentSystem(str(agents_dir), str(temp_path / "output"))
+        requests = [{'agent_name': name, 'user_query': f"Query for {name}"} for name in names]
+
+        with MockLLMServer(latency=0.3) as server, HTTPBackend(server.url) as backend:
+            system.backend = backend
+
+            # Independent executions overlap, and results keep the request order
+            start = time.perf_counter()
+            results = asyncio.run(system.aexecute_many(requests, concurrency=4))
+            elapsed = time.perf_counter() - start
+            print(f"4 executions at once: {elapsed:.2f}s")
+            assert [result['agent'] for result in results] == names
+            assert all(result['success'] and 'response' in result for result in results)
+            assert elapsed < 0.9
+
+            # The semaphore lets only two run at a time
+            start = time.perf_counter()
+            asyncio.run(system.aexecute_many(requests, concurrency=2))
+            elapsed = time.perf_counter() - start
+            print(f"4 executions, 2 at a time: {elapsed:.2f}s")
+            assert elapsed >= 0.55
+
+            # A deadline turns a slow call into a timed-out result; others are unaffected
+            start = time.perf_counter()
+            results = asyncio.run(system.aexecute_many(
+                [{**requests[0], 'timeout': 0.1}] + requests[1:2], timeout=5))
+            print(f"Timed out: {results[0]['error']}")
+            assert results[0]['timed_out'] and not results[0]['success']
+            assert results[1]['success']
+            assert system.metrics.snapshot()['counters']['execute_timeouts'] == 1
+
+            # Cancelling the fan-out cancels every execution in it
+            async def cancel_soon():
+                task = asyncio.ensure_future(system.aexecute_many(requests * 3, concurrency=2))
+                await asyncio.sleep(0.1)
+                task.cancel()
+                try:
+                    await task
+                    assert False, "Expected CancelledError"
+                except asyncio.CancelledError:
+                    pass
+
+            start = time.perf_counter()
+            asyncio.run(cancel_soon())
+            elapsed = time.perf_counter() - start
+            print(f"Cancelled after {elapsed:.2f}s")
+            assert elapsed < 1.0
+
+            result = asyncio.run(system.aexecute_agent("missing-agent", "Query"))
+            assert not result['success'] and 'not found' in result['error']
+            for bad in [lambda: system.aexecute_many(requests, concurrency=0),
+                        lambda: system.aexecute_many([{'agent_name': 'paper-finder'}])]:
+                try:
+                    asyncio.run(bad())
+                    assert False, "Expected ValueError"
+                except ValueError as e:
+                    print(f"Rejected: {e}")
+
+        print("\n🎉 Async execution tests completed successfully!")
+
+def test_workflow_engine():
+    """Test running a workflow as a dependency graph with timings and the critical path"""
+    print("🧪 Testing workflow engine")
+    print("=" * 50)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+
+        # The shipped workflow is a valid graph over the repository's agents
+        shipped = load_workflow("workflows/sparse_forecasting.yaml")
+        repo_agents = AugmentAgentSystem(".", str(temp_path / "repo"), use_cache=False).agents
+        assert len(shipped.steps) == 12 and all(step.agent in repo_agents for step in shipped.steps)
+        position = {step_id: i for i, step_id in enumerate(shipped.order)}
+        assert all(position[dependency] < position[step.id]
+                   for step in shipped.steps for dependency in step.depends_on)
+
+        agents_dir = temp_path / "agents"
+        agents_dir.mkdir()
+        for name in ["research-ideator", "paper-finder", "citation-analyzer", "literature-synthesizer",
+                     "academic-writer"]:
+            create_test_agent_file(agents_dir, name, "research")
+        system = AugmentAgentSystem(str(agents_dir), str(temp_path / "output"))
+
+        # ideas fans out to papers and citations, which both feed synthesis; writing is independent
+        workflow = Workflow("diamond", [
+            WorkflowStep("ideas", "research-ideator", "Ideas on {topic}"),
+            WorkflowStep("papers", "paper-finder", "Papers on {topic}", depends_on=["ideas"]),
+            WorkflowStep("citations", "citation-analyzer", "Citations", depends_on=["ideas"]),
+            WorkflowStep("synthesis", "literature-synthesizer", "Synthesis", depends_on=["papers", "citations"]),
+            WorkflowStep("writing", "academic-writer", "Outline")
+        ], context={'topic': "sparse forecasting"})
+        assert workflow.order == ["ideas", "writing", "papers", "citations", "synthesis"]
+
+        with MockLLMServer(latency=0.2) as server, HTTPBackend(server.url) as backend:
+            system.backend = backend
+            report = run_workflow(system, workflow, max_workers=4)
+            print(format_workflow_report(report))
+            steps = report['steps']
+            assert report['success'] and all(step['status'] == 'succeeded' for step in steps.values())
+            assert steps['ideas']['result']['user_query'] == "Ideas on sparse forecasting"
+            # Dependencies' responses reach a step as its context
+            context = steps['synthesis']['result']['context']
+            assert "papers (paper-finder):\nMock response" in context and "citations (citation-analyzer)" in context
+            assert steps['ideas']['result']['context'] == ""
+            # Independent branches overlapped: four rounds of 0.2s would take 0.8s serially
+            assert steps['papers']['start'] < steps['citations']['start'] + steps['citations']['seconds']
+            assert report['wall_seconds'] < report['serial_seconds'] * 0.8
+            path = report['critical_path']
+            assert path[0] == "ideas" and path[1] in ("papers", "citations") and path[2] == "synthesis"
+            assert abs(report['critical_path_seconds'] - sum(steps[step]['seconds'] for step in path)) < 1e-9
+
+            # A failed step skips what depends on it, and only other branches run on
+            broken = Workflow("broken", [
+                WorkflowStep("ideas", "missing-agent", "Ideas"),
+                WorkflowStep("papers", "paper-finder", "Papers", depends_on=["ideas"]),
+                WorkflowStep("synthesis", "literature-synthesizer", "Synthesis", depends_on=["papers"]),
+                WorkflowStep("writing", "academic-writer", "Outline")
+            ])
+            report = run_workflow(system, broken)
+            statuses = {step_id: step['status'] for step_id, step in report['steps'].items()}
+            print(f"Statuses: {statuses}")
+            assert not report['success']
+            assert statuses == {'ideas': 'failed', 'writing': 'succeeded', 'papers': 'skipped', 'synthesis': 'skipped'}
+
+            # A subset runs without the steps it depends on
+            report = run_workflow(system, workflow, only=["synthesis", "writing"])
+            assert report['order'] == ["writing", "synthesis"] and report['success']
+            assert report['steps']['synthesis']['result']['context'] == ""
+
+            # Process workers open their own registry and backend connections
+            report = run_workflow(system, workflow, max_workers=2, executor='process', only=["ideas", "papers"])
+            print(format_workflow_report(report))
+            assert report['success'] and report['steps']['papers']['result']['response'].startswith("Mock response")
+
+        for bad in [lambda: Workflow("cycle", [WorkflowStep("a", "x", "q", ["b"]), WorkflowStep("b", "x", "q", ["a"])]),
+                    lambda: Workflow("unknown", [WorkflowStep("a", "x", "q", ["missing"])]),
+                    lambda: Workflow("duplicate", [WorkflowStep("a", "x", "q"), WorkflowStep("a", "x", "q")]),
+                    lambda: Workflow("template", [WorkflowStep("a", "x", "About {topic}")]),
+                    lambda: Workflow.from_dict({'steps': [{'id': 'a', 'agent': 'x'}]}),
+                    lambda: run_workflow(system, workflow, only=["missing"]),
+                    lambda: run_workflow(system, workflow, executor='fiber')]:
+            try:
+                bad()
+                assert False, "Expected ValueError"
+            except ValueError as e:
+                print(f"Rejected: {e}")
+
+        print("\n🎉 Workflow engine tests completed successfully!")
+
+def test_workflow_batch():
+    """Test headless workflow batches over a parameter file, saved to a run directory"""
+    print("🧪 Testing workflow batch mode")
+    print("=" * 50)
+
+    from sparse_forecasting_workflow import SparseForecasting_ResearchWorkflow
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agents_dir = temp_path / "agents"
+        agents_dir.mkdir()
+        for name in ["research-ideator", "paper-finder", "literature-synthesizer"]:
+            create_test_agent_file(agents_dir, name, "research")
+        system = AugmentAgentSystem(str(agents_dir), str(temp_path / "output"))
+
+        workflow = Workflow("review", [
+            WorkflowStep("ideas", "research-ideator", "Ideas on {topic}"),
+            WorkflowStep("papers", "paper-finder", "Papers on {topic}", depends_on=["ideas"]),
+            WorkflowStep("synthesis", "literature-synthesizer", "Synthesis", depends_on=["papers"])
+        ], context={'topic': "sparse forecasting"})
+
+        params_file = temp_path / "contexts.yaml"
+        params_file.write_text(yaml.safe_dump([
+            {'name': "intermittent", 'context': {'topic': "intermittent demand"}},
+            {'name': "irregular", 'context': {'topic': "irregular sampling"}},
+            {'topic': "missing values"}
+        ]))
+        jsonl_file = temp_path / "contexts.jsonl"
+        jsonl_file.write_text('{"topic": "a"}\n\n{"name": "b", "context": {"topic": "b"}}\n')
+        assert [entry['name'] for entry in load_workflow_parameters(str(jsonl_file))] == ["run-1", "b"]
+
+        with MockLLMServer() as server, HTTPBackend(server.url) as backend:
+            system.backend = backend
+            batch = run_workflow_batch(system, workflow, str(params_file), max_workers=4)
+            print(format_batch_report(batch))
+            assert batch['success'] and batch['steps'] == 9 and batch['failed_steps'] == 0
+            assert [report['workflow'] for report in batch['runs']] == ["intermittent", "irregular", "run-3"]
+            assert batch['runs'][1]['steps']['papers']['result']['user_query'] == "Papers on irregular sampling"
+            assert batch['steps_per_second'] > 0 and batch['runs_per_minute'] > 0
+
+            # Without run_dir the batch goes to a new directory under output/workflow_runs
+            run_path = Path(batch['run_dir'])
+            assert run_path.parent == temp_path / "output" / "workflow_runs"
+            summary = json.loads((run_path / "summary.json").read_text())
+            assert summary['success'] and [run['directory'] for run in summary['runs']] == [
+                "intermittent", "irregular", "run-3"]
+            assert summary['runs'][0]['statuses'] == {'ideas': 'succeeded', 'papers': 'succeeded',
+                                                      'synthesis': 'succeeded'}
+            step_files = sorted(path.name for path in (run_path / "intermittent" / "steps").iterdir())
+            assert step_files == ["01_ideas.json", "01_ideas.md", "02_papers.json", "02_papers.md",
+                                  "03_synthesis.json", "03_synthesis.md"]
+            step = json.loads((run_path / "intermittent" / "steps" / "02_papers.json").read_text())
+            assert step['step'] == "papers" and step['result']['response'].startswith("Mock response")
+            assert "## Response" in (run_path / "intermittent" / "steps" / "02_papers.md").read_text()
+            run = json.loads((run_path / "intermittent" / "run.json").read_text())
+            assert run['context'] == {'topic': "intermittent demand"} and 'result' not in run['steps']['ideas']
+
+            # A failing step fails the batch, and the run directory records it
+            broken = Workflow("broken", [WorkflowStep("ideas", "missing-agent", "Ideas"),
+                                         WorkflowStep("papers", "paper-finder", "Papers", depends_on=["ideas"])])
+            batch = run_workflow_batch(system, broken, run_dir=str(temp_path / "broken_run"))
+            summary = json.loads((temp_path / "broken_run" / "summary.json").read_text())
+            assert not batch['success'] and not summary['success'] and summary['failed_steps'] == 2
+            assert summary['runs'][0]['statuses'] == {'ideas': 'failed', 'papers': 'skipped'}
+
+            # The research workflow runs a subset of its phases headlessly
+            research = SparseForecasting_ResearchWorkflow(backend, agents_dir=".",
+                                                          output_dir=str(temp_path / "research"))
+            phase_one = research.phase_steps([1])
+            batch = research.run_batch([1], run_dir=str(temp_path / "phase_run"))
+            assert batch['success'] and set(batch['runs'][0]['steps']) == set(phase_one)
+            assert len(list((temp_path / "phase_run").glob("*/steps/*.json"))) == len(phase_one)
+            try:
+                research.phase_steps([9])
+                assert False, "Expected ValueError"
+            except ValueError as e:
+                print(f"Rejected: {e}")
+
+        for content in ["[]", "topic: not a list", "- [1, 2]", "- {context: text}",
+                        "- {name: a, topic: x}\n- {name: a, topic: y}", "- {topic: [unclosed"]:
+            params_file.write_text(content)
+            try:
+                load_workflow_parameters(str(params_file))
+                assert False, "Expected ValueError"
+            except ValueError as e:
+                print(f"Rejected: {e}")
+
+        print("\n🎉 Workflow batch tests completed successfully!")
+
+class _CountingBackend(LLMBackend):
+    """Backend whose every response differs, so a re-run step changes its dependents' context"""
+
+    model = 'counting'
+
+    def __init__(self):
+        self.calls = []
+
+    def complete(self, prompt, agent=None, deadline=None):
+        self.calls.append(agent['name'])
+        return {'text': f"Answer {len(self.calls)} from {agent['name']}"}
+
+def test_workflow_checkpoint():
+    """Test resuming workflows from checkpointed steps whose inputs are unchanged"""
+    print("🧪 Testing workflow checkpoints")
+    print("=" * 50)
+
+    from sparse_forecasting_workflow import SparseForecasting_ResearchWorkflow
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_path = Path(temp_dir)
+        agents_dir = temp_path / "agents"
+        agents_dir.mkdir()
+        agent_files = {name: create_test_agent_file(agents_dir, name, "research")
+                       for name in ["research-ideator", "paper-finder", "literature-synthesizer", "academic-writer"]}
+        backend = _CountingBackend()
+        system = AugmentAgentSystem(str(agents_dir), str(temp_path / "output"), backend=backend)
+        checkpoint = WorkflowCheckpoint(str(temp_path / "checkpoints"))
+
+        workflow = Workflow("review", [
+            WorkflowStep("ideas", "research-ideator", "Ideas on {topic}"),
+            WorkflowStep("papers", "paper-finder", "Papers on {topic}", depends_on=["ideas"]),
+            WorkflowStep("synthesis", "literature-synthesizer", "Synthesis", depends_on=["papers"]),
+            WorkflowStep("writing", "academic-writer", "Outline")
+        ], context={'topic': "sparse forecasting"})
+
+        first = run_workflow(system, workflow, checkpoint=checkpoint)
+        assert first['success'] and first['cached_steps'] == 0 and len(backend.calls) == 4
+        assert checkpoint.stats['saved'] == 4 and checkpoint.step_file("review", "papers").exists()
+
+        # Unchanged inputs: nothing is executed and the saved results come back
+        second = run_workflow(system, workflow, checkpoint=checkpoint)
+        print(format_workflow_report(second))
+        assert len(backend.calls) == 4 and second['cached_steps'] == 4 and second['critical_path'] == []
+        assert all(second['steps'][step_id]['result']['response'] == first['steps'][step_id]['result']['response']
+                   for step_id in workflow.order)
+
+        # An edited agent file invalidates its step, whose new response invalidates what depends on it
+        time.sleep(0.01)
+        with open(agent_files["paper-finder"], 'a') as f:
+            f.write("\nPrefer recent venues.\n")
+        system.refresh()
+        third = run_workflow(system, workflow, checkpoint=checkpoint)
+        cached = {step_id for step_id, step in third['steps'].items() if step.get('cached')}
+        print(f"Reused after editing paper-finder: {sorted(cached)}")
+        assert cached == {"ideas", "writing"} and backend.calls[4:] == ["paper-finder", "literature-synthesizer"]
+        assert third['critical_path'] == ["papers", "synthesis"]
+
+        # A changed context re-runs the steps whose queries use it, and their dependents
+        fourth = run_workflow(system, workflow.with_context({'topic': "intermittent demand"}), checkpoint=checkpoint)
+        assert fourth['cached_steps'] == 1 and fourth['steps']['writing'].get('cached')
+        assert backend.calls[6:] == ["research-ideator", "paper-finder", "literature-synthesizer"]
+        assert "intermittent demand" in checkpoint.read("review", "papers")['inputs']['query']
+
+        # A single step starts from its dependencies' saved responses instead of an empty context
+        calls = len(backend.calls)
+        report = run_workflow(system, workflow.with_context({'topic': "intermittent demand"}), only=["synthesis"],
+                              checkpoint=checkpoint)
+        assert report['order'] == ["ideas", "papers", "synthesis"] and report['cached_steps'] == 3
+        assert len(backend.calls) == calls
+        papers_response = report['steps']['papers']['result']['response']
+        assert report['steps']['synthesis']['result']['context'] == f"papers (paper-finder):\n{papers_response}"
+        blind = run_workflow(system, workflow, only=["synthesis"])
+        assert blind['order'] == ["synthesis"] and blind['steps']['synthesis']['result']['context'] == ""
+
+        # Failed steps are not saved, and unreadable checkpoints are ignored
+        broken = Workflow("broken", [WorkflowStep("ideas", "missing-agent", "Ideas")])
+        assert not run_workflow(system, broken, checkpoint=checkpoint)['success']
+        assert not checkpoint.step_file("broken", "ideas").exists()
+        checkpoint.step_file("review", "writing").write_text("{not json")
+        calls = len(backend.calls)
+        report = run_workflow(system, workflow, only=["writing"], checkpoint=checkpoint)
+        assert report['cached_steps'] == 0 and backend.calls[calls:] == ["academic-writer"]
+        assert checkpoint.read("review", "writing")['result']['success']
+        assert checkpoint.clear("review") == 4 and checkpoint.read("review", "ideas") is None
+
+        # The research workflow checkpoints by default, so a later phase reuses the earlier ones
+        research_backend = _CountingBackend()
+        research = SparseForecasting_ResearchWorkflow(research_backend, agents_dir=".",
+                                                      output_dir=str(temp_path / "research"))
+        phase_one = research.phase_steps([1])
+        research.run_batch([1], run_dir=str(temp_path / "phase_1"))
+        batch = research.run_batch([2], run_dir=str(temp_path / "phase_2"))
+        phase_two = research.phase_steps([2])
+        upstream = [step_id for step_id in batch['runs'][0]['order'] if step_id not in phase_two]
+        assert batch['success'] and upstream and set(upstream) <= set(phase_one)
+        assert all(batch['runs'][0]['steps'][step_id].get('cached') for step_id in upstream)
+        assert len(research_backend.calls) == len(phase_one) + len(phase_two)
+        assert (temp_path / "research" / "workflow_checkpoints" / "sparse-forecasting").is_dir()
+        fresh = SparseForecasting_ResearchWorkflow(research_backend, agents_dir=".", checkpoint=False,
+                                                   output_dir=str(temp_path / "research"))
+        assert fresh.run_batch([1], run_dir=str(temp_path / "fresh"))['cached_steps'] == 0
+
+        print("\n🎉 Workflow checkpoint tests completed successfully!")
+
 if __name__ == "__main__":
     test_basic_functionality()
+    test_registry_cache()
+    test_parallel_loading()
+    test_lazy_prompts()
+    test_frontmatter_parser()
+    test_empty_tools_field()
+    test_empty_registry_stats()
+    test_bm25_router()
+    test_batch_routing()
+    test_search_index()
+    test_registry_daemon()
+    test_hot_reload()
+    test_concurrent_reload()
+    test_config_write_skipped()
+    test_structured_logging()
+    test_stage_profile()
+    test_benchmark_suite()
+    test_name_index()
+    test_agent_records()
+    test_prompt_dedup()
+    test_mapped_registry()
+    test_sqlite_registry()
+    test_streaming_exports()
+    test_llm_backend()
+    test_async_execution()
+    test_workflow_engine()
+    test_workflow_batch()
+    test_workflow_checkpoint()